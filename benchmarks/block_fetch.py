@@ -0,0 +1,141 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+"""
+Bytes retrieved and parse time per block for transactions and logged events,
+without and with the filters and projections from `bot.block_filters`.
+
+    python -m benchmarks.block_fetch [transactions_per_block] [logged_events_per_block]
+
+The documents are synthetic. Transactions are a mix of transfers and data
+registrations (which can notify) and stake updates, removed validators and
+token updates (which can't). Logged events are a mix of transfers, mints and
+burns (which can notify) and operator updates, metadata events and custom
+events (which can't). The filters are applied in Python the way Mongo would.
+"""
+
+import datetime as dt
+import random
+import string
+import sys
+import time
+
+import bson
+from ccdexplorer_fundamentals.cis import MongoTypeLoggedEvent
+from ccdexplorer_fundamentals.GRPCClient.CCD_Types import *
+
+from bot.block_filters import (
+    LOGGED_EVENTS_PROJECTION,
+    NOTIFYING_LOGGED_EVENT_TAGS,
+    TRANSACTIONS_PROJECTION,
+    transaction_can_notify,
+)
+
+BASE58 = "".join(x for x in string.digits + string.ascii_letters if x not in "0OIl")
+
+
+def address() -> str:
+    return "".join(random.choices(BASE58, k=50))
+
+
+def tx_hash() -> str:
+    return "".join(random.choices("0123456789abcdef", k=64))
+
+
+def make_transaction(index: int, now: dt.datetime) -> dict:
+    effects = random.choice(
+        [
+            {"account_transfer": {"amount": random.randrange(10**9), "receiver": address()}},
+            {"data_registered": "ab" * 32},
+            {"baker_stake_updated": {"update": {"baker_id": 1, "new_stake": 10**12, "increased": True}}},
+            {"baker_removed": 1},
+            {"token_update_effect": {"events": []}},
+            {"token_update_effect": {"events": []}},
+        ]
+    )
+    hash = tx_hash()
+    return {
+        "_id": hash,
+        "index": index,
+        "energy_cost": 600,
+        "hash": hash,
+        "type": {"type": "account_transaction", "contents": "transfer"},
+        "account_transaction": {
+            "cost": 1000,
+            "sender": address(),
+            "outcome": "success",
+            "effects": effects,
+        },
+        "block_info": {"height": 1, "hash": tx_hash(), "slot_time": now},
+        "recognized_sender_id": address(),
+    }
+
+
+def make_logged_event(ordering: int, now: dt.datetime) -> dict:
+    tag = random.choice([255, 255, 255, 254, 253, 252, 251, 250, 250, 247])
+    return {
+        "_id": f"1-{tx_hash()}-{ordering}",
+        "logged_event": "ff" * 60,
+        "result": {
+            "tag": tag,
+            "token_id": "01",
+            "token_amount": str(random.randrange(10**9)),
+            "from_address": address(),
+            "to_address": address(),
+        },
+        "tag": tag,
+        "event_type": "transfer_event",
+        "block_height": 1,
+        "slot_time": now,
+        "tx_index": ordering,
+        "ordering": ordering,
+        "tx_hash": tx_hash(),
+        "token_address": "<9390,0>-01",
+        "contract": "<9390,0>",
+        "date": now.strftime("%Y-%m-%d"),
+        "to_address_canonical": address()[:29],
+        "from_address_canonical": address()[:29],
+    }
+
+
+def project(document: dict, projection: dict) -> dict:
+    return {k: v for k, v in document.items() if k not in projection}
+
+
+def measure(transactions: list[dict], logged_events: list[dict]) -> tuple[int, float]:
+    fetched_bytes = sum(len(bson.encode(x)) for x in transactions + logged_events)
+    start = time.perf_counter()
+    for x in transactions:
+        CCD_BlockItemSummary(**x)
+    for x in logged_events:
+        MongoTypeLoggedEvent(**x)
+    return fetched_bytes, time.perf_counter() - start
+
+
+def main():
+    tx_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    logged_event_count = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000
+    random.seed(42)
+    now = dt.datetime.now().astimezone(tz=dt.timezone.utc)
+
+    transactions = [make_transaction(i, now) for i in range(tx_count)]
+    logged_events = [make_logged_event(i, now) for i in range(logged_event_count)]
+    print(f"{tx_count:,.0f} transactions and {logged_event_count:,.0f} logged events per block")
+
+    fetched_bytes, duration = measure(transactions, logged_events)
+    print(f"All documents:      {fetched_bytes / 1024:8.1f} KB {duration * 1000:8.1f} ms")
+
+    filtered_transactions = [
+        project(x, TRANSACTIONS_PROJECTION)
+        for x in transactions
+        if transaction_can_notify(x)
+    ]
+    filtered_logged_events = [
+        project(x, LOGGED_EVENTS_PROJECTION)
+        for x in logged_events
+        if x["tag"] in NOTIFYING_LOGGED_EVENT_TAGS
+    ]
+    fetched_bytes, duration = measure(filtered_transactions, filtered_logged_events)
+    print(f"Filtered/projected: {fetched_bytes / 1024:8.1f} KB {duration * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
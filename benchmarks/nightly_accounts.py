@@ -0,0 +1,90 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+"""
+Memory footprint and build time of the nightly accounts lookup, as it was
+(two dicts of whole documents) and as NightlyAccountIndex.
+
+    python -m benchmarks.nightly_accounts [accounts]
+
+The documents are synthetic: an address, an index and a few balance and
+staking fields, as a stand-in for a nightly_accounts document.
+"""
+
+import datetime as dt
+import random
+import string
+import sys
+import time
+import tracemalloc
+
+from bot.nightly_accounts import NIGHTLY_ACCOUNTS_PROJECTION, NightlyAccountIndex
+
+BASE58 = "".join(
+    x for x in string.digits + string.ascii_letters if x not in "0OIl"
+)
+
+
+def make_documents(count: int) -> list[dict]:
+    now = dt.datetime.now().astimezone(tz=dt.timezone.utc)
+    return [
+        {
+            "_id": "".join(random.choices(BASE58, k=50)),
+            "index": index,
+            "available_balance": random.randrange(10**12),
+            "sequence_number": random.randrange(10_000),
+            "staked_amount": random.randrange(10**12),
+            "delegation_target": random.choice([None, random.randrange(100_000)]),
+            "credential_count": 1,
+            "deployment_tx_slot_time": now,
+        }
+        for index in range(count)
+    ]
+
+
+def cursor(documents: list[dict], projection: dict | None = None):
+    """Like a Mongo cursor: new documents, with new strings, one at a time."""
+    for document in documents:
+        fields = projection or document
+        result = {field: document[field] for field in fields}
+        result["_id"] = document["_id"].encode().decode()
+        yield result
+
+
+def measure(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    duration = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size, duration
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    random.seed(42)
+
+    # the documents as retrieved, with all fields.
+    documents = make_documents(count)
+    print(f"{count:,.0f} accounts")
+
+    def dict_of_dicts():
+        retrieved = list(cursor(documents))
+        return (
+            {x["_id"]: x for x in retrieved},
+            {x["index"]: x for x in retrieved},
+        )
+
+    def compact_index():
+        return NightlyAccountIndex.from_documents(
+            cursor(documents, NIGHTLY_ACCOUNTS_PROJECTION)
+        )
+
+    _, size, duration = measure(dict_of_dicts)
+    print(f"Dict of dicts:       {size / 1024 / 1024:8.1f} MB {duration:6.2f}s")
+    index, size, duration = measure(compact_index)
+    print(f"NightlyAccountIndex: {size / 1024 / 1024:8.1f} MB {duration:6.2f}s")
+    assert index.address_for(count - 1) == documents[-1]["_id"]
+
+
+if __name__ == "__main__":
+    main()
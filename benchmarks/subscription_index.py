@@ -0,0 +1,124 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+"""
+Matching time for NotificationEvents against users, with and without the
+SubscriptionIndex.
+
+    python -m benchmarks.subscription_index [users] [events]
+
+Without the index, every event visits every user (we time a cheap stand-in
+for `determine_if_user_should_be_notified_of_event` on a sample of events
+and extrapolate). With the index, an event only visits its subscribers.
+"""
+
+import datetime as dt
+import random
+import sys
+import time
+
+from ccdexplorer_fundamentals.user_v2 import (
+    AccountForUser,
+    AccountNotificationPreferences,
+    NotificationPreferences,
+    NotificationService,
+    UserV2,
+)
+
+from bot.subscription_index import SubscriptionIndex
+from notification_classes import *
+
+ACCOUNTS_ON_CHAIN = 1_000_000
+ACCOUNTS_PER_USER = 3
+NAIVE_SAMPLE = 100
+
+
+def make_users(count: int) -> dict[str, UserV2]:
+    preferences = AccountNotificationPreferences(
+        account_transfer=NotificationPreferences(
+            telegram=NotificationService(enabled=True)
+        )
+    )
+    users = {}
+    for i in range(count):
+        accounts = {}
+        for account_index in random.sample(range(ACCOUNTS_ON_CHAIN), ACCOUNTS_PER_USER):
+            accounts[str(account_index)] = AccountForUser(
+                account_index=account_index,
+                account_notification_preferences=preferences,
+            )
+        users[str(i)] = UserV2(token=str(i), accounts=accounts)
+    return users
+
+
+def make_events(count: int) -> list[NotificationEvent]:
+    now = dt.datetime.now().astimezone(tz=dt.timezone.utc)
+    events = []
+    for i in range(count):
+        events.append(
+            NotificationEvent(
+                event_type=EventType(
+                    account=EventTypeAccount(
+                        account_transfer=CCD_AccountTransfer(
+                            amount=1, receiver="receiver"
+                        )
+                    )
+                ),
+                block_height=i,
+                block_hash=f"{i:064x}",
+                block_slot_time=now,
+                impacted_addresses=[
+                    ImpactedAddress(
+                        address=CCD_Address_Complete(
+                            account=CCD_AccountAddress_Complete(
+                                index=random.randrange(ACCOUNTS_ON_CHAIN)
+                            )
+                        ),
+                        address_type=AddressType.receiver,
+                    )
+                ],
+            )
+        )
+    return events
+
+
+def naive_match(users: dict[str, UserV2], event: NotificationEvent) -> list[str]:
+    account_index = str(event.impacted_addresses[0].address.account.index)
+    matched = []
+    for user_key, user in users.items():
+        user_account = user.accounts.get(account_index)
+        if user_account and user_account.account_notification_preferences:
+            matched.append(user_key)
+    return matched
+
+
+def main():
+    user_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    event_count = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    random.seed(42)
+
+    users = make_users(user_count)
+    events = make_events(event_count)
+    print(f"{user_count:,.0f} users x {event_count:,.0f} events")
+
+    start = time.perf_counter()
+    index = SubscriptionIndex(users)
+    print(f"Index build:    {time.perf_counter() - start:8.3f}s")
+
+    start = time.perf_counter()
+    indexed_matches = sum(len(index.users_for_event(e)) for e in events)
+    print(f"Indexed match:  {time.perf_counter() - start:8.3f}s")
+
+    sample = events[:NAIVE_SAMPLE]
+    start = time.perf_counter()
+    naive_matches = sum(len(naive_match(users, e)) for e in sample)
+    naive_duration = time.perf_counter() - start
+    print(
+        f"Naive match:    {naive_duration * event_count / len(sample):8.3f}s "
+        f"(extrapolated from {len(sample)} events)"
+    )
+
+    assert naive_matches == sum(len(index.users_for_event(e)) for e in sample)
+    print(f"Matched users:  {indexed_matches:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
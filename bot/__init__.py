@@ -29,71 +29,187 @@ from .telegram_logic import Mixin as _telegram_logic
 from .messages_logic import Mixin as _messages_logic
 from .blocks_logic import Mixin as _blocks_logic
 from .nodes_logic import Mixin as _nodes_logic
+from .pipeline_logic import Mixin as _pipeline_logic
+from .delivery_logic import Mixin as _delivery_logic
+from .outbox_logic import Mixin as _outbox_logic
+from .address_cache import AddressResolutionCache
+from .catchup import CatchUpWindow
+from .checkpoint import CheckpointManager
+from .nightly_accounts import NightlyAccountIndex, NIGHTLY_ACCOUNTS_PROJECTION
+from .message_log import MessageLogWriter
+from .metadata_cache import MetadataCache
+from .metrics import Metrics
+from .subscription_index import SubscriptionIndex
+from .watched_collection import WatchedCollection
 
 # from .messages_definitions import Mixin as _messages_definitions
 from ccdexplorer_fundamentals.cis import MongoTypeTokensTag
 
 console = Console()
 
+import asyncio
 import sys
+from typing import Iterable
 
 
-class Bot(_telegram_logic, _messages_logic, _blocks_logic, _nodes_logic):
-    def read_contracts_with_tag_info(self):
+class Bot(
+    _telegram_logic,
+    _messages_logic,
+    _blocks_logic,
+    _nodes_logic,
+    _pipeline_logic,
+    _delivery_logic,
+    _outbox_logic,
+):
+    def setup_reference_collections(self):
+        self.token_tags = WatchedCollection(
+            "tokens_tags", lambda x: MongoTypeTokensTag(**x), self.metrics
+        )
+        self.labeled_accounts_collection = WatchedCollection(
+            "labeled_accounts",
+            lambda x: MongoLabeledAccount(**x),
+            self.metrics,
+            query={"account_index": {"$exists": True}},
+        )
+        self.contracts_with_tag_info: dict[str, MongoTypeTokensTag] = {}
+        self.labeled_accounts: dict[CCD_AccountIndex:MongoLabeledAccount] = {}
+
+    def start_reference_watchers(self) -> list[asyncio.Task]:
+        return [
+            asyncio.create_task(
+                self.token_tags.watch(
+                    self.connections.mongomoter.mainnet[Collections.tokens_tags],
+                    self.build_contracts_with_tag_info,
+                ),
+                name="watch_tokens_tags",
+            ),
+            asyncio.create_task(
+                self.labeled_accounts_collection.watch(
+                    self.connections.mongomoter.utilities[
+                        CollectionsUtilities.labeled_accounts
+                    ],
+                    self.build_labeled_accounts,
+                ),
+                name="watch_labeled_accounts",
+            ),
+        ]
+
+    def build_contracts_with_tag_info(self):
         contracts_with_tag_info = {}
-        token_tags = self.connections.mongodb.mainnet[Collections.tokens_tags].find({})
-        for token_tag in token_tags:
-            for contract in token_tag["contracts"]:
-                contracts_with_tag_info[contract] = MongoTypeTokensTag(**token_tag)
+        for token_tag in self.token_tags.items.values():
+            for contract in token_tag.contracts:
+                contracts_with_tag_info[contract] = token_tag
         self.contracts_with_tag_info = contracts_with_tag_info
 
-    def read_nightly_accounts(self) -> dict[str:UserV2]:
-        result = self.connections.mongodb.mainnet[Collections.nightly_accounts].find({})
-        self.nightly_accounts_by_account_id = {x["_id"]: x for x in list(result)}
-        self.nightly_accounts_by_account_index = {x["index"]: x for x in list(result)}
+    def set_contracts_with_tag_info(self, token_tags: list[dict]):
+        if self.token_tags.load(token_tags):
+            self.build_contracts_with_tag_info()
 
-    def read_payday_last_blocks_validated(self) -> dict[str:UserV2]:
-        pp = [{"$sort": {"date": -1}}, {"$limit": 1}]
+    def read_contracts_with_tag_info(self):
+        token_tags = self.connections.mongodb.mainnet[Collections.tokens_tags].find({})
+        self.set_contracts_with_tag_info(list(token_tags))
 
-        result = list(
-            MongoTypePayday(**x)
-            for x in self.connections.mongodb.mainnet[Collections.paydays].aggregate(pp)
-        )[0]
+    def set_nightly_accounts(self, nightly_accounts: Iterable[dict]):
+        self.nightly_accounts = NightlyAccountIndex.from_documents(nightly_accounts)
+
+    def read_nightly_accounts(self) -> dict[str:UserV2]:
+        result = self.connections.mongodb.mainnet[Collections.nightly_accounts].find(
+            {}, projection=NIGHTLY_ACCOUNTS_PROJECTION
+        )
+        self.set_nightly_accounts(result)
+
+    def set_payday_last_blocks_validated(self, paydays: list[dict]):
+        result = list(MongoTypePayday(**x) for x in paydays)[0]
 
         self.payday_last_blocks_validated = (
             result.height_for_last_block - result.height_for_first_block + 1
         )
 
-    def read_users_from_collection(self):
+    def read_payday_last_blocks_validated(self) -> dict[str:UserV2]:
+        pp = [{"$sort": {"date": -1}}, {"$limit": 1}]
+        result = self.connections.mongodb.mainnet[Collections.paydays].aggregate(pp)
+        self.set_payday_last_blocks_validated(list(result))
+
+    def users_collection(self) -> CollectionsUtilities:
         if "pytest" in sys.modules:
-            result = self.connections.mongodb.utilities[
-                CollectionsUtilities.users_v2_dev
-            ].find({})
+            return CollectionsUtilities.users_v2_dev
         else:
-            result = self.connections.mongodb.utilities[
-                CollectionsUtilities.users_v2_prod
-            ].find({})
-        self.users = {x["_id"]: UserV2(**x) for x in list(result)}
-        for chat_id, user in self.users.items():
-            for account_index, user_account in user.accounts.items():
-                self.users[chat_id].accounts[account_index] = AccountForUser(
-                    **user_account
-                )
-            for contract_index, contract in user.contracts.items():
-                self.users[chat_id].contracts[contract_index] = ContractForUser(
-                    **contract
-                )
+            return CollectionsUtilities.users_v2_prod
+
+    def parse_user(self, user_document: dict) -> UserV2:
+        user = UserV2(**user_document)
+        for account_index, user_account in user.accounts.items():
+            user.accounts[account_index] = AccountForUser(**user_account)
+        for contract_index, contract in user.contracts.items():
+            user.contracts[contract_index] = ContractForUser(**contract)
+        return user
+
+    def track_users_last_modified(self, users: list[dict]):
+        # kept as read from the collection, so it can be used in the next query as is.
+        for x in users:
+            if x.get("last_modified") and (
+                (self.users_last_modified is None)
+                or (x["last_modified"] > self.users_last_modified)
+            ):
+                self.users_last_modified = x["last_modified"]
+
+    def set_users(self, users: list[dict]):
+        users_from_collection = {x["_id"]: self.parse_user(x) for x in users}
+        self.users_last_modified = None
+        self.track_users_last_modified(users)
+        self.subscription_index = SubscriptionIndex(users_from_collection)
+        self.users = users_from_collection
+
+    def update_users(self, changed_users: list[dict], user_ids: set | None = None):
+        """
+        Applies a delta refresh: `changed_users` are the documents modified since
+        the last read, `user_ids` (if given) all ids currently in the collection,
+        to find deleted users. Only changed users are parsed. `self.users` and
+        `self.subscription_index` are replaced together, and only if something changed.
+        """
+        deleted = (set(self.users.keys()) - user_ids) if user_ids is not None else set()
+        changed = {}
+        for x in changed_users:
+            user = self.parse_user(x)
+            # users modified at exactly the last read time are read again.
+            if self.users.get(x["_id"]) != user:
+                changed[x["_id"]] = user
+        self.track_users_last_modified(changed_users)
+        if len(changed) == 0 and len(deleted) == 0:
+            return
+
+        users_from_collection = dict(self.users)
+        for user_id in deleted:
+            del users_from_collection[user_id]
+        users_from_collection.update(changed)
+
+        self.subscription_index = SubscriptionIndex(users_from_collection)
+        self.users = users_from_collection
+
+    def read_users_from_collection(self):
+        result = self.connections.mongodb.utilities[self.users_collection()].find({})
+        self.set_users(list(result))
 
         # print("Users refreshed from collection.")
 
-    def read_labeled_accounts(self):
-        self.labeled_accounts: dict[CCD_AccountIndex:MongoLabeledAccount] = {
-            x["account_index"]: MongoLabeledAccount(**x)
-            for x in self.connections.mongodb.utilities[
-                CollectionsUtilities.labeled_accounts
-            ].find({"account_index": {"$exists": True}})
+    def build_labeled_accounts(self):
+        # the change stream also has labeled accounts without an account index.
+        self.labeled_accounts = {
+            x.account_index: x
+            for x in self.labeled_accounts_collection.items.values()
+            if x.account_index is not None
         }
 
+    def set_labeled_accounts(self, labeled_accounts: list[dict]):
+        if self.labeled_accounts_collection.load(labeled_accounts):
+            self.build_labeled_accounts()
+
+    def read_labeled_accounts(self):
+        result = self.connections.mongodb.utilities[
+            CollectionsUtilities.labeled_accounts
+        ].find(self.labeled_accounts_collection.query)
+        self.set_labeled_accounts(list(result))
+
     def do_initial_reads_from_collections(self):
         self.read_users_from_collection()
         self.read_labeled_accounts()
@@ -104,40 +220,98 @@ class Bot(_telegram_logic, _messages_logic, _blocks_logic, _nodes_logic):
     async def async_read_labeled_accounts(
         self, context: ContextTypes.DEFAULT_TYPE
     ) -> dict[str:UserV2]:
-        self.read_labeled_accounts()
+        if await self.labeled_accounts_collection.refresh(
+            self.connections.mongomoter.utilities[CollectionsUtilities.labeled_accounts]
+        ):
+            self.build_labeled_accounts()
 
     async def async_read_users_from_collection(
         self, context: ContextTypes.DEFAULT_TYPE
     ) -> dict[str:UserV2]:
-        self.read_users_from_collection()
+        """
+        Reads only the users modified since the last read ($gte, as more users
+        can be modified in the same millisecond), and the ids of all users to
+        notice deleted users.
+        """
+        collection = self.connections.mongomoter.utilities[self.users_collection()]
+        if self.users_last_modified is None:
+            result = await collection.find({}).to_list(length=None)
+            self.set_users(result)
+            return
+
+        changed_users = await collection.find(
+            {"last_modified": {"$gte": self.users_last_modified}}
+        ).to_list(length=None)
+        user_ids = {
+            x["_id"]
+            async for x in collection.find({}, projection={"_id": 1})
+        }
+        self.update_users(changed_users, user_ids)
 
     async def async_read_nightly_accounts(
         self, context: ContextTypes.DEFAULT_TYPE
     ) -> dict[str:UserV2]:
-        self.read_nightly_accounts()
+        """
+        Adds the accounts that were added to the collection since the last read.
+        Accounts are never removed and don't change index.
+        """
+        async for nightly_account in self.connections.mongomoter.mainnet[
+            Collections.nightly_accounts
+        ].find(
+            {"index": {"$gt": self.nightly_accounts.max_collection_index}},
+            projection=NIGHTLY_ACCOUNTS_PROJECTION,
+        ):
+            self.nightly_accounts.add_document(nightly_account)
 
     async def async_read_payday_last_blocks_validated(
         self, context: ContextTypes.DEFAULT_TYPE
     ) -> dict[str:UserV2]:
-        self.read_payday_last_blocks_validated()
+        pp = [{"$sort": {"date": -1}}, {"$limit": 1}]
+        result = (
+            await self.connections.mongomoter.mainnet[Collections.paydays]
+            .aggregate(pp)
+            .to_list(length=1)
+        )
+        self.set_payday_last_blocks_validated(result)
 
     async def async_read_contracts_with_tag_info(
         self, context: ContextTypes.DEFAULT_TYPE
     ) -> dict[str:UserV2]:
-        self.read_contracts_with_tag_info()
+        if await self.token_tags.refresh(
+            self.connections.mongomoter.mainnet[Collections.tokens_tags]
+        ):
+            self.build_contracts_with_tag_info()
 
     def __init__(self, connections: Connections):
         self.connections = connections
         self.users = {}
-        self.processing = False
-        self.full_blocks_to_process: list[CCD_BlockComplete] = []
+        self.users_last_modified = None
+        self.subscription_index = SubscriptionIndex(self.users)
         self.event_queue: list[NotificationEvent] = []
+        self.setup_pipeline_queues()
+        self.setup_delivery()
+        self.metrics = Metrics()
+        self.setup_reference_collections()
+        self.grpc_semaphore = asyncio.Semaphore(GRPC_CONCURRENCY)
+        self.web23_domain_names = MetadataCache(METADATA_CACHE_SIZE)
+        self.token_names = MetadataCache(METADATA_CACHE_SIZE)
+        self.message_log = MessageLogWriter(
+            self.metrics,
+            MESSAGE_LOG_BATCH_SIZE,
+            MESSAGE_LOG_FLUSH_INTERVAL,
+            MESSAGE_LOG_MAX_BUFFER,
+        )
+        self.address_cache = AddressResolutionCache(
+            ADDRESS_CACHE_SIZE, ADDRESS_CACHE_TTL
+        )
+        self.catch_up_window = CatchUpWindow(
+            CATCHUP_MAX_BLOCKS, CATCHUP_MEMORY_BUDGET_MB * 1024 * 1024
+        )
+        self.checkpoints = CheckpointManager(CHECKPOINT_MAX_BLOCKS, CHECKPOINT_INTERVAL)
+        self.last_processed_block_height: int | None = None
+        self.last_processed_block_slot_time: dt.datetime | None = None
+        self.last_missing_height: int | None = None
         self.read_nightly_accounts()
         self.read_payday_last_blocks_validated()
-        self.labeled_accounts: dict[CCD_AccountIndex:MongoLabeledAccount] = {
-            x["account_index"]: MongoLabeledAccount(**x)
-            for x in self.connections.mongodb.utilities[
-                CollectionsUtilities.labeled_accounts
-            ].find({"account_index": {"$exists": True}})
-        }
+        self.read_labeled_accounts()
         self.internal_freqency_timer = dt.datetime.now().astimezone(tz=dt.timezone.utc)
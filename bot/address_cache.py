@@ -0,0 +1,64 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+import time
+from collections import OrderedDict
+from typing import Callable
+
+
+class AddressResolutionCache:
+    """
+    Bounded LRU cache of account address <-> account index, for accounts
+    that are not (yet) in the nightly accounts. A single lookup fills both
+    directions. Entries expire after `ttl` seconds. Hits and misses are
+    counted in the bot's metrics (`address_cache_hits`, `address_cache_misses`).
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.by_address: OrderedDict[str, tuple[int, float]] = OrderedDict()
+        self.by_index: OrderedDict[int, tuple[str, float]] = OrderedDict()
+
+    def _get(self, entries: OrderedDict, key):
+        entry = entries.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires < self.clock():
+            del entries[key]
+            return None
+        entries.move_to_end(key)
+        return value
+
+    def _put(self, entries: OrderedDict, key, value):
+        entries[key] = (value, self.clock() + self.ttl)
+        entries.move_to_end(key)
+        while len(entries) > self.max_size:
+            entries.popitem(last=False)
+
+    def get_index(self, account_address: str) -> int | None:
+        return self._get(self.by_address, account_address)
+
+    def get_address(self, account_index: int) -> str | None:
+        return self._get(self.by_index, account_index)
+
+    def put(
+        self,
+        account_address: str,
+        account_index: int,
+        canonical_address: str | None = None,
+    ):
+        """
+        `canonical_address` is the address as the node returns it, if the
+        lookup was done with an alias.
+        """
+        self._put(self.by_address, account_address, account_index)
+        if canonical_address and canonical_address != account_address:
+            self._put(self.by_address, canonical_address, account_index)
+        self._put(self.by_index, account_index, canonical_address or account_address)
@@ -0,0 +1,62 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+from ccdexplorer_fundamentals.GRPCClient.CCD_Types import *
+
+from notification_classes import *
+
+# Logged events `find_events_in_logged_events` makes events for
+# (transfer, mint, burn).
+NOTIFYING_LOGGED_EVENT_TAGS = [253, 254, 255]
+
+# Transaction effects `find_events_in_block_transactions` makes events for,
+# those that are an event type in any category.
+NOTIFYING_EFFECTS = sorted(
+    set(CCD_AccountTransactionEffects.model_fields)
+    & (
+        set(EventTypeValidator.model_fields)
+        | set(EventTypeAccount.model_fields)
+        | set(EventTypeOther.model_fields)
+        | set(EventTypeContract.model_fields)
+    )
+)
+
+# Fields that are never read from retrieved documents.
+LOGGED_EVENTS_PROJECTION = {
+    "date": 0,
+    "slot_time": 0,
+    "to_address_canonical": 0,
+    "from_address_canonical": 0,
+}
+TRANSACTIONS_PROJECTION = {"block_info": 0, "recognized_sender_id": 0}
+
+
+def logged_events_query(start_height: int, end_height: int) -> dict:
+    return {
+        "block_height": {"$gte": start_height, "$lte": end_height},
+        "tag": {"$in": NOTIFYING_LOGGED_EVENT_TAGS},
+    }
+
+
+def transactions_query(tx_hashes: list[str]) -> dict:
+    """Transactions in `tx_hashes` that can lead to a notification."""
+    return {
+        "_id": {"$in": tx_hashes},
+        "$or": [
+            {f"account_transaction.effects.{effect}": {"$ne": None}}
+            for effect in NOTIFYING_EFFECTS
+        ]
+        + [
+            {"account_creation": {"$ne": None}},
+            {"update": {"$ne": None}},
+        ],
+    }
+
+
+def transaction_can_notify(transaction: dict) -> bool:
+    """`transactions_query` for a single document, without the hashes."""
+    if (transaction.get("account_creation") is not None) or (
+        transaction.get("update") is not None
+    ):
+        return True
+    effects = (transaction.get("account_transaction") or {}).get("effects") or {}
+    return any(effects.get(effect) is not None for effect in NOTIFYING_EFFECTS)
@@ -1,9 +1,14 @@
 # ruff: noqa: F403, F405, E402, E501, F401
 
+import asyncio
+import time
+from contextvars import ContextVar
+
 from pydantic import BaseModel, ConfigDict
 from rich import print
 from rich.console import Console
 import aiohttp
+import bson
 from ccdexplorer_fundamentals.cis import (
     MongoTypeLoggedEvent,
     MongoTypeTokenAddress,
@@ -11,7 +16,9 @@ from ccdexplorer_fundamentals.cis import (
     mintEvent,
     transferEvent,
 )
+from bson.raw_bson import RawBSONDocument
 from pymongo import ReplaceOne
+from motor.motor_asyncio import AsyncIOMotorCollection
 from ccdexplorer_fundamentals.enums import NET
 from ccdexplorer_fundamentals.GRPCClient import GRPCClient
 from ccdexplorer_fundamentals.GRPCClient.CCD_Types import *
@@ -36,10 +43,45 @@ from ccdexplorer_fundamentals.user_v2 import (
     UserV2,
 )
 
+from .block_filters import (
+    LOGGED_EVENTS_PROJECTION,
+    TRANSACTIONS_PROJECTION,
+    logged_events_query,
+    transactions_query,
+)
+from .subscription_index import SubscriptionIndex
 from .utils import Utils as Utils
 
 console = Console()
 
+# The events found by the extractor running in the current task.
+extractor_events: ContextVar[list[NotificationEvent] | None] = ContextVar(
+    "extractor_events", default=None
+)
+
+
+async def find_with_size(
+    collection: AsyncIOMotorCollection, query: dict, projection: dict | None = None
+) -> tuple[list[dict], int]:
+    """
+    The documents matching `query` and their total size in bytes. They are
+    retrieved as raw BSON, so the size is known without encoding them again,
+    and decoded once.
+    """
+    raw_documents: list[RawBSONDocument] = (
+        await collection.with_options(
+            codec_options=collection.codec_options.with_options(
+                document_class=RawBSONDocument
+            )
+        )
+        .find(query, projection=projection)
+        .to_list(length=None)
+    )
+    return (
+        [bson.decode(x.raw, collection.codec_options) for x in raw_documents],
+        sum(len(x.raw) for x in raw_documents),
+    )
+
 
 class Mixin(Utils):
     def prepare_notification_event(
@@ -95,8 +137,28 @@ class Mixin(Utils):
 
         return None
 
-    def find_commission_changed(
-        self, event_type_other: EventTypeOther, grpcclient: GRPCClient = None
+    async def delegators_for_pool(
+        self, validator_id: int, pool_delegators: dict[int, list[CCD_AccountIndex]]
+    ) -> list[CCD_AccountIndex]:
+        """
+        The account indices of the delegators of this pool. `pool_delegators`
+        holds the pools already looked up for the current block.
+        """
+        if validator_id not in pool_delegators:
+            delegators_info = await self.run_grpc(
+                self.connections.grpcclient.get_delegators_for_pool,
+                validator_id,
+                "last_final",
+            )
+            pool_delegators[validator_id] = await self.account_indices_for_addresses(
+                [x.account for x in delegators_info]
+            )
+        return pool_delegators[validator_id]
+
+    async def find_commission_changed(
+        self,
+        event_type_other: EventTypeOther,
+        pool_delegators: dict[int, list[CCD_AccountIndex]],
     ) -> CCD_Pool_Commission_Changed | None:
         commission_events = []
         validator_id = None
@@ -118,13 +180,9 @@ class Mixin(Utils):
                 )
 
         if validator_id:
-            delegators_info = grpcclient.get_delegators_for_pool(
-                validator_id, "last_final"
+            delegator_indices_list = await self.delegators_for_pool(
+                validator_id, pool_delegators
             )
-            delegator_indices_list = [
-                grpcclient.get_account_info("last_final", hex_address=x.account).index
-                for x in delegators_info
-            ]
         return (
             CCD_Pool_Commission_Changed(
                 **{
@@ -137,11 +195,235 @@ class Mixin(Utils):
             else None
         )
 
+    def account_info_lookups(self, block: CCD_BlockComplete) -> set[tuple[str, str]]:
+        """
+        The (block hash, account) pairs `find_events_in_block_transactions`
+        needs the account info for.
+        """
+        lookups = set()
+        for tx in block.transaction_summaries:
+            if not tx.account_transaction:
+                continue
+            field_set = list(tx.account_transaction.effects.model_fields_set)[0]
+            sender = tx.account_transaction.sender
+            if field_set in ("baker_configured", "validator_configured"):
+                lookups.add((block.block_info.parent_block, sender))
+            if field_set == "delegation_configured":
+                lookups.add((block.block_info.hash, sender))
+                lookups.add((block.block_info.parent_block, sender))
+        return lookups
+
+    async def prefetch_account_infos(
+        self, block: CCD_BlockComplete
+    ) -> dict[tuple[str, str], CCD_AccountInfo]:
+        """
+        Retrieves all account info for this block concurrently. Lookups that
+        fail are left out, `account_info_at` retries them.
+        """
+        lookups = list(self.account_info_lookups(block))
+        if len(lookups) == 0:
+            return {}
+        results = await asyncio.gather(
+            *[self.get_account_info_concurrently(*lookup) for lookup in lookups],
+            return_exceptions=True,
+        )
+        self.metrics.increment("account_info_prefetched", len(lookups))
+        return {
+            lookup: result
+            for lookup, result in zip(lookups, results)
+            if not isinstance(result, BaseException)
+        }
+
+    def account_info_at(
+        self,
+        account_infos: dict[tuple[str, str], CCD_AccountInfo],
+        block_hash: str,
+        hex_address: str,
+    ) -> CCD_AccountInfo:
+        account_info = account_infos.get((block_hash, hex_address))
+        if account_info is None:
+            account_info = self.connections.grpcclient.get_account_info(
+                block_hash, hex_address
+            )
+        return account_info
+
     def add_notification_event_to_queue(self, notification_event: NotificationEvent):
-        self.event_queue.append(notification_event)
+        # extractors run from `process_block` collect their events separately,
+        # see `run_extractor`.
+        events = extractor_events.get()
+        if events is None:
+            events = self.event_queue
+        events.append(notification_event)
+
+    async def get_blocks_in_range(
+        self,
+        db_to_use: dict[Collections, AsyncIOMotorCollection],
+        net: str,
+        start_height: int,
+        end_height: int,
+    ) -> tuple[list[CCD_BlockComplete], int | None, int]:
+        """
+        Retrieves all blocks in [start_height, end_height] with one query per
+        collection (blocks, transactions, logged events, special events) and
+        assembles the `CCD_BlockComplete` objects in memory. Only transactions
+        and logged events that can lead to a notification are retrieved (see
+        `block_filters`), without the fields that are never read.
+
+        Blocks are returned in height order and only up to the first height that
+        is not (yet) present in the blocks collection, as blocks need to be
+        processed contiguously. This missing height (or None) is returned as well,
+        together with the size in bytes of the retrieved documents.
+        """
+        block_documents, fetched_bytes = await find_with_size(
+            db_to_use[Collections.blocks],
+            {"height": {"$gte": start_height, "$lte": end_height}},
+        )
+        block_infos_by_height = {x["height"]: CCD_BlockInfo(**x) for x in block_documents}
+        block_infos: list[CCD_BlockInfo] = []
+        missing_height = None
+        for height in range(start_height, end_height + 1):
+            if height not in block_infos_by_height:
+                missing_height = height
+                break
+            block_infos.append(block_infos_by_height[height])
+
+        if len(block_infos) == 0:
+            return [], missing_height, fetched_bytes
+
+        last_height = block_infos[-1].height
+
+        ### Transactions in blocks
+        tx_hashes = [
+            tx_hash
+            for block_info in block_infos
+            for tx_hash in (block_info.transaction_hashes or [])
+        ]
+        txs_by_hash = {}
+        if len(tx_hashes) > 0:
+            tx_documents, tx_bytes = await find_with_size(
+                db_to_use[Collections.transactions],
+                transactions_query(tx_hashes),
+                TRANSACTIONS_PROJECTION,
+            )
+            txs_by_hash = {x["_id"]: x for x in tx_documents}
+            fetched_bytes += tx_bytes
+
+        ### Logged Events
+        logged_event_documents, logged_event_bytes = await find_with_size(
+            db_to_use[Collections.tokens_logged_events],
+            logged_events_query(start_height, last_height),
+            LOGGED_EVENTS_PROJECTION,
+        )
+        fetched_bytes += logged_event_bytes
+        logged_events_by_height: dict[int, list[MongoTypeLoggedEvent]] = {}
+        for x in logged_event_documents:
+            logged_events_by_height.setdefault(x["block_height"], []).append(
+                MongoTypeLoggedEvent(**x)
+            )
 
-    async def get_new_blocks_from_mongo(self, context: ContextTypes.DEFAULT_TYPE):
-        # print("get_new_blocks_from_mongo", end=" ")
+        ### Special Events
+        # (large in payday blocks, so they count towards the memory budget)
+        special_event_documents, special_event_bytes = await find_with_size(
+            db_to_use[Collections.special_events],
+            {"_id": {"$in": [block_info.height for block_info in block_infos]}},
+        )
+        fetched_bytes += special_event_bytes
+        special_events_by_height = {
+            x["_id"]: x["special_events"] for x in special_event_documents
+        }
+
+        blocks: list[CCD_BlockComplete] = []
+        for block_info in block_infos:
+            txs_in_block = [
+                CCD_BlockItemSummary(**txs_by_hash[tx_hash])
+                for tx_hash in (block_info.transaction_hashes or [])
+                if tx_hash in txs_by_hash
+            ]
+            logged_events_in_block = sorted(
+                logged_events_by_height.get(block_info.height, []),
+                key=lambda x: (x.tx_index, x.ordering),
+            )
+            if block_info.height in special_events_by_height:
+                special_events_in_block = [
+                    CCD_BlockSpecialEvent(**x)
+                    for x in special_events_by_height[block_info.height]
+                ]
+            else:
+                special_events_in_block = (
+                    self.connections.grpcclient.get_block_special_events(
+                        block_info.hash, NET(net)
+                    )
+                )
+
+            blocks.append(
+                CCD_BlockComplete(
+                    **{
+                        "block_info": block_info,
+                        "transaction_summaries": txs_in_block,
+                        "special_events": special_events_in_block,
+                        "logged_events": logged_events_in_block,
+                        "net": net,
+                    }
+                )
+            )
+        return blocks, missing_height, fetched_bytes
+
+    def record_lag(
+        self, last_block_info: CCD_BlockInfo, bot_last_processed_block_height: int
+    ):
+        """
+        Exposes how far the bot is behind the last block in the collection,
+        both in blocks and in seconds of slot time.
+        """
+        lag_in_blocks = last_block_info.height - bot_last_processed_block_height
+        if lag_in_blocks <= 0:
+            lag_in_seconds = 0
+        elif self.last_processed_block_slot_time:
+            lag_in_seconds = (
+                last_block_info.slot_time - self.last_processed_block_slot_time
+            ).total_seconds()
+        else:
+            lag_in_seconds = None
+        self.metrics.set_gauge("lag_in_blocks", lag_in_blocks)
+        self.metrics.set_gauge("lag_in_seconds", lag_in_seconds)
+
+    async def get_last_block_info(
+        self, db_to_use: dict[Collections, AsyncIOMotorCollection]
+    ) -> CCD_BlockInfo | None:
+        result = (
+            await db_to_use[Collections.blocks]
+            .aggregate([{"$sort": {"height": -1}}, {"$limit": 1}])
+            .to_list(length=1)
+        )
+        if result:
+            return CCD_BlockInfo(**result[0])
+
+    async def request_missing_block(
+        self, db_to_use: dict[Collections, AsyncIOMotorCollection], missing_height: int
+    ):
+        _ = await db_to_use[Collections.helpers].bulk_write(
+            [
+                ReplaceOne(
+                    {"_id": "special_purpose_block_request"},
+                    replacement={
+                        "_id": "special_purpose_block_request",
+                        "heights": [missing_height],
+                    },
+                    upsert=True,
+                )
+            ]
+        )
+        # only notify once per missing block, not on every retry.
+        if missing_height != self.last_missing_height:
+            self.last_missing_height = missing_height
+            self.connections.tooter.send(
+                channel=TooterChannel.NOTIFIER,
+                message=f"BOT: Can't find {missing_height:,.0f} in collection blocks! BOT is stalling on this, have tried to add this as Special Purpose request.",
+                notifier_type=TooterType.BOT_MAIN_LOOP_ERROR,
+            )
+        print(f"Can't find {missing_height} in collection blocks!")
+
+    async def check_processing_heartbeat(self, context: ContextTypes.DEFAULT_TYPE):
         current_time = dt.datetime.now().astimezone(tz=dt.timezone.utc)
         if (current_time - self.internal_freqency_timer).total_seconds() > 5 * 60:
             self.connections.tooter.relay(
@@ -152,126 +434,6 @@ class Mixin(Utils):
                 notifier_type=TooterType.REQUESTS_ERROR,
             )
             exit()
-        try:
-            if not self.processing:
-                net = NET(context.bot_data["net"]).value
-                db_to_use = (
-                    self.connections.mongodb.mainnet
-                    if net == "mainnet"
-                    else self.connections.mongodb.testnet
-                )
-
-                bot_last_processed_block = db_to_use[Collections.helpers].find_one(
-                    {"_id": "bot_last_processed_block"}
-                )
-                bot_last_processed_block_height = bot_last_processed_block["height"]
-
-                result = db_to_use[Collections.blocks].aggregate(
-                    [{"$sort": {"height": -1}}, {"$limit": 1}]
-                )
-
-                if result:
-                    last_block_info = CCD_BlockInfo(**list(result)[0])
-
-                # if (last_block_info.height - bot_last_processed_block_height) > 250:
-                #     bot_last_processed_block_height = last_block_info.height - 250
-
-                if last_block_info.height > bot_last_processed_block_height:
-                    max_steps_to_take = min(
-                        10, last_block_info.height - bot_last_processed_block_height
-                    )
-                    for requested_height in range(
-                        # bot_last_processed_block_height + 1, last_block_info.height
-                        bot_last_processed_block_height + 1,
-                        bot_last_processed_block_height + 1 + max_steps_to_take,
-                    ):
-                        result = db_to_use[Collections.blocks].find_one(
-                            {"height": requested_height}
-                        )
-                        if not result:
-                            _ = db_to_use[Collections.helpers].bulk_write(
-                                [
-                                    ReplaceOne(
-                                        {"_id": "special_purpose_block_request"},
-                                        replacement={
-                                            "_id": "special_purpose_block_request",
-                                            "heights": [requested_height],
-                                        },
-                                        upsert=True,
-                                    )
-                                ]
-                            )
-                            self.connections.tooter.send(
-                                channel=TooterChannel.NOTIFIER,
-                                message=f"BOT: Can't find {requested_height:,.0f} in collection blocks! BOT is stalling on this, have tried to add this as Special Purpose request.",
-                                notifier_type=TooterType.BOT_MAIN_LOOP_ERROR,
-                            )
-                            print(
-                                f"Can't find {requested_height} in collection blocks!"
-                            )
-
-                        ### Block Info
-                        else:
-                            block_info_at_height = CCD_BlockInfo(**result)
-
-                            result = db_to_use[Collections.transactions].find(
-                                {
-                                    "_id": {
-                                        "$in": block_info_at_height.transaction_hashes
-                                    }
-                                }
-                            )
-                            if not result:
-                                break
-
-                            ### Transactions in block
-                            txs_in_block = [CCD_BlockItemSummary(**x) for x in result]
-
-                            result = db_to_use[Collections.tokens_logged_events].find(
-                                {"block_height": requested_height}
-                            )
-
-                            ### Logged Events
-                            if result:
-                                logged_events_in_block = [
-                                    MongoTypeLoggedEvent(**x) for x in result
-                                ]
-                            else:
-                                logged_events_in_block = []
-
-                            ### Special Events
-                            result = db_to_use[Collections.special_events].find_one(
-                                {"_id": requested_height}
-                            )
-
-                            if result:
-                                special_events_in_block = [
-                                    CCD_BlockSpecialEvent(**x)
-                                    for x in result["special_events"]
-                                ]
-                            else:
-                                special_events_in_block = self.connections.grpcclient.get_block_special_events(
-                                    block_info_at_height.hash, NET(net)
-                                )
-
-                            block_complete = CCD_BlockComplete(
-                                **{
-                                    "block_info": block_info_at_height,
-                                    "transaction_summaries": txs_in_block,
-                                    "special_events": special_events_in_block,
-                                    "logged_events": logged_events_in_block,
-                                    "net": net,
-                                }
-                            )
-                            console.log(
-                                f"Ret: {block_complete.block_info.height:,.0f}",
-                                end=" | ",
-                            )
-                            self.full_blocks_to_process.append(block_complete)
-            else:
-                console.log(f"{self.processing=}")
-        except Exception as e:
-            print(e)
 
     async def process_block_for_baker(self, block: CCD_BlockComplete):
         baker_id = block.block_info.baker
@@ -285,11 +447,17 @@ class Mixin(Utils):
                     notifier_type=TooterType.BOT_MAIN_LOOP_ERROR,
                 )
             else:
-                pi = self.connections.grpcclient.get_pool_info_for_pool(
-                    baker_id, block.block_info.hash, NET(block.net)
-                )
-                earliest_win_time = (
-                    self.connections.grpcclient.get_baker_earliest_win_time(baker_id)
+                pi, earliest_win_time = await asyncio.gather(
+                    self.run_grpc(
+                        self.connections.grpcclient.get_pool_info_for_pool,
+                        baker_id,
+                        block.block_info.hash,
+                        NET(block.net),
+                    ),
+                    self.run_grpc(
+                        self.connections.grpcclient.get_baker_earliest_win_time,
+                        baker_id,
+                    ),
                 )
 
                 notification_event = self.prepare_notification_event(
@@ -309,18 +477,30 @@ class Mixin(Utils):
                         )
                     ],
                 )
-                self.event_queue.append(notification_event)
+                self.add_notification_event_to_queue(notification_event)
 
     async def find_web23_domain_name(self, token_address: str):
+        domain_name = self.web23_domain_names.get(token_address)
+        if domain_name:
+            self.metrics.increment("metadata_cache_hits")
+            return domain_name
+        self.metrics.increment("metadata_cache_misses")
+
         contract_str = token_address.split("-")[0]
         contract = CCD_ContractAddress.from_str(contract_str)
         token_id = token_address.split("-")[1]
 
         url_to_fetch_metadata = f"https://wallet-proxy.mainnet.concordium.software/v0/CIS2TokenMetadata/{contract.index}/0?tokenId={token_id}"
         metadata_url = None
-        session_timeout = aiohttp.ClientTimeout(total=None, sock_connect=2, sock_read=2)
-        async with aiohttp.ClientSession(timeout=session_timeout) as session:
-            async with session.get(url_to_fetch_metadata) as resp:
+        # the session is shared (and keeps connections alive), the timeouts are per request.
+        session = self.get_http_session()
+        request_timeout = aiohttp.ClientTimeout(total=None, sock_connect=2, sock_read=2)
+        # a failure only costs the name of this domain, not the other
+        # events in the block.
+        try:
+            async with session.get(
+                url_to_fetch_metadata, timeout=request_timeout
+            ) as resp:
                 token_metadata = await resp.json()
                 if "metadata" in token_metadata:
                     if "metadataURL" in token_metadata["metadata"][0]:
@@ -329,34 +509,100 @@ class Mixin(Utils):
                     return None
 
             if metadata_url:
-                async with session.get(metadata_url) as resp:
+                async with session.get(metadata_url, timeout=request_timeout) as resp:
                     token_metadata = await resp.json()
                     if resp.status == 200:
+                        self.web23_domain_names.put(
+                            token_address, token_metadata["name"]
+                        )
                         return token_metadata["name"]
             else:
                 return None
+        except (
+            aiohttp.ClientError,
+            asyncio.TimeoutError,
+            ValueError,
+            KeyError,
+            IndexError,
+            TypeError,
+        ) as e:
+            console.log(f"find_web23_domain_name for {token_address} has FAILED with {e}.")
+            self.metrics.increment("web23_domain_name_errors")
+            return None
+
+    async def find_web23_domain_names(
+        self, block: CCD_BlockComplete
+    ) -> dict[str, str | None]:
+        """The names of all web23 domains minted in this block, retrieved concurrently."""
+        token_addresses = list(
+            dict.fromkeys(
+                x.token_address
+                for x in block.logged_events
+                if (x.contract == "<9377,0>") and (x.tag == 254)
+            )
+        )
+        domain_names = await asyncio.gather(
+            *[self.find_web23_domain_name(x) for x in token_addresses]
+        )
+        return dict(zip(token_addresses, domain_names))
+
+    async def token_names_for_block(
+        self, block: CCD_BlockComplete
+    ) -> dict[str, str | None]:
+        """
+        The token names of all token addresses in the logged events of this
+        block, from the cache or else in one query. Names are only cached once
+        the token metadata is available.
+        """
+        token_addresses = list(
+            dict.fromkeys(x.token_address for x in block.logged_events)
+        )
+        to_find = [x for x in token_addresses if x not in self.token_names]
+        self.metrics.increment(
+            "token_name_cache_hits", len(token_addresses) - len(to_find)
+        )
+        self.metrics.increment("token_name_cache_misses", len(to_find))
+
+        found = {}
+        if len(to_find) > 0:
+            stored_token_addresses = (
+                await self.connections.mongomoter.mainnet[
+                    Collections.tokens_token_addresses
+                ]
+                .find(
+                    {"_id": {"$in": to_find}},
+                    projection={"token_metadata.name": 1},
+                )
+                .to_list(length=None)
+            )
+            for stored_token_address in stored_token_addresses:
+                if stored_token_address.get("token_metadata"):
+                    token_name = stored_token_address["token_metadata"].get("name")
+                    self.token_names.put(stored_token_address["_id"], token_name)
+                    found[stored_token_address["_id"]] = token_name
+                else:
+                    found[stored_token_address["_id"]] = "Not yet available..."
+
+        token_names = {}
+        for token_address in token_addresses:
+            if token_address in found:
+                token_names[token_address] = found[token_address]
+            elif token_address in self.token_names:
+                token_names[token_address] = self.token_names.get(token_address)
+            else:
+                console.log(f"{token_address=} not found in Mongo collection yet.")
+                token_names[token_address] = None
+        return token_names
 
     async def find_events_in_logged_events(self, block: CCD_BlockComplete):
         if block.logged_events:
+            web23_domain_names = await self.find_web23_domain_names(block)
+            token_names = await self.token_names_for_block(block)
             for logged_event in block.logged_events:
                 logged_event: MongoTypeLoggedEvent
-                stored_token_address = self.connections.mongodb.mainnet[
-                    Collections.tokens_token_addresses
-                ].find_one({"_id": logged_event.token_address})
-                if stored_token_address:
-                    stored_token_address = MongoTypeTokenAddress(**stored_token_address)
-                    if stored_token_address.token_metadata:
-                        token_name = stored_token_address.token_metadata.name
-                    else:
-                        token_name = "Not yet available..."
-                else:
-                    console.log(
-                        f"{logged_event.token_address=} not found in Mongo collection yet."
-                    )
+                token_name = token_names[logged_event.token_address]
                 if (logged_event.contract == "<9377,0>") and (logged_event.tag == 254):
-                    domain_name = await self.find_web23_domain_name(
-                        logged_event.token_address
-                    )
+                    domain_name = web23_domain_names[logged_event.token_address]
                     if domain_name:
                         event_other = EventTypeOther(
                             domain_name_minted=domain_name,
@@ -417,7 +663,7 @@ class Mixin(Utils):
                             block_info=block.block_info,
                             impacted_addresses=impacted_addresses,
                         )
-                        self.event_queue.append(notification_event)
+                        self.add_notification_event_to_queue(notification_event)
 
                         # the TO account
                         impacted_addresses = [
@@ -440,7 +686,7 @@ class Mixin(Utils):
                             block_info=block.block_info,
                             impacted_addresses=impacted_addresses,
                         )
-                        self.event_queue.append(notification_event)
+                        self.add_notification_event_to_queue(notification_event)
 
                     elif logged_event.tag == 254:
                         if isinstance(logged_event.result, dict):
@@ -464,7 +710,7 @@ class Mixin(Utils):
                             block_info=block.block_info,
                             impacted_addresses=impacted_addresses,
                         )
-                        self.event_queue.append(notification_event)
+                        self.add_notification_event_to_queue(notification_event)
 
                     elif logged_event.tag == 253:
                         if isinstance(logged_event.result, dict):
@@ -489,90 +735,140 @@ class Mixin(Utils):
                             block_info=block.block_info,
                             impacted_addresses=impacted_addresses,
                         )
-                        self.event_queue.append(notification_event)
+                        self.add_notification_event_to_queue(notification_event)
+
+    async def pool_infos_for_payday(
+        self, pool_owners: list[int], last_block_of_payday_hash: str
+    ) -> dict[int, CCD_PoolInfo]:
+        pool_infos = await asyncio.gather(
+            *[
+                self.run_grpc(
+                    self.connections.grpcclient.get_pool_info_for_pool,
+                    pool_owner,
+                    last_block_of_payday_hash,
+                )
+                for pool_owner in pool_owners
+            ]
+        )
+        return dict(zip(pool_owners, pool_infos))
 
     async def find_events_in_block_special_events(self, block: CCD_BlockComplete):
-        if block.special_events:
-            last_block_of_payday_hash = (
-                self.connections.grpcclient.get_finalized_block_at_height(
-                    block.block_info.height - 1
-                ).hash
+        """
+        Payday rewards. Only payday blocks have these, for those all pool infos
+        are retrieved concurrently and all reward accounts are resolved in one
+        batch before the events are made. Events (and pool infos) are only made
+        for accounts and validators someone is subscribed to.
+        """
+        if not block.special_events:
+            return
+        account_ids = [Reward(x).account_reward() for x in block.special_events]
+        pool_owners = [Reward(x).pool_reward() for x in block.special_events]
+        if not any(account_ids) and not any(pool_owners):
+            return
+
+        start = time.perf_counter()
+        last_block_of_payday_hash = (
+            await self.run_grpc(
+                self.connections.grpcclient.get_finalized_block_at_height,
+                block.block_info.height - 1,
             )
-            # first fill the account reward dict for later lookup
-            # in pool reward loop
-            account_rewards_by_account_index = {}
-            for reward in block.special_events:
-                # Payday Account Rewards
-                account_id = Reward(reward).account_reward()
-                if account_id:
-                    from_nightly = self.nightly_accounts_by_account_id.get(account_id)
-                    if from_nightly:
-                        account_index = from_nightly["index"]
-                        account_rewards_by_account_index[account_index] = (
-                            reward.payday_account_reward
-                        )
+        ).hash
+        unique_account_ids = list(dict.fromkeys(x for x in account_ids if x))
+        account_indices = dict(
+            zip(
+                unique_account_ids,
+                await self.account_indices_for_addresses(unique_account_ids),
+            )
+        )
+        # first fill the account reward dict for later lookup
+        # in pool reward loop
+        account_rewards_by_account_index = {
+            account_indices[account_id]: reward.payday_account_reward
+            for account_id, reward in zip(account_ids, block.special_events)
+            if account_id
+        }
+
+        subscription_index: SubscriptionIndex = self.subscription_index
+        rewards = len([x for x in account_ids + pool_owners if x])
+        account_ids = [
+            x if x and subscription_index.watches_account(account_indices[x]) else None
+            for x in account_ids
+        ]
+        pool_owners = [
+            x if x and subscription_index.watches_validator(x) else None
+            for x in pool_owners
+        ]
+        self.metrics.increment(
+            "payday_rewards_skipped",
+            rewards - len([x for x in account_ids + pool_owners if x]),
+        )
+        pool_infos = await self.pool_infos_for_payday(
+            list(dict.fromkeys(x for x in pool_owners if x)),
+            last_block_of_payday_hash,
+        )
 
-            for reward in block.special_events:
-                # Payday Account Rewards
-                account_id = Reward(reward).account_reward()
-                if account_id:
-                    event_account = EventTypeAccount(
-                        payday_account_reward=CCD_BlockSpecialEvent_PaydayAccountReward(
-                            account=account_id,
-                            transaction_fees=reward.payday_account_reward.transaction_fees,
-                            baker_reward=reward.payday_account_reward.baker_reward,
-                            finalization_reward=reward.payday_account_reward.finalization_reward,
-                        )
+        for account_id, pool_owner, reward in zip(
+            account_ids, pool_owners, block.special_events
+        ):
+            # Payday Account Rewards
+            if account_id:
+                event_account = EventTypeAccount(
+                    payday_account_reward=CCD_BlockSpecialEvent_PaydayAccountReward(
+                        account=account_id,
+                        transaction_fees=reward.payday_account_reward.transaction_fees,
+                        baker_reward=reward.payday_account_reward.baker_reward,
+                        finalization_reward=reward.payday_account_reward.finalization_reward,
                     )
+                )
 
-                    notification_event = self.prepare_notification_event(
-                        EventType(account=event_account),
-                        block_info=block.block_info,
-                        tx_hash=None,
-                        impacted_addresses=[
-                            ImpactedAddress(
-                                address=self.complete_address(account_id),
-                                address_type=AddressType.account,
-                            )
-                        ],
-                    )
-                    self.add_notification_event_to_queue(notification_event)
+                notification_event = self.prepare_notification_event(
+                    EventType(account=event_account),
+                    block_info=block.block_info,
+                    tx_hash=None,
+                    impacted_addresses=[
+                        ImpactedAddress(
+                            address=CCD_Address_Complete(
+                                account=CCD_AccountAddress_Complete(
+                                    id=account_id, index=account_indices[account_id]
+                                )
+                            ),
+                            address_type=AddressType.account,
+                        )
+                    ],
+                )
+                self.add_notification_event_to_queue(notification_event)
 
-                # Payday Pools Rewards
-                pool_owner = Reward(reward).pool_reward()
-                if pool_owner:
-                    corresponding_account_reward = account_rewards_by_account_index.get(
-                        pool_owner
-                    )
+            # Payday Pools Rewards
+            if pool_owner:
+                corresponding_account_reward = account_rewards_by_account_index.get(
+                    pool_owner
+                )
 
-                    pool_info = self.connections.grpcclient.get_pool_info_for_pool(
-                        pool_owner,
-                        last_block_of_payday_hash,
-                    )
+                event_validator = EventTypeValidator(
+                    pool_info=pool_infos[pool_owner],
+                    corresponding_account_reward=corresponding_account_reward,
+                    payday_pool_reward=CCD_BlockSpecialEvent_PaydayPoolReward(
+                        pool_owner=pool_owner,
+                        transaction_fees=reward.payday_pool_reward.transaction_fees,
+                        baker_reward=reward.payday_pool_reward.baker_reward,
+                        finalization_reward=reward.payday_pool_reward.finalization_reward,
+                    ),
+                )
 
-                    event_validator = EventTypeValidator(
-                        pool_info=pool_info,
-                        corresponding_account_reward=corresponding_account_reward,
-                        payday_pool_reward=CCD_BlockSpecialEvent_PaydayPoolReward(
-                            pool_owner=pool_owner,
-                            transaction_fees=reward.payday_pool_reward.transaction_fees,
-                            baker_reward=reward.payday_pool_reward.baker_reward,
-                            finalization_reward=reward.payday_pool_reward.finalization_reward,
-                        ),
-                    )
+                notification_event = self.prepare_notification_event(
+                    EventType(validator=event_validator),
+                    block_info=block.block_info,
+                    tx_hash=None,
+                    impacted_addresses=[
+                        ImpactedAddress(
+                            address=self.complete_address(pool_owner),
+                            address_type=AddressType.validator,
+                        )
+                    ],
+                )
+                self.add_notification_event_to_queue(notification_event)
 
-                    notification_event = self.prepare_notification_event(
-                        EventType(validator=event_validator),
-                        block_info=block.block_info,
-                        tx_hash=None,
-                        impacted_addresses=[
-                            ImpactedAddress(
-                                address=self.complete_address(pool_owner),
-                                address_type=AddressType.validator,
-                            )
-                        ],
-                    )
-                    self.add_notification_event_to_queue(notification_event)
+        self.metrics.set_gauge("payday_processing_seconds", time.perf_counter() - start)
 
     async def find_events_in_block_transactions(self, block: CCD_BlockComplete):
         self.connections: Connections
@@ -582,6 +878,8 @@ class Mixin(Utils):
         # Hence, we need to make sure for some of the transaction types
         # that the correct impacted address is first in the list (with the correct
         # address type).
+        account_infos = await self.prefetch_account_infos(block)
+        pool_delegators: dict[int, list[CCD_AccountIndex]] = {}
 
         for tx in block.transaction_summaries:
             if tx.account_transaction:
@@ -607,7 +905,8 @@ class Mixin(Utils):
                         # We need to change the AddressType to Validator.
                         impacted_addresses[0].address_type = AddressType.validator
                         account_info_parent_block = (
-                            self.connections.grpcclient.get_account_info(
+                            self.account_info_at(
+                                account_infos,
                                 block.block_info.parent_block,
                                 tx.account_transaction.sender,
                             )
@@ -623,8 +922,10 @@ class Mixin(Utils):
                     if field_set == "delegation_configured":
                         # this should lead to a notification to the target pool!
                         account_info_delegator = (
-                            self.connections.grpcclient.get_account_info(
-                                block.block_info.hash, tx.account_transaction.sender
+                            self.account_info_at(
+                                account_infos,
+                                block.block_info.hash,
+                                tx.account_transaction.sender,
                             )
                         )
                         impacted_addresses[0].address_type = AddressType.delegator
@@ -637,7 +938,8 @@ class Mixin(Utils):
                                 )
 
                         account_info_parent_block = (
-                            self.connections.grpcclient.get_account_info(
+                            self.account_info_at(
+                                account_infos,
                                 block.block_info.parent_block,
                                 tx.account_transaction.sender,
                             )
@@ -766,12 +1068,15 @@ class Mixin(Utils):
                     if field_set == "delegation_configured":
                         impacted_addresses[0].address_type = AddressType.delegator
                         account_info_delegator = (
-                            self.connections.grpcclient.get_account_info(
-                                block.block_info.hash, tx.account_transaction.sender
+                            self.account_info_at(
+                                account_infos,
+                                block.block_info.hash,
+                                tx.account_transaction.sender,
                             )
                         )
                         account_info_parent_block = (
-                            self.connections.grpcclient.get_account_info(
+                            self.account_info_at(
+                                account_infos,
                                 block.block_info.parent_block,
                                 tx.account_transaction.sender,
                             )
@@ -804,7 +1109,8 @@ class Mixin(Utils):
                     ):
                         impacted_addresses[0].address_type = AddressType.validator
                         account_info_parent_block = (
-                            self.connections.grpcclient.get_account_info(
+                            self.account_info_at(
+                                account_infos,
                                 block.block_info.parent_block,
                                 tx.account_transaction.sender,
                             )
@@ -814,8 +1120,8 @@ class Mixin(Utils):
                                 account_info_parent_block.stake.baker
                             )
 
-                        commission_changed_object = self.find_commission_changed(
-                            event_account, self.connections.grpcclient
+                        commission_changed_object = await self.find_commission_changed(
+                            event_account, pool_delegators
                         )
 
                         if commission_changed_object:
@@ -886,7 +1192,8 @@ class Mixin(Utils):
                     ):
                         impacted_addresses[0].address_type = AddressType.validator
                         account_info_parent_block = (
-                            self.connections.grpcclient.get_account_info(
+                            self.account_info_at(
+                                account_infos,
                                 block.block_info.parent_block,
                                 tx.account_transaction.sender,
                             )
@@ -901,8 +1208,10 @@ class Mixin(Utils):
                         lowered_stake_object = self.define_lowered_stake_amount(
                             event_other
                         )
-                        commission_changed_object = self.find_commission_changed(
-                            event_other, self.connections.grpcclient
+                        commission_changed_object = (
+                            await self.find_commission_changed(
+                                event_other, pool_delegators
+                            )
                         )
 
                         if lowered_stake_object:
@@ -1043,9 +1352,12 @@ class Mixin(Utils):
                     self.add_notification_event_to_queue(notification_event)
 
             elif tx.account_creation:
+                address = self.complete_address(tx.account_creation.address)
+                # so the new account resolves without the node from now on.
+                self.nightly_accounts.add(address.account.id, address.account.index)
                 impacted_addresses = [
                     ImpactedAddress(
-                        address=self.complete_address(tx.account_creation.address),
+                        address=address,
                         address_type=AddressType.sender,
                     )
                 ]
@@ -1070,14 +1382,29 @@ class Mixin(Utils):
             )
         )
 
-    def update_helper(self, id: str, replacement_value: dict, net: str):
+    async def commit_checkpoint(self):
+        """Writes the processed height to `bot_last_processed_block`, if it advanced."""
+        pending = self.checkpoints.take()
+        if pending is None:
+            return
+        height, net = pending
+        bot_last_processed_block = {
+            "_id": "bot_last_processed_block",
+            "height": height,
+        }
+        await self.update_helper(
+            "bot_last_processed_block", bot_last_processed_block, net
+        )
+        self.metrics.increment("checkpoints_written")
+
+    async def update_helper(self, id: str, replacement_value: dict, net: str):
         db_to_use = (
-            self.connections.mongodb.mainnet
+            self.connections.mongomoter.mainnet
             if net == "mainnet"
-            else self.connections.mongodb.testnet
+            else self.connections.mongomoter.testnet
         )
         query = {"_id": id}
-        db_to_use[Collections.helpers].replace_one(
+        await db_to_use[Collections.helpers].replace_one(
             query,
             replacement_value,
             upsert=True,
@@ -1088,9 +1415,17 @@ class Mixin(Utils):
                 tz=dt.timezone.utc
             )
 
+    async def write_metrics_to_helpers(self, context: ContextTypes.DEFAULT_TYPE):
+        net = NET(context.bot_data["net"]).value
+        try:
+            await self.update_helper(
+                "bot_metrics", {"_id": "bot_metrics", **self.metrics.snapshot()}, net
+            )
+        except Exception as e:
+            console.log(e)
+
     async def log_error(self, error, block: CCD_BlockComplete, caller: str):
         console.log(f"{caller} has FAILED with {error}.")
-        self.exception_raised = True
         self.connections.tooter.relay(
             channel=TooterChannel.BOT,
             title="",
@@ -1099,52 +1434,66 @@ class Mixin(Utils):
             notifier_type=TooterType.BOT_MAIN_LOOP_ERROR,
         )
 
-    async def process_new_blocks(self, context: ContextTypes.DEFAULT_TYPE):
-        self.full_blocks_to_process: list
+    async def process_block(
+        self, block: CCD_BlockComplete
+    ) -> tuple[list[NotificationEvent], bool]:
+        """
+        Runs all event extractors for this block concurrently and returns the
+        NotificationEvents found and whether all extractors succeeded.
+
+        Events are returned in extractor order (validator, transactions,
+        special events, logged events), and within an extractor in the order
+        it found them, as if the extractors ran one after another.
+        """
+        notification_events = []
+        completed = True
+        if NET(block.net) == NET.MAINNET:
+            for events, succeeded in await asyncio.gather(
+                self.run_extractor(self.process_block_for_baker, block),
+                self.run_extractor(self.find_events_in_block_transactions, block),
+                self.run_extractor(self.find_events_in_block_special_events, block),
+                self.run_extractor(self.find_events_in_logged_events, block),
+            ):
+                notification_events.extend(events)
+                completed = completed and succeeded
+
+        # hand over events added by other jobs (dashboard nodes) as well.
+        notification_events.extend(self.event_queue)
+        self.event_queue = []
+
+        return notification_events, completed
+
+    async def run_extractor(
+        self, extractor, block: CCD_BlockComplete
+    ) -> tuple[list[NotificationEvent], bool]:
+        """
+        Runs one extractor (in its own task, from `asyncio.gather`) and returns
+        the events it found and whether it succeeded.
+        """
+        events: list[NotificationEvent] = []
+        extractor_events.set(events)
         try:
-            while len(self.full_blocks_to_process) > 0:
-                self.processing = True
-                self.exception_raised = False
-                block: CCD_BlockComplete = self.full_blocks_to_process.pop(0)
-                if NET(block.net) == NET.MAINNET:
-                    try:
-                        await self.process_block_for_baker(block)
-                    except Exception as ex:
-                        self.log_error(ex, block, "process_block_for_baker")
-                    try:
-                        await self.find_events_in_block_transactions(block)
-                    except Exception as ex:
-                        self.log_error(ex, block, "find_events_in_block_transactions")
-                    try:
-                        await self.find_events_in_block_special_events(block)
-                    except Exception as ex:
-                        self.log_error(ex, block, "find_events_in_block_special_events")
-                    try:
-                        await self.find_events_in_logged_events(block)
-                    except Exception as ex:
-                        self.log_error(ex, block, "find_events_in_logged_events")
-
-                if not self.exception_raised:
-                    bot_last_processed_block = {
-                        "_id": "bot_last_processed_block",
-                        "height": block.block_info.height,
-                    }
-                    self.update_helper(
-                        "bot_last_processed_block", bot_last_processed_block, block.net
-                    )
-                    console.log(
-                        f"Pro: {block.block_info.height:,.0f} | Remaining: {len(self.full_blocks_to_process):4,.0f} block(s)",
-                        end=" | ",
-                    )
-
-            self.processing = False
+            await extractor(block)
+            return events, True
         except Exception as ex:
-            self.log_error(ex, block, "process_new_blocks")
-            # console.log(f"process_new_blocks has FAILED with {ex}.")
-            # self.connections.tooter.relay(
-            #     channel=TooterChannel.BOT,
-            #     title="Failed in process new blocks",
-            #     chat_id=913126895,
-            #     body=f"process_new_blocks has FAILED with {ex}. {block.model_dump(exclude_none=True)}",
-            #     notifier_type=TooterType.BOT_MAIN_LOOP_ERROR,
-            # )
+            await self.log_error(ex, block, extractor.__name__)
+            return events, False
+
+    async def checkpoint_block(self, block: CCD_BlockComplete):
+        """
+        Marks this block as processed. Only called once the messages for this
+        block are in the outbox. `bot_last_processed_block` is written when the
+        checkpoint manager says so (see `CheckpointManager`).
+        """
+        self.last_processed_block_height = block.block_info.height
+        self.last_processed_block_slot_time = block.block_info.slot_time
+        # the heartbeat check looks at processing, not at writing checkpoints.
+        self.internal_freqency_timer = dt.datetime.now().astimezone(
+            tz=dt.timezone.utc
+        )
+        if self.checkpoints.advance(block.block_info.height, block.net):
+            await self.commit_checkpoint()
+        console.log(
+            f"Pro: {block.block_info.height:,.0f} | Remaining: {self.block_queue.qsize():4,.0f} block(s)",
+            end=" | ",
+        )
@@ -0,0 +1,53 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+
+class CatchUpWindow:
+    """
+    Determines how many blocks to retrieve in one step.
+
+    At the tip of the chain we step one block at a time. When the bot is behind
+    (after a restart or an outage), the window doubles every step until it
+    either covers the backlog or hits `max_blocks`. The window is further capped
+    by `memory_budget_bytes`, using a moving average of the size of the
+    documents retrieved per block and the number of blocks still waiting to be
+    processed.
+    """
+
+    def __init__(self, max_blocks: int, memory_budget_bytes: int):
+        self.max_blocks = max(1, max_blocks)
+        self.memory_budget_bytes = memory_budget_bytes
+        self.size = 1
+        self.average_block_bytes: float | None = None
+
+    def record_fetch(self, block_count: int, fetched_bytes: int):
+        if block_count == 0:
+            return
+        bytes_per_block = fetched_bytes / block_count
+        if self.average_block_bytes is None:
+            self.average_block_bytes = bytes_per_block
+        else:
+            self.average_block_bytes = (
+                0.8 * self.average_block_bytes + 0.2 * bytes_per_block
+            )
+
+    def next_step(self, lag_in_blocks: int, pending_blocks: int = 0) -> int:
+        if lag_in_blocks <= 0:
+            self.size = 1
+            return 0
+
+        if lag_in_blocks > self.size:
+            self.size = min(self.size * 2, self.max_blocks)
+        else:
+            self.size = max(1, lag_in_blocks)
+
+        step = min(self.size, lag_in_blocks)
+        if self.average_block_bytes:
+            blocks_within_budget = (
+                int(self.memory_budget_bytes // self.average_block_bytes)
+                - pending_blocks
+            )
+            if blocks_within_budget < 1:
+                # always make progress if nothing is waiting to be processed.
+                return 1 if pending_blocks == 0 else 0
+            step = min(step, blocks_within_budget)
+        return step
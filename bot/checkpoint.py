@@ -0,0 +1,55 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+import time
+from typing import Callable
+
+
+class CheckpointManager:
+    """
+    Decides when the processed height is written to `bot_last_processed_block`:
+    once `max_blocks` blocks have been processed since the last write, or
+    `max_seconds` have passed. In between, the height is only kept here.
+
+    A block is only passed to `advance` once its messages are in the outbox.
+    After a restart, the blocks since the last write are processed again,
+    which doesn't send their messages twice (see `outbox_logic`).
+    """
+
+    def __init__(
+        self,
+        max_blocks: int,
+        max_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_blocks = max(1, max_blocks)
+        self.max_seconds = max_seconds
+        self.clock = clock
+        self.pending_height: int | None = None
+        self.pending_net: str | None = None
+        self.pending_blocks = 0
+        self.last_commit = clock()
+
+    def advance(self, height: int, net: str) -> bool:
+        """Records the processed height. Returns whether it should be written now."""
+        self.pending_height = height
+        self.pending_net = net
+        self.pending_blocks += 1
+        return self.is_due()
+
+    def is_due(self) -> bool:
+        if self.pending_height is None:
+            return False
+        return (self.pending_blocks >= self.max_blocks) or (
+            self.clock() - self.last_commit >= self.max_seconds
+        )
+
+    def take(self) -> tuple[int, str] | None:
+        """Returns the height (and net) to write, if any, and resets."""
+        if self.pending_height is None:
+            return None
+        pending = (self.pending_height, self.pending_net)
+        self.pending_height = None
+        self.pending_net = None
+        self.pending_blocks = 0
+        self.last_commit = self.clock()
+        return pending
@@ -0,0 +1,218 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+import asyncio
+import time
+
+import aiohttp
+from pydantic import BaseModel
+from rich.console import Console
+from ccdexplorer_fundamentals.tooter import Tooter, TooterChannel
+from ccdexplorer_fundamentals.user_v2 import NotificationServices, UserV2
+
+from env import *
+from notification_classes import *
+from .outbox_logic import OutboxMessage
+from .rate_limit import ChatRateLimiter
+
+console = Console()
+
+# As added by `Tooter.email`.
+EMAIL_SIGNATURE = """
+Please visit your <a href='https://ccdexplorer.io/settings/user/overview'>account</a> to adjust notification settings.
+
+        """
+
+# Retrying a message must end well before its outbox lease expires, or
+# another worker claims and sends it again.
+DELIVERY_RETRY_BUDGET = OUTBOX_LEASE_SECONDS / 2
+
+
+class DeliveryError(Exception):
+    """A message could not be delivered. `retry` is set for 429 and 5xx."""
+
+    def __init__(self, message: str, retry: bool, retry_after: float | None = None):
+        super().__init__(message)
+        self.retry = retry
+        self.retry_after = retry_after
+
+
+class DeliveryResult(BaseModel):
+    """
+    Whether a message was delivered. If not, `retry_after` is how long to wait
+    before sending it again, if the service asked for more than the retry
+    budget allows.
+    """
+
+    delivered: bool
+    retry_after: float | None = None
+
+    def __bool__(self):
+        return self.delivered
+
+
+class Mixin:
+    """
+    Delivery of messages from the outbox to Telegram and email.
+
+    Each channel has its own queue and a fixed number of workers, so a large
+    fan-out is sent concurrently, but never with more than
+    DELIVERY_TELEGRAM_WORKERS / DELIVERY_EMAIL_WORKERS requests in flight.
+    Telegram messages are rate limited to Telegram's global and per chat
+    limits. Both channels are sent through the tooter service over the shared
+    HTTP session, with a timeout per request. Failed requests (429, 5xx,
+    connection errors, timeouts) are retried with exponential backoff, for at
+    most DELIVERY_RETRY_BUDGET seconds.
+    """
+
+    def setup_delivery(self):
+        self.telegram_queue: asyncio.Queue[OutboxMessage] = asyncio.Queue(
+            maxsize=PIPELINE_DELIVERY_QUEUE_SIZE
+        )
+        self.email_queue: asyncio.Queue[OutboxMessage] = asyncio.Queue(
+            maxsize=PIPELINE_DELIVERY_QUEUE_SIZE
+        )
+        # ids of the messages on the queues, which replay_outbox skips.
+        self.queued_outbox_ids: set[str] = set()
+        self.telegram_rate_limiter = ChatRateLimiter(
+            TELEGRAM_GLOBAL_RATE, TELEGRAM_PER_CHAT_RATE
+        )
+        self.http_session: aiohttp.ClientSession | None = None
+
+    def get_http_session(self) -> aiohttp.ClientSession:
+        if not self.http_session or self.http_session.closed:
+            self.http_session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=30)
+            )
+        return self.http_session
+
+    async def close_http_session(self):
+        if self.http_session and not self.http_session.closed:
+            await self.http_session.close()
+
+    def start_delivery_workers(self) -> list[asyncio.Task]:
+        return [
+            asyncio.create_task(self.telegram_worker(), name=f"telegram_worker_{i}")
+            for i in range(DELIVERY_TELEGRAM_WORKERS)
+        ] + [
+            asyncio.create_task(self.email_worker(), name=f"email_worker_{i}")
+            for i in range(DELIVERY_EMAIL_WORKERS)
+        ]
+
+    async def telegram_worker(self):
+        while True:
+            message: OutboxMessage = await self.telegram_queue.get()
+            try:
+                await self.deliver_outbox_message(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                console.log(f"telegram_worker has FAILED with {e}.")
+            finally:
+                self.queued_outbox_ids.discard(message.id)
+                self.telegram_queue.task_done()
+
+    async def email_worker(self):
+        while True:
+            message: OutboxMessage = await self.email_queue.get()
+            try:
+                await self.deliver_outbox_message(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                console.log(f"email_worker has FAILED with {e}.")
+            finally:
+                self.queued_outbox_ids.discard(message.id)
+                self.email_queue.task_done()
+
+    async def with_retries(self, channel: str, send) -> DeliveryResult:
+        """
+        Calls `send` until it succeeds, retrying with exponential backoff
+        if it raises a DeliveryError that can be retried (or a connection error).
+        Gives up if the next wait (or Retry-After) doesn't fit in the budget.
+        """
+        deadline = time.monotonic() + DELIVERY_RETRY_BUDGET
+        postpone = None
+        for attempt in range(DELIVERY_MAX_RETRIES + 1):
+            try:
+                await send()
+                self.metrics.increment(f"{channel}_delivered")
+                return DeliveryResult(delivered=True)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                retry_after = None
+                if isinstance(e, DeliveryError):
+                    if not e.retry:
+                        console.log(f"Delivery to {channel} has FAILED with {e}.")
+                        break
+                    retry_after = e.retry_after
+                if attempt == DELIVERY_MAX_RETRIES:
+                    console.log(
+                        f"Delivery to {channel} has FAILED with {e}, giving up after {attempt} retries."
+                    )
+                    break
+                delay = retry_after or DELIVERY_RETRY_BASE_DELAY * (2**attempt)
+                if time.monotonic() + delay + DELIVERY_REQUEST_TIMEOUT > deadline:
+                    console.log(
+                        f"Delivery to {channel} has FAILED with {e}, retrying in {delay:,.0f}s from the outbox."
+                    )
+                    postpone = delay
+                    break
+                self.metrics.increment(f"{channel}_retries")
+                await asyncio.sleep(delay)
+
+        self.metrics.increment(f"{channel}_failed")
+        return DeliveryResult(delivered=False, retry_after=postpone)
+
+    async def post_to_tooter(self, payload: dict, recipient: str | int):
+        """Raises a DeliveryError if the tooter service doesn't accept the message."""
+        tooter: Tooter = self.connections.tooter
+        async with self.get_http_session().post(
+            f"{tooter.plain_url}/notify",
+            json=payload,
+            timeout=aiohttp.ClientTimeout(total=DELIVERY_REQUEST_TIMEOUT),
+        ) as response:
+            if response.status == 200:
+                return
+            retry_after = response.headers.get("Retry-After")
+            raise DeliveryError(
+                f"Status code {response.status} for {recipient}",
+                retry=(response.status == 429) or (response.status >= 500),
+                retry_after=float(retry_after) if retry_after else None,
+            )
+
+    async def send_telegram(
+        self, chat_id: int, title: str, body: str
+    ) -> DeliveryResult:
+        # This is the request `Tooter.async_relay` makes, but it needs the
+        # status code to know whether to retry.
+        tooter: Tooter = self.connections.tooter
+        payload = {
+            "urls": f"tgram://{tooter.BOT_API_TOKEN}/{chat_id}",
+            "title": f"{title}<br/>",
+            "body": body,
+            "format": "html",
+        }
+
+        async def send():
+            await self.telegram_rate_limiter.acquire(chat_id)
+            await self.post_to_tooter(payload, chat_id)
+
+        return await self.with_retries("telegram", send)
+
+    async def send_email(
+        self, email_address: str, title: str, body: str
+    ) -> DeliveryResult:
+        # This is the request `Tooter.email` makes, which ignores the response.
+        tooter: Tooter = self.connections.tooter
+        payload = {
+            "urls": f"{tooter.email_part_1}{email_address}{tooter.email_part_2}",
+            "title": title,
+            "body": body + EMAIL_SIGNATURE,
+            "format": "html",
+        }
+
+        async def send():
+            await self.post_to_tooter(payload, email_address)
+
+        return await self.with_retries("email", send)
@@ -0,0 +1,75 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+import asyncio
+from collections import deque
+
+from pymongo import ReplaceOne
+from rich.console import Console
+
+from .metrics import Metrics
+
+console = Console()
+
+
+class MessageLogWriter:
+    """
+    Buffers `message_log` records and writes them in unordered bulk writes,
+    when `batch_size` records are waiting or every `flush_interval` seconds.
+
+    `add` never waits. If the buffer holds `max_buffer` records (Mongo is
+    down or slow), the oldest records are dropped and counted in
+    `message_log_dropped`. Records are upserted by `_id`, so logging the same
+    message again (e.g. when a block is processed again) doesn't duplicate it.
+    A batch that is being written when the writer is cancelled goes back into
+    the buffer, so `stop_pipeline` can still flush it.
+    """
+
+    def __init__(
+        self,
+        metrics: Metrics,
+        batch_size: int,
+        flush_interval: float,
+        max_buffer: int,
+    ):
+        self.metrics = metrics
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.records: deque[dict] = deque(maxlen=max_buffer)
+        self.batch_ready = asyncio.Event()
+
+    def add(self, record: dict):
+        if len(self.records) == self.records.maxlen:
+            self.metrics.increment("message_log_dropped")
+        self.records.append(record)
+        if len(self.records) >= self.batch_size:
+            self.batch_ready.set()
+
+    async def flush(self, collection):
+        while len(self.records) > 0:
+            batch = [
+                self.records.popleft()
+                for _ in range(min(self.batch_size, len(self.records)))
+            ]
+            try:
+                await collection.bulk_write(
+                    [ReplaceOne({"_id": x["_id"]}, x, upsert=True) for x in batch],
+                    ordered=False,
+                )
+                self.metrics.increment("message_log_written", len(batch))
+            except asyncio.CancelledError:
+                self.records.extendleft(reversed(batch))
+                raise
+            except Exception as e:
+                console.log(f"Writing to message_log has FAILED with {e}.")
+                self.metrics.increment("message_log_failed", len(batch))
+
+    async def run(self, collection):
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self.batch_ready.wait(), timeout=self.flush_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+            self.batch_ready.clear()
+            await self.flush(collection)
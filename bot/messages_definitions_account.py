@@ -34,6 +34,7 @@ from ccdexplorer_fundamentals.user_v2 import (
 if TYPE_CHECKING:
     from bot import Bot
 
+from .rendering import render_once
 from .utils import Utils as Utils
 
 console = Console()
@@ -42,6 +43,7 @@ console = Console()
 class MessageAccount(Utils):
     # this is located in the validator section
     # def define_delegation_configured_message(
+    @render_once()
     def define_delegation_configured_message(
         self,
         event_type: EventTypeValidator | EventTypeAccount,
@@ -127,6 +129,7 @@ class MessageAccount(Utils):
             }
         )
 
+    @render_once()
     def define_module_deployed_message(
         self, notification_event: NotificationEvent, user: UserV2
     ) -> MessageResponse:
@@ -157,6 +160,7 @@ Module: <a href="/mainnet/module/{event_type.module_deployed}">{event_type.modul
             }
         )
 
+    @render_once()
     def define_contract_initialized_message(
         self, notification_event: NotificationEvent, user: UserV2
     ) -> MessageResponse:
@@ -190,6 +194,7 @@ Module: <a href="/mainnet/module/{event_type.contract_initialized.origin_ref}">{
             }
         )
 
+    @render_once()
     def define_data_registered_message(
         self, notification_event: NotificationEvent, user: UserV2
     ) -> MessageResponse:
@@ -214,6 +219,7 @@ Data registered: <code>{e.data_registered}</code>
             }
         )
 
+    @render_once()
     def define_account_transfer_message(
         self, notification_event: NotificationEvent, user: UserV2
     ) -> MessageResponse:
@@ -236,6 +242,7 @@ Data registered: <code>{e.data_registered}</code>
             }
         )
 
+    @render_once()
     def define_token_event_message(
         self, notification_event: NotificationEvent, user: UserV2
     ) -> MessageResponse:
@@ -294,6 +301,7 @@ Token: {contract_info.display_name}<br/>
             }
         )
 
+    @render_once()
     def define_transferred_with_schedule_message(
         self, notification_event: NotificationEvent, user: UserV2
     ) -> MessageResponse:
@@ -353,6 +361,7 @@ Token: {contract_info.display_name}<br/>
             }
         )
 
+    @render_once()
     def define_payday_account_reward_message(
         self,
         event_type: EventTypeAccount,
@@ -437,6 +446,7 @@ Token: {contract_info.display_name}<br/>
             }
         )
 
+    @render_once()
     def define_validator_target_commission_changed_message(
         self,
         events: list[CCD_BakerEvent],
@@ -31,6 +31,7 @@ from ccdexplorer_fundamentals.user_v2 import (
     UserV2,
 )
 
+from .rendering import render_once
 from .utils import Utils as Utils
 
 if TYPE_CHECKING:
@@ -40,6 +41,7 @@ console = Console()
 
 
 class MessageContract(Utils):
+    @render_once()
     def define_contract_update_issued_message(
         self,
         event_type: EventTypeValidator | EventTypeAccount,
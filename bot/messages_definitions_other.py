@@ -30,6 +30,7 @@ from ccdexplorer_fundamentals.user_v2 import (
     NotificationServices,
     UserV2,
 )
+from .rendering import render_once
 from .utils import Utils as Utils
 
 if TYPE_CHECKING:
@@ -38,7 +39,24 @@ if TYPE_CHECKING:
 console = Console()
 
 
+def other_notification_limits(preference: str):
+    """
+    The user's telegram and email limits for this other notification
+    preference, these are shown in the footer.
+    """
+
+    def limits(user: UserV2):
+        preferences = getattr(user.other_notification_preferences, preference)
+        return (
+            preferences.telegram.limit if preferences.telegram else None,
+            preferences.email.limit if preferences.email else None,
+        )
+
+    return limits
+
+
 class MessageOther(Utils):
+    @render_once()
     def define_protocol_update_message(
         self, notification_event: NotificationEvent, user: UserV2
     ) -> MessageResponse:
@@ -66,6 +84,7 @@ Further info <a href='{event_type.protocol_update.specification_url}'>here</a>.
             }
         )
 
+    @render_once()
     def define_add_anonymity_revoker_update_message(
         self, notification_event: NotificationEvent, user: UserV2
     ) -> MessageResponse:
@@ -88,6 +107,7 @@ Description: {e.add_anonymity_revoker_update.description.description}<br/>
             }
         )
 
+    @render_once()
     def define_add_identity_provider_update_message(
         self, notification_event: NotificationEvent, user: UserV2
     ) -> MessageResponse:
@@ -110,6 +130,7 @@ Description: {e.add_identity_provider_update.description.description}<br/>
             }
         )
 
+    @render_once()
     def define_commission_changed_message(
         self,
         events: list[CCD_BakerEvent],
@@ -186,6 +207,7 @@ Finalization Reward Commission: <code>{event.baker_set_finalization_reward_commi
             }
         )
 
+    @render_once()
     def define_other_lowered_stake_message(
         self, notification_event: NotificationEvent, user: UserV2
     ) -> MessageResponse:
@@ -222,6 +244,7 @@ Finalization Reward Commission: <code>{event.baker_set_finalization_reward_commi
             }
         )
 
+    @render_once()
     def define_module_deployed_message(
         self, notification_event: NotificationEvent, user: UserV2
     ) -> MessageResponse:
@@ -251,6 +274,7 @@ Module: <a href="/mainnet/module/{event_type.module_deployed}">{event_type.modul
             }
         )
 
+    @render_once()
     def define_contract_initialized_message(
         self, notification_event: NotificationEvent, user: UserV2
     ) -> MessageResponse:
@@ -283,6 +307,7 @@ Module: <a href="/mainnet/module/{event_type.contract_initialized.origin_ref}">{
             }
         )
 
+    @render_once(personalized_by=other_notification_limits("account_transfer"))
     def define_account_transfer_message_for_other(
         self,
         event_type: EventTypeOther,
@@ -332,6 +357,9 @@ Module: <a href="/mainnet/module/{event_type.contract_initialized.origin_ref}">{
             }
         )
 
+    @render_once(
+        personalized_by=other_notification_limits("transferred_with_schedule")
+    )
     def define_transferred_with_schedule_message_for_other(
         self,
         event_type: EventTypeOther,
@@ -403,6 +431,7 @@ Module: <a href="/mainnet/module/{event_type.contract_initialized.origin_ref}">{
             }
         )
 
+    @render_once()
     def define_domain_name_minted_message(
         self, notification_event: NotificationEvent, user: UserV2
     ) -> MessageResponse:
@@ -423,6 +452,7 @@ Module: <a href="/mainnet/module/{event_type.contract_initialized.origin_ref}">{
             }
         )
 
+    @render_once()
     def define_account_created_message(
         self, notification_event: NotificationEvent, user: UserV2
     ) -> MessageResponse:
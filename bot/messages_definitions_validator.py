@@ -30,6 +30,7 @@ from ccdexplorer_fundamentals.user_v2 import (
     NotificationServices,
     UserV2,
 )
+from .rendering import render_once
 from .utils import Utils as Utils
 
 if TYPE_CHECKING:
@@ -39,6 +40,7 @@ console = Console()
 
 
 class MessageValidator(Utils):
+    @render_once()
     def define_delegation_configured_message(
         self,
         event_type: EventTypeValidator | EventTypeAccount,
@@ -122,6 +124,7 @@ class MessageValidator(Utils):
             }
         )
 
+    @render_once()
     def define_baker_configured_message(
         self,
         effects: CCD_AccountTransactionEffects,
@@ -273,6 +276,7 @@ Finalization Reward Commission: <code>{event.baker_set_finalization_reward_commi
             }
         )
 
+    @render_once()
     def define_block_baked_by_baker_message(
         self, notification_event: NotificationEvent, user: UserV2
     ) -> MessageResponse:
@@ -307,6 +311,7 @@ Earliest possible next block production in {self.verbose_timedelta(notification_
             }
         )
 
+    @render_once()
     def define_validator_running_behind_message(
         self, notification_event: NotificationEvent, user: UserV2
     ) -> MessageResponse:
@@ -335,6 +340,7 @@ Validator <code>{validator.label}</code> seems to be running behind <code>{notif
             }
         )
 
+    @render_once()
     def define_payday_pool_reward_message(
         self, notification_event: NotificationEvent, user: UserV2
     ) -> MessageResponse:
@@ -1,5 +1,6 @@
 # ruff: noqa: F403, F405, E402, E501, F401
 
+import asyncio
 from typing import TYPE_CHECKING
 from pydantic import BaseModel, ConfigDict
 from rich import print
@@ -27,6 +28,7 @@ from .messages_logic_account import ProcessAccount as ProcessAccount
 from .messages_logic_validator import ProcessValidator as ProcessValidator
 from .messages_logic_other import ProcessOther as ProcessOther
 from .messages_logic_contract import ProcessContract as ProcessContract
+from .outbox_logic import event_keys
 from .utils import Utils as Utils
 
 if TYPE_CHECKING:
@@ -51,69 +53,13 @@ class Mixin(ProcessContract, ProcessAccount, ProcessValidator, ProcessOther, Uti
         notification_event: NotificationEvent,
         notification_limit: int = None,
     ):
-        if notification_event.event_type.account:
-            pre_event = "Account - "
-            event_type: str = list(
-                EventTypeAccount(
-                    **notification_event.event_type.model_dump(exclude_none=True)[
-                        list(notification_event.event_type.model_fields_set)[0]
-                    ]
-                ).model_fields_set
-            )[0]
-            if event_type == "previous_block_validator_info":
-                event_type = "validator_commission_changed"
-            if event_type == "previous_block_account_info":
-                event_type = "delegation_configured"
-        if notification_event.event_type.validator:
-            pre_event = "Validator - "
-            event_type: str = list(
-                EventTypeValidator(
-                    **notification_event.event_type.model_dump(exclude_none=True)[
-                        list(notification_event.event_type.model_fields_set)[0]
-                    ]
-                ).model_fields_set
-            )[0]
-            if event_type in [
-                "earliest_win_time",
-                "current_block_pool_info",
-                "block_baked_by_baker",
-            ]:
-                event_type = "block_validated"
-            if event_type == "previous_block_account_info":
-                event_type = "delegation_configured"
-            if event_type == "previous_block_validator_info":
-                event_type = "validator_configured"
-            if event_type == "baker_configured":
-                event_type = "validator_configured"
-            if event_type == "corresponding_account_reward":
-                event_type = "payday_pool_reward"
-            if event_type == "pool_info":
-                event_type = "payday_pool_reward"
-        if notification_event.event_type.other:
-            pre_event = "General - "
-            event_type_list = list(
-                EventTypeOther(
-                    **notification_event.event_type.model_dump(exclude_none=True)[
-                        list(notification_event.event_type.model_fields_set)[0]
-                    ]
-                ).model_fields_set
-            )
-            event_type = event_type_list[0]
-            if "validator_commission_changed" in event_type_list:
-                event_type = "validator_commission_changed"
-            if "validator_lowered_stake" in event_type_list:
-                event_type = "validator_lowered_stake"
-        if notification_event.event_type.contract:
-            pre_event = "Contract - "
-            event_type: str = list(
-                EventTypeContract(
-                    **notification_event.event_type.model_dump(exclude_none=True)[
-                        list(notification_event.event_type.model_fields_set)[0]
-                    ]
-                ).model_fields_set
-            )[0]
-            if event_type == "receive_name":
-                event_type = "contract_update_issued"
+        pre_event = {
+            "account": "Account - ",
+            "validator": "Validator - ",
+            "contract": "Contract - ",
+            "other": "General - ",
+        }[notification_event.category]
+        event_type = notification_event.kind
         footer_event_type = f"Notification type: {pre_event}{event_type.capitalize().replace('_', ' ')}<br/>"
         footer_tx = (
             f"Transaction: <a href='https://ccdexplorer.io/mainnet/transaction/{notification_event.tx_hash}'>{notification_event.tx_hash[:8]}</a><br/>"
@@ -242,63 +188,81 @@ class Mixin(ProcessContract, ProcessAccount, ProcessValidator, ProcessOther, Uti
         events. If so, we will send the notification to the selected service(s).
         """
         self.event_queue: list[NotificationEvent]
-        self.users: dict[str:UserV2]
         while len(self.event_queue) > 0:
             notification_event: NotificationEvent = self.event_queue.pop(0)
-            notification_to_be_sent = False
-            message_response_to_be_sent = None
-            for user in self.users.values():
-                user: UserV2
-                (
-                    message_response,
-                    notification_services_to_send,
-                ) = await self.determine_if_user_should_be_notified_of_event(
-                    user, notification_event
+            for (
+                user,
+                notification_services_to_send,
+                message_response,
+            ) in await self.match_notification_event(notification_event):
+                await self.send_to_services(
+                    user, notification_services_to_send, message_response
+                )
+
+    async def match_notification_event(
+        self, notification_event: NotificationEvent, key: str | None = None
+    ) -> list[tuple[UserV2, dict[NotificationServices:bool], MessageResponse]]:
+        """
+        Determines for all users whether we should be notifying them of this
+        NotificationEvent. Returns the user, the service(s) to send to and the
+        message for every user that needs to be notified.
+
+        Only users that have preferences for the impacted account, validator,
+        contract method or other event type (see `SubscriptionIndex`) are checked.
+        Every notification is logged to `message_log`, under `key` (see `event_keys`).
+        """
+        self.users: dict[str:UserV2]
+        notifications_to_send = []
+        for user_key in self.subscription_index.users_for_event(notification_event):
+            user: UserV2 = self.users[user_key]
+            (
+                message_response,
+                notification_services_to_send,
+            ) = await self.determine_if_user_should_be_notified_of_event(
+                user, notification_event
+            )
+            if message_response:
+                console.log(f"send notification to {user.token}")
+                notifications_to_send.append(
+                    (user, notification_services_to_send, message_response)
                 )
-                if message_response:
-                    notification_to_be_sent = True
-                    message_response_to_be_sent = message_response
-                    console.log(f"send notification to {user.token}")
-                    await self.send_to_services(
-                        user, notification_services_to_send, message_response
-                    )
-            if notification_to_be_sent and message_response_to_be_sent:
-                if "pytest" not in sys.modules:
-                    if ENVIRONMENT != "dev":
+        if len(notifications_to_send) > 0:
+            if "pytest" not in sys.modules:
+                if ENVIRONMENT != "dev":
+                    if key is None:
+                        key = event_keys([notification_event])[0]
+                    event_dump = notification_event.model_dump(exclude_none=True)
+                    for user, _, message_response in notifications_to_send:
                         try:
                             self.send_to_collection(
-                                user,
-                                notification_event,
-                                message_response_to_be_sent,
+                                key, user, event_dump, message_response
                             )
                         except Exception as e:
                             console.log(e)
+        return notifications_to_send
 
     def send_to_collection(
         self,
+        key: str,
         user: UserV2,
-        notification_event: NotificationEvent,
+        event_dump: dict,
         message_response: MessageResponse,
     ):
         """
-        Sends a log to the collection.
+        Adds a log record for this event and user, the log writer writes it
+        to the collection.
         """
-        event_dump = notification_event.model_dump(exclude_none=True)
         if message_response:
             message_response_dump = message_response.model_dump(exclude_none=True)
         else:
             message_response_dump = ""
-        event_dump["message_response"] = message_response_dump
-        event_dump["user_token"] = user.token
-        _id = f"{notification_event.block_hash}-{user.token}"
-        self.connections.mongodb.utilities[CollectionsUtilities.message_log].bulk_write(
-            [
-                ReplaceOne(
-                    {"_id": _id},
-                    event_dump,
-                    upsert=True,
-                )
-            ]
+        self.message_log.add(
+            {
+                **event_dump,
+                "_id": f"{key}-{user.token}",
+                "message_response": message_response_dump,
+                "user_token": user.token,
+            }
         )
 
     async def determine_if_user_should_be_notified_of_event(
@@ -309,15 +273,15 @@ class Mixin(ProcessContract, ProcessAccount, ProcessValidator, ProcessOther, Uti
         and notification if we need to send this notification and to which
         service(s).
 
-        In an EventType, we set only one of the three main properties
-        account, validator, other. The variable field_set contains the property
-        that we have set.
+        In an EventType, we set only one of the main properties
+        account, validator, contract, other. The event's category contains the
+        property that we have set.
         """
         self.connections: Connections
         message_response: MessageResponse | None = None
         notification_services_to_send = None
 
-        field_set = list(event.event_type.model_fields_set)[0]
+        field_set = event.category
 
         if field_set == "other" and user.other_notification_preferences:
             (
@@ -353,23 +317,27 @@ class Mixin(ProcessContract, ProcessAccount, ProcessValidator, ProcessOther, Uti
         notification_services_to_send: dict[NotificationServices:bool],
         message_response: MessageResponse,
     ):
+        sends = []
         if (
             notification_services_to_send[NotificationServices.telegram]
             and user.telegram_chat_id
         ):
-            await self.connections.tooter.async_relay(
-                channel=TooterChannel.BOT,
-                title=message_response.title_telegram,
-                chat_id=user.telegram_chat_id,
-                body=message_response.message_telegram,
-                notifier_type=TooterType.INFO,
+            sends.append(
+                self.send_telegram(
+                    user.telegram_chat_id,
+                    message_response.title_telegram,
+                    message_response.message_telegram,
+                )
             )
         if (
             notification_services_to_send[NotificationServices.email]
             and user.email_address
         ):
-            self.connections.tooter.email(
-                title=message_response.title_email,
-                body=message_response.message_email,
-                email_address=user.email_address,
+            sends.append(
+                self.send_email(
+                    user.email_address,
+                    message_response.title_email,
+                    message_response.message_email,
+                )
             )
+        await asyncio.gather(*sends)
@@ -26,11 +26,7 @@ class ProcessAccount(MessageAccount, Utils):
     ):
         message_response = None
         notification_services_to_send = None
-        event_type = EventTypeAccount(
-            **notification_event.event_type.model_dump()[
-                list(notification_event.event_type.model_fields_set)[0]
-            ]
-        )
+        event_type: EventTypeAccount = notification_event.sub_type
         account_index = (
             notification_event.impacted_addresses[0].address.account.index
             if notification_event.impacted_addresses[0].address.account
@@ -26,11 +26,7 @@ class ProcessContract(MessageContract, Utils):
     ):
         message_response = None
         notification_services_to_send = None
-        event_type = EventTypeContract(
-            **notification_event.event_type.model_dump()[
-                list(notification_event.event_type.model_fields_set)[0]
-            ]
-        )
+        event_type: EventTypeContract = notification_event.sub_type
         ia = notification_event.impacted_addresses[0]
         if ia.address_type == AddressType.contract:
             contract_index = (
@@ -25,11 +25,7 @@ class ProcessOther(MessageOther, Utils):
     ):
         message_response = None
         notification_services_to_send = None
-        event_type = EventTypeOther(
-            **notification_event.event_type.model_dump()[
-                list(notification_event.event_type.model_fields_set)[0]
-            ]
-        )
+        event_type: EventTypeOther = notification_event.sub_type
         if (
             event_type.protocol_update
             and user.other_notification_preferences.protocol_update
@@ -25,11 +25,7 @@ class ProcessValidator(MessageValidator, Utils):
     ):
         message_response = None
         notification_services_to_send = None
-        event_type = EventTypeValidator(
-            **notification_event.event_type.model_dump()[
-                list(notification_event.event_type.model_fields_set)[0]
-            ]
-        )
+        event_type: EventTypeValidator = notification_event.sub_type
 
         # We will use the first impacted address for determining whether a user
         # should be notified.
@@ -0,0 +1,34 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+from collections import OrderedDict
+
+
+class MetadataCache:
+    """
+    Bounded LRU cache of token metadata (e.g. the name of a web23 domain)
+    by token address. Token metadata doesn't change once it is set, so
+    entries don't expire. A value can be None, use `in` to check if a token
+    address is cached.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries: OrderedDict[str, str | None] = OrderedDict()
+
+    def get(self, token_address: str) -> str | None:
+        if token_address not in self.entries:
+            return None
+        self.entries.move_to_end(token_address)
+        return self.entries[token_address]
+
+    def put(self, token_address: str, value: str | None):
+        self.entries[token_address] = value
+        self.entries.move_to_end(token_address)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def __contains__(self, token_address: str) -> bool:
+        return token_address in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -0,0 +1,27 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+import datetime as dt
+
+
+class Metrics:
+    """
+    In-memory gauges and counters for the bot. A snapshot is periodically
+    written to the helpers collection (see `write_metrics_to_helpers`).
+    """
+
+    def __init__(self):
+        self.gauges: dict[str, float] = {}
+        self.counters: dict[str, int] = {}
+
+    def set_gauge(self, name: str, value: float):
+        self.gauges[name] = value
+
+    def increment(self, name: str, value: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self) -> dict:
+        return {
+            "gauges": dict(self.gauges),
+            "counters": dict(self.counters),
+            "timestamp": dt.datetime.now().astimezone(tz=dt.timezone.utc),
+        }
@@ -0,0 +1,60 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+from typing import Iterable
+
+# the only fields of a nightly_accounts document the bot needs.
+NIGHTLY_ACCOUNTS_PROJECTION = {"_id": 1, "index": 1}
+
+
+class NightlyAccountIndex:
+    """
+    Account address <-> account index for all accounts in the nightly_accounts
+    collection.
+
+    Account indices are consecutive, so index -> address is a list indexed by
+    account index. address -> index is a dict. Both refer to the same address
+    strings, so every address is stored once.
+
+    Accounts created after the nightly run are added as the bot sees their
+    account creation transactions. `max_collection_index` is the highest
+    index read from the collection, later reads only need the accounts after it.
+    """
+
+    def __init__(self):
+        self.addresses: list[str | None] = []
+        self.indices: dict[str, int] = {}
+        self.max_collection_index = -1
+
+    @classmethod
+    def from_documents(cls, nightly_accounts: Iterable[dict]) -> "NightlyAccountIndex":
+        """Builds the index in one pass over (projected) nightly_accounts documents."""
+        index = cls()
+        index.add_documents(nightly_accounts)
+        return index
+
+    def add_documents(self, nightly_accounts: Iterable[dict]):
+        for nightly_account in nightly_accounts:
+            self.add_document(nightly_account)
+
+    def add_document(self, nightly_account: dict):
+        self.add(nightly_account["_id"], nightly_account["index"])
+        self.max_collection_index = max(
+            self.max_collection_index, nightly_account["index"]
+        )
+
+    def add(self, account_address: str, account_index: int):
+        if account_index >= len(self.addresses):
+            self.addresses.extend([None] * (account_index + 1 - len(self.addresses)))
+        self.addresses[account_index] = account_address
+        self.indices[account_address] = account_index
+
+    def index_for(self, account_address: str) -> int | None:
+        return self.indices.get(account_address)
+
+    def address_for(self, account_index: int) -> str | None:
+        if 0 <= account_index < len(self.addresses):
+            return self.addresses[account_index]
+        return None
+
+    def __len__(self) -> int:
+        return len(self.indices)
@@ -66,19 +66,17 @@ class Mixin:
         try:
             net = NET(context.bot_data["net"]).value
             db_to_use = (
-                self.connections.mongodb.mainnet
+                self.connections.mongomoter.mainnet
                 if net == "mainnet"
-                else self.connections.mongodb.testnet
+                else self.connections.mongomoter.testnet
             )
 
-            result = db_to_use[Collections.blocks].aggregate(
-                [{"$sort": {"height": -1}}, {"$limit": 1}]
-            )
-
-            if result:
-                last_block_info = CCD_BlockInfo(**list(result)[0])
+            # the fetch stage keeps track of the last block in the collection.
+            last_block_info = self.last_known_block_info
+            if not last_block_info:
+                last_block_info = await self.get_last_block_info(db_to_use)
 
-            heartbeat_last_timestamp_dashboard_nodes = db_to_use[
+            heartbeat_last_timestamp_dashboard_nodes = await db_to_use[
                 Collections.helpers
             ].find_one({"_id": "heartbeat_last_timestamp_dashboard_nodes"})
             heartbeat_last_timestamp_dashboard_nodes: dt.datetime = (
@@ -89,10 +87,14 @@ class Mixin:
             now = dt.datetime.now().astimezone(tz=dt.timezone.utc)
 
             if (now - heartbeat_last_timestamp_dashboard_nodes).seconds < (5 * 60):
-                result = db_to_use[Collections.dashboard_nodes].find({})
+                result = (
+                    await db_to_use[Collections.dashboard_nodes]
+                    .find({})
+                    .to_list(length=None)
+                )
 
                 if result:
-                    for raw_node in list(result):
+                    for raw_node in result:
                         node = ConcordiumNodeFromDashboard(**raw_node)
                         node_last_finalized_block_height = node.finalizedBlockHeight
                         heartbeat_last_finalized_block_height = last_block_info.height
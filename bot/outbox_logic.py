@@ -0,0 +1,365 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+import asyncio
+import hashlib
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+from rich.console import Console
+from ccdexplorer_fundamentals.user_v2 import NotificationServices, UserV2
+
+from env import *
+from notification_classes import *
+
+console = Console()
+
+OUTBOX_COLLECTION = "bot_outbox"
+
+
+class OutboxStatus(str, Enum):
+    pending = "pending"
+    sending = "sending"
+    delivered = "delivered"
+    failed = "failed"
+    abandoned = "abandoned"
+
+
+class OutboxMessage(BaseModel):
+    """
+    A message to a single user on a single channel. The id is derived from
+    the event and the user, so writing the same message twice is a no-op.
+    """
+
+    model_config = ConfigDict(populate_by_name=True, use_enum_values=True)
+
+    id: str = Field(alias="_id")
+    event_key: str
+    user_key: str
+    channel: NotificationServices
+    recipient: str | int
+    title: str
+    body: str
+    block_height: int
+    status: OutboxStatus = OutboxStatus.pending
+    attempts: int = 0
+    created_at: dt.datetime
+    lease_until: Optional[dt.datetime] = None
+    next_attempt_at: Optional[dt.datetime] = None
+    delivered_at: Optional[dt.datetime] = None
+    abandoned_at: Optional[dt.datetime] = None
+
+
+def event_keys(notification_events: list[NotificationEvent]) -> list[str]:
+    """
+    Identifies events by the block they were found in, their kind, the
+    transaction and the impacted addresses, so processing a block again
+    gives the same keys. Events that are the same on all of these get a
+    sequence number.
+    """
+    keys = []
+    seen: dict[str, int] = {}
+    for notification_event in notification_events:
+        identity = [
+            notification_event.category,
+            notification_event.kind,
+            notification_event.tx_hash,
+        ] + [
+            [
+                x.address_type,
+                x.address.account.index if x.address and x.address.account else None,
+                x.address.contract.to_str() if x.address and x.address.contract else None,
+            ]
+            for x in (notification_event.impacted_addresses or [])
+        ]
+        digest = hashlib.sha1(str(identity).encode()).hexdigest()[:16]
+        key = f"{notification_event.block_hash}-{digest}"
+        seen[key] = seen.get(key, 0) + 1
+        keys.append(key if seen[key] == 1 else f"{key}-{seen[key]}")
+    return keys
+
+
+class Mixin:
+    """
+    Durable outbox for messages, in the `bot_outbox` collection.
+
+    The match stage writes all messages for a block to the outbox before
+    `bot_last_processed_block` is advanced past that block, so a message
+    can't get lost when the bot stops (or is stopped by the heartbeat check).
+
+    Delivery workers claim a message before sending it (status `sending`
+    with a lease) and mark it `delivered` or `failed` afterwards. A failed
+    message gets a `next_attempt_at` (with exponential backoff) and is
+    `abandoned` after OUTBOX_MAX_ATTEMPTS attempts. Messages that are still
+    pending, whose lease has expired or whose next attempt is due are picked
+    up again by `replay_outbox`, also by other processes using the same
+    collection. Only delivered and abandoned messages expire.
+    """
+
+    def outbox(self):
+        return self.connections.mongomoter.utilities_db[OUTBOX_COLLECTION]
+
+    async def setup_outbox(self):
+        try:
+            await self.outbox().create_index(
+                [("status", ASCENDING), ("created_at", ASCENDING)]
+            )
+            await self.outbox().create_index(
+                [("status", ASCENDING), ("next_attempt_at", ASCENDING)]
+            )
+            for field in ["delivered_at", "abandoned_at"]:
+                await self.outbox().create_index(
+                    field, expireAfterSeconds=OUTBOX_RETENTION_DAYS * 24 * 60 * 60
+                )
+        except Exception as e:
+            console.log(f"setup_outbox has FAILED with {e}.")
+
+    def outbox_messages_for(
+        self,
+        key: str,
+        notification_event: NotificationEvent,
+        user: UserV2,
+        notification_services_to_send: dict[NotificationServices:bool],
+        message_response: MessageResponse,
+    ) -> list[OutboxMessage]:
+        now = dt.datetime.now().astimezone(tz=dt.timezone.utc)
+        messages = []
+        if (
+            notification_services_to_send[NotificationServices.telegram]
+            and user.telegram_chat_id
+        ):
+            messages.append(
+                OutboxMessage(
+                    id=f"{key}-{user.token}-telegram",
+                    event_key=key,
+                    user_key=user.token,
+                    channel=NotificationServices.telegram,
+                    recipient=user.telegram_chat_id,
+                    title=message_response.title_telegram,
+                    body=message_response.message_telegram,
+                    block_height=notification_event.block_height,
+                    created_at=now,
+                )
+            )
+        if (
+            notification_services_to_send[NotificationServices.email]
+            and user.email_address
+        ):
+            messages.append(
+                OutboxMessage(
+                    id=f"{key}-{user.token}-email",
+                    event_key=key,
+                    user_key=user.token,
+                    channel=NotificationServices.email,
+                    recipient=user.email_address,
+                    title=message_response.title_email,
+                    body=message_response.message_email,
+                    block_height=notification_event.block_height,
+                    created_at=now,
+                )
+            )
+        return messages
+
+    async def write_to_outbox(self, messages: list[OutboxMessage]):
+        if len(messages) == 0:
+            return
+        # $setOnInsert: a message that is written again (e.g. the block is
+        # processed again after a restart) keeps its status.
+        await self.outbox().bulk_write(
+            [
+                UpdateOne(
+                    {"_id": message.id},
+                    {"$setOnInsert": message.model_dump(by_alias=True)},
+                    upsert=True,
+                )
+                for message in messages
+            ],
+            ordered=False,
+        )
+        self.metrics.increment("outbox_written", len(messages))
+
+    async def write_to_outbox_until_written(self, messages: list[OutboxMessage]):
+        """
+        Retries `write_to_outbox` with backoff until it succeeds. The block
+        can't be checkpointed (and no later block processed) before its
+        messages are in the outbox.
+        """
+        attempt = 0
+        while True:
+            try:
+                await self.write_to_outbox(messages)
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                console.log(f"write_to_outbox has FAILED with {e}, retrying.")
+                self.metrics.increment("outbox_write_retries")
+                await asyncio.sleep(
+                    min(OUTBOX_REPLAY_INTERVAL, BLOCK_POLL_INTERVAL * (2**attempt))
+                )
+                attempt += 1
+
+    async def enqueue_outbox_messages(self, messages: list[OutboxMessage]):
+        """Puts messages on their channel's queue, unless they are on it already."""
+        for message in messages:
+            if message.id in self.queued_outbox_ids:
+                continue
+            self.queued_outbox_ids.add(message.id)
+            if message.channel == NotificationServices.telegram:
+                await self.telegram_queue.put(message)
+            else:
+                await self.email_queue.put(message)
+
+    async def claim_outbox_message(
+        self, message: OutboxMessage
+    ) -> OutboxMessage | None:
+        """
+        Marks the message as being sent. Returns the claimed message, or None
+        if it was already delivered, is being sent by another worker or its
+        next attempt is not due yet.
+        """
+        now = dt.datetime.now().astimezone(tz=dt.timezone.utc)
+        claimed = await self.outbox().find_one_and_update(
+            {
+                "_id": message.id,
+                "$or": [
+                    {"status": OutboxStatus.pending.value},
+                    {
+                        "status": OutboxStatus.sending.value,
+                        "lease_until": {"$lt": now},
+                    },
+                    {
+                        "status": OutboxStatus.failed.value,
+                        "next_attempt_at": {"$lte": now},
+                    },
+                ],
+            },
+            {
+                "$set": {
+                    "status": OutboxStatus.sending.value,
+                    "lease_until": now + dt.timedelta(seconds=OUTBOX_LEASE_SECONDS),
+                },
+                "$inc": {"attempts": 1},
+            },
+            return_document=ReturnDocument.AFTER,
+        )
+        return OutboxMessage(**claimed) if claimed else None
+
+    async def complete_outbox_message(
+        self,
+        message: OutboxMessage,
+        delivered: bool,
+        retry_after: float | None = None,
+    ):
+        """
+        `message` is the claimed message, so `attempts` includes this attempt.
+        A failed message is sent again later (not before `retry_after`
+        seconds), unless it used all its attempts.
+        """
+        now = dt.datetime.now().astimezone(tz=dt.timezone.utc)
+        if delivered:
+            status = {"status": OutboxStatus.delivered.value, "delivered_at": now}
+        elif message.attempts >= OUTBOX_MAX_ATTEMPTS:
+            console.log(
+                f"Delivery of {message.id} has FAILED {message.attempts} times, abandoned."
+            )
+            self.metrics.increment("outbox_abandoned")
+            status = {"status": OutboxStatus.abandoned.value, "abandoned_at": now}
+        else:
+            delay = min(
+                OUTBOX_RETRY_MAX_DELAY,
+                OUTBOX_REPLAY_INTERVAL * (2 ** (message.attempts - 1)),
+            )
+            delay = max(delay, retry_after or 0)
+            self.metrics.increment("outbox_retries_scheduled")
+            status = {
+                "status": OutboxStatus.failed.value,
+                "next_attempt_at": now + dt.timedelta(seconds=delay),
+            }
+        unset = {"lease_until": ""}
+        if "next_attempt_at" not in status:
+            unset["next_attempt_at"] = ""
+        await self.outbox().update_one(
+            {"_id": message.id}, {"$set": status, "$unset": unset}
+        )
+
+    async def deliver_outbox_message(self, message: OutboxMessage):
+        message = await self.claim_outbox_message(message)
+        if message is None:
+            self.metrics.increment("outbox_already_claimed")
+            return
+        if message.channel == NotificationServices.telegram:
+            result = await self.send_telegram(
+                message.recipient, message.title, message.body
+            )
+        else:
+            result = await self.send_email(
+                message.recipient, message.title, message.body
+            )
+        await self.complete_outbox_message(
+            message, result.delivered, result.retry_after
+        )
+
+    async def find_outbox_messages_to_replay(
+        self, cutoff: dt.datetime
+    ) -> list[OutboxMessage]:
+        """
+        Messages that are pending since before `cutoff`, whose lease expired
+        or whose next attempt is due, oldest first. Messages that are waiting
+        on the delivery queues of this bot are left out.
+        """
+        now = dt.datetime.now().astimezone(tz=dt.timezone.utc)
+        result = (
+            await self.outbox()
+            .find(
+                {
+                    "_id": {"$nin": list(self.queued_outbox_ids)},
+                    "$or": [
+                        {
+                            "status": OutboxStatus.pending.value,
+                            "created_at": {"$lt": cutoff},
+                        },
+                        {
+                            "status": OutboxStatus.sending.value,
+                            "lease_until": {"$lt": now},
+                        },
+                        {
+                            "status": OutboxStatus.failed.value,
+                            "next_attempt_at": {"$lte": now},
+                        },
+                    ]
+                }
+            )
+            .sort("created_at", ASCENDING)
+            .to_list(length=OUTBOX_REPLAY_BATCH_SIZE)
+        )
+        return [OutboxMessage(**x) for x in result]
+
+    async def replay_outbox(self):
+        """
+        Picks up messages that were written but not delivered: on startup
+        everything that is still pending, afterwards every
+        OUTBOX_REPLAY_INTERVAL seconds what has been pending for longer than
+        that, was claimed by a worker whose lease expired, or failed and is
+        due to be sent again.
+        """
+        cutoff = dt.datetime.now().astimezone(tz=dt.timezone.utc)
+        while True:
+            try:
+                messages = await self.find_outbox_messages_to_replay(cutoff)
+                if len(messages) > 0:
+                    console.log(
+                        f"Replaying {len(messages):,.0f} message(s) from outbox."
+                    )
+                    self.metrics.increment("outbox_replayed", len(messages))
+                    await self.enqueue_outbox_messages(messages)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                console.log(f"replay_outbox has FAILED with {e}.")
+
+            await asyncio.sleep(OUTBOX_REPLAY_INTERVAL)
+            cutoff = dt.datetime.now().astimezone(tz=dt.timezone.utc) - dt.timedelta(
+                seconds=OUTBOX_REPLAY_INTERVAL
+            )
@@ -0,0 +1,325 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+import asyncio
+from collections import deque
+from typing import TYPE_CHECKING
+
+from pymongo.errors import OperationFailure
+
+from rich.console import Console
+from ccdexplorer_fundamentals.enums import NET
+from ccdexplorer_fundamentals.GRPCClient.CCD_Types import *
+from ccdexplorer_fundamentals.mongodb import Collections, CollectionsUtilities
+from ccdexplorer_fundamentals.user_v2 import NotificationServices, UserV2
+from telegram.ext import Application
+
+from env import *
+from notification_classes import *
+from .outbox_logic import event_keys
+
+if TYPE_CHECKING:
+    from bot import Bot
+
+console = Console()
+
+
+class Mixin:
+    """
+    The block pipeline: fetch -> enrich -> match -> deliver.
+
+    Each stage is a long running task that picks up work as soon as it is
+    available. Stages are connected by bounded queues, so a slow stage
+    (e.g. delivery of a large fan-out) applies backpressure to the stages
+    before it instead of letting blocks and events pile up in memory.
+
+    - fetch: retrieves new blocks from the blocks collection into `block_queue`.
+    - enrich: runs the event extractors on a block (concurrently, and for up
+        to ENRICH_CONCURRENCY blocks at a time) and puts the block with the
+        resulting NotificationEvents on `notification_queue`, in height order.
+    - match: determines for every NotificationEvent which users need to be
+        notified, writes the messages to the outbox, advances the checkpoint
+        (`bot_last_processed_block`, written every CHECKPOINT_MAX_BLOCKS blocks
+        or CHECKPOINT_INTERVAL seconds) and hands the messages to the delivery workers.
+    - deliver: workers per channel that send the messages, see `delivery_logic`.
+
+    If BLOCK_CHANGE_STREAM is set, a watcher task tails the blocks collection
+    with a change stream and wakes the fetch stage as soon as a block is
+    inserted. On a standalone server (no change streams) the fetch stage
+    falls back to polling every BLOCK_POLL_INTERVAL seconds.
+    """
+
+    def setup_pipeline_queues(self):
+        self.block_queue: asyncio.Queue[CCD_BlockComplete] = asyncio.Queue(
+            maxsize=PIPELINE_BLOCK_QUEUE_SIZE
+        )
+        self.notification_queue: asyncio.Queue[
+            tuple[CCD_BlockComplete, list[NotificationEvent], bool]
+        ] = asyncio.Queue(maxsize=PIPELINE_NOTIFICATION_QUEUE_SIZE)
+        self.pipeline_tasks: list[asyncio.Task] = []
+        self.new_block_event = asyncio.Event()
+        self.change_stream_active = False
+        self.last_known_block_info: CCD_BlockInfo | None = None
+
+    async def start_pipeline(self, application: Application):
+        net = NET(application.bot_data["net"]).value
+        await self.setup_outbox()
+        self.pipeline_tasks = [
+            asyncio.create_task(self.fetch_stage(net), name="fetch_stage"),
+            asyncio.create_task(self.enrich_stage(), name="enrich_stage"),
+            asyncio.create_task(self.match_stage(), name="match_stage"),
+            asyncio.create_task(self.replay_outbox(), name="replay_outbox"),
+            asyncio.create_task(
+                self.message_log.run(self.message_log_collection()),
+                name="message_log",
+            ),
+            asyncio.create_task(self.checkpoint_timer(), name="checkpoint_timer"),
+        ] + self.start_delivery_workers()
+        if BLOCK_CHANGE_STREAM:
+            self.pipeline_tasks.append(
+                asyncio.create_task(self.watch_blocks(net), name="watch_blocks")
+            )
+        if REFERENCE_CHANGE_STREAM:
+            self.pipeline_tasks.extend(self.start_reference_watchers())
+
+    async def stop_pipeline(self, application: Application):
+        for task in self.pipeline_tasks:
+            task.cancel()
+        await asyncio.gather(*self.pipeline_tasks, return_exceptions=True)
+        self.pipeline_tasks = []
+        await self.message_log.flush(self.message_log_collection())
+        try:
+            await self.commit_checkpoint()
+        except Exception as e:
+            console.log(f"commit_checkpoint has FAILED with {e}.")
+        await self.close_http_session()
+
+    async def checkpoint_timer(self):
+        """Writes the checkpoint when blocks stop coming in before it was due."""
+        while True:
+            await asyncio.sleep(CHECKPOINT_INTERVAL)
+            try:
+                if self.checkpoints.is_due():
+                    await self.commit_checkpoint()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                console.log(f"checkpoint_timer has FAILED with {e}.")
+
+    def message_log_collection(self):
+        return self.connections.mongomoter.utilities[CollectionsUtilities.message_log]
+
+    async def watch_blocks(self, net: str):
+        db_to_use = (
+            self.connections.mongomoter.mainnet
+            if net == "mainnet"
+            else self.connections.mongomoter.testnet
+        )
+        resume_after = None
+        while True:
+            try:
+                async with db_to_use[Collections.blocks].watch(
+                    [{"$match": {"operationType": {"$in": ["insert", "replace"]}}}],
+                    resume_after=resume_after,
+                ) as stream:
+                    console.log("Watching blocks collection for new blocks.")
+                    # only now will inserts be announced; until here the fetch
+                    # stage polls. It checks the tip again, as a block inserted
+                    # before the stream was opened is not in it.
+                    self.change_stream_active = True
+                    self.metrics.set_gauge("block_change_stream_active", 1)
+                    self.new_block_event.set()
+                    async for change in stream:
+                        resume_after = stream.resume_token
+                        block_info = CCD_BlockInfo(**change["fullDocument"])
+                        if (not self.last_known_block_info) or (
+                            block_info.height > self.last_known_block_info.height
+                        ):
+                            self.last_known_block_info = block_info
+                        self.new_block_event.set()
+
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                # change streams are only available on replica sets and sharded
+                # clusters, fall back to polling.
+                console.log(
+                    f"Can't watch blocks collection ({e}), falling back to polling."
+                )
+                self.change_stream_active = False
+                self.metrics.set_gauge("block_change_stream_active", 0)
+                self.new_block_event.set()
+                return
+            except Exception as e:
+                console.log(f"watch_blocks has FAILED with {e}, resuming.")
+                self.change_stream_active = False
+                self.metrics.set_gauge("block_change_stream_active", 0)
+                await asyncio.sleep(BLOCK_POLL_INTERVAL)
+
+    async def wait_for_new_block(self):
+        if self.change_stream_active:
+            try:
+                await asyncio.wait_for(
+                    self.new_block_event.wait(), timeout=BLOCK_CHANGE_STREAM_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                # no block announced for a while, verify the tip in the collection.
+                self.last_known_block_info = None
+        else:
+            await asyncio.sleep(BLOCK_POLL_INTERVAL)
+
+    async def wait_for_block_queue(self):
+        """
+        Waits until the enrich stage has processed the blocks that are waiting,
+        but at most BLOCK_POLL_INTERVAL seconds.
+        """
+        try:
+            await asyncio.wait_for(self.block_queue.join(), timeout=BLOCK_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+    async def fetch_stage(self, net: str):
+        db_to_use = (
+            self.connections.mongomoter.mainnet
+            if net == "mainnet"
+            else self.connections.mongomoter.testnet
+        )
+        next_height_to_fetch = None
+        while True:
+            try:
+                if next_height_to_fetch is None:
+                    bot_last_processed_block = await db_to_use[
+                        Collections.helpers
+                    ].find_one({"_id": "bot_last_processed_block"})
+                    self.last_processed_block_height = bot_last_processed_block[
+                        "height"
+                    ]
+                    next_height_to_fetch = self.last_processed_block_height + 1
+
+                # cleared before looking at the tip, so a block announced
+                # from here on wakes up wait_for_new_block.
+                self.new_block_event.clear()
+                if self.change_stream_active and self.last_known_block_info:
+                    last_block_info = self.last_known_block_info
+                else:
+                    last_block_info = await self.get_last_block_info(db_to_use)
+                    self.last_known_block_info = last_block_info
+                self.record_lag(last_block_info, self.last_processed_block_height)
+
+                blocks_to_fetch = last_block_info.height - next_height_to_fetch + 1
+                max_steps_to_take = self.catch_up_window.next_step(
+                    blocks_to_fetch, self.block_queue.qsize()
+                )
+                if max_steps_to_take == 0:
+                    if blocks_to_fetch > 0:
+                        # over the memory budget: continue as soon as the
+                        # waiting blocks are processed, not at the next block.
+                        await self.wait_for_block_queue()
+                    else:
+                        await self.wait_for_new_block()
+                    continue
+
+                (
+                    blocks_in_range,
+                    missing_height,
+                    fetched_bytes,
+                ) = await self.get_blocks_in_range(
+                    db_to_use,
+                    net,
+                    next_height_to_fetch,
+                    next_height_to_fetch + max_steps_to_take - 1,
+                )
+                self.catch_up_window.record_fetch(len(blocks_in_range), fetched_bytes)
+                self.metrics.set_gauge("catch_up_window", max_steps_to_take)
+
+                for block_complete in blocks_in_range:
+                    console.log(
+                        f"Ret: {block_complete.block_info.height:,.0f}",
+                        end=" | ",
+                    )
+                    # waits here if the enrich stage can't keep up.
+                    await self.block_queue.put(block_complete)
+                    next_height_to_fetch = block_complete.block_info.height + 1
+
+                if missing_height:
+                    await self.request_missing_block(db_to_use, missing_height)
+                    await asyncio.sleep(BLOCK_POLL_INTERVAL)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                console.log(f"fetch_stage has FAILED with {e}.")
+                await asyncio.sleep(BLOCK_POLL_INTERVAL)
+
+    async def enrich_stage(self):
+        """
+        Processes up to ENRICH_CONCURRENCY blocks at the same time (when they
+        are waiting in `block_queue`), but passes them on in height order.
+        """
+        in_flight: deque[tuple[CCD_BlockComplete, asyncio.Task]] = deque()
+        try:
+            while True:
+                if (len(in_flight) == 0) or (
+                    len(in_flight) < ENRICH_CONCURRENCY
+                    and not self.block_queue.empty()
+                ):
+                    block: CCD_BlockComplete = await self.block_queue.get()
+                    in_flight.append(
+                        (block, asyncio.create_task(self.process_block(block)))
+                    )
+                    continue
+
+                block, task = in_flight.popleft()
+                try:
+                    notification_events, completed = await task
+                    # blocks without events are passed on as well, the match
+                    # stage advances bot_last_processed_block.
+                    await self.notification_queue.put(
+                        (block, notification_events, completed)
+                    )
+                except asyncio.CancelledError:
+                    raise
+                except Exception as ex:
+                    await self.log_error(ex, block, "enrich_stage")
+                finally:
+                    self.block_queue.task_done()
+        finally:
+            for _, task in in_flight:
+                task.cancel()
+
+    async def match_stage(self):
+        while True:
+            block, notification_events, completed = (
+                await self.notification_queue.get()
+            )
+            try:
+                outbox_messages = []
+                for key, notification_event in zip(
+                    event_keys(notification_events), notification_events
+                ):
+                    for (
+                        user,
+                        notification_services_to_send,
+                        message_response,
+                    ) in await self.match_notification_event(notification_event, key):
+                        outbox_messages.extend(
+                            self.outbox_messages_for(
+                                key,
+                                notification_event,
+                                user,
+                                notification_services_to_send,
+                                message_response,
+                            )
+                        )
+                # retried until written, so no later block can be
+                # checkpointed past this one while its messages are missing.
+                await self.write_to_outbox_until_written(outbox_messages)
+                if completed:
+                    await self.checkpoint_block(block)
+                # waits here if the delivery workers can't keep up.
+                await self.enqueue_outbox_messages(outbox_messages)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                console.log(f"match_stage has FAILED with {e}.")
+            finally:
+                self.notification_queue.task_done()
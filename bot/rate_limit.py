@@ -0,0 +1,82 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+import asyncio
+import time
+from typing import Callable
+
+
+class TokenBucket:
+    """
+    Allows `rate` operations per second, with bursts of up to `capacity`.
+
+    `reserve` always takes a token and returns how long the caller needs to
+    wait before using it. Tokens can go negative, so concurrent callers are
+    served in the order in which they reserved.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+
+    def refill(self):
+        now = self.clock()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+    def reserve(self) -> float:
+        self.refill()
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+    def is_full(self) -> bool:
+        self.refill()
+        return self.tokens >= self.capacity
+
+
+class ChatRateLimiter:
+    """
+    Rate limits messages to Telegram: at most `global_rate` messages per
+    second in total and `per_chat_rate` messages per second to a single chat.
+    """
+
+    # buckets of chats that have been idle long enough to be full again
+    # are dropped once there are more than this many.
+    max_chat_buckets = 10_000
+
+    def __init__(
+        self,
+        global_rate: float,
+        per_chat_rate: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.per_chat_rate = per_chat_rate
+        self.clock = clock
+        self.global_bucket = TokenBucket(global_rate, clock=clock)
+        self.chat_buckets: dict[int, TokenBucket] = {}
+
+    def chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if not bucket:
+            if len(self.chat_buckets) >= self.max_chat_buckets:
+                self.chat_buckets = {
+                    k: v for k, v in self.chat_buckets.items() if not v.is_full()
+                }
+            bucket = TokenBucket(self.per_chat_rate, capacity=1, clock=self.clock)
+            self.chat_buckets[chat_id] = bucket
+        return bucket
+
+    async def acquire(self, chat_id: int):
+        await asyncio.sleep(self.chat_bucket(chat_id).reserve())
+        await asyncio.sleep(self.global_bucket.reserve())
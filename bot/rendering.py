@@ -0,0 +1,98 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+import functools
+from contextvars import ContextVar
+from typing import Callable, Hashable, Optional
+
+from ccdexplorer_fundamentals.user_v2 import UserV2
+
+from notification_classes import *
+
+# Set while a message template is rendered. `add_labels_to_notitication_event`
+# then fills in label slots instead of the labels for the user.
+rendering_template: ContextVar[bool] = ContextVar("rendering_template", default=False)
+
+SLOT_MARKER = "\x00"
+
+
+def label_slot(position: int) -> str:
+    """The placeholder for the label of the impacted address at this position."""
+    return f"{SLOT_MARKER}{position}{SLOT_MARKER}"
+
+
+class MessageTemplate:
+    """
+    A rendered MessageResponse with label slots. The text is split on the
+    slot markers, so every odd part is the position of an impacted address.
+    """
+
+    def __init__(self, message_response: MessageResponse):
+        self.parts = {
+            field: value.split(SLOT_MARKER) if isinstance(value, str) else value
+            for field, value in message_response.model_dump().items()
+        }
+        self.has_slots = any(
+            isinstance(parts, list) and len(parts) > 1 for parts in self.parts.values()
+        )
+
+    def personalize(self, labels: list) -> MessageResponse:
+        fields = {}
+        for field, parts in self.parts.items():
+            if not isinstance(parts, list):
+                fields[field] = parts
+                continue
+            text = list(parts)
+            for i in range(1, len(text), 2):
+                text[i] = f"{labels[int(text[i])]}"
+            fields[field] = "".join(text)
+        return MessageResponse(**fields)
+
+
+def render_once(personalized_by: Optional[Callable[[UserV2], Hashable]] = None):
+    """
+    Decorator for the `define_*_message` methods.
+
+    The message for a NotificationEvent is rendered once, with label slots
+    for the impacted addresses, and cached on the event. For every user only
+    the labels are looked up and put into the slots.
+
+    A message that depends on more than the labels (e.g. the user's
+    notification limit in the footer) passes `personalized_by`, which returns
+    the user specific values. These are part of the cache key.
+    """
+
+    def decorator(define_message):
+        @functools.wraps(define_message)
+        def wrapper(self, *args):
+            notification_event: NotificationEvent = next(
+                x for x in args if isinstance(x, NotificationEvent)
+            )
+            user: UserV2 = next(x for x in args if isinstance(x, UserV2))
+            key = (
+                define_message.__name__,
+                personalized_by(user) if personalized_by else None,
+            )
+            template = notification_event.rendered_messages.get(key)
+            if not template:
+                token = rendering_template.set(True)
+                try:
+                    message_response = define_message(self, *args)
+                finally:
+                    rendering_template.reset(token)
+                template = MessageTemplate(message_response)
+                notification_event.rendered_messages[key] = template
+                self.metrics.increment("messages_rendered")
+
+            self.metrics.increment("messages_personalized")
+            if not template.has_slots:
+                return template.personalize([])
+            notification_event = self.add_labels_to_notitication_event(
+                user, notification_event
+            )
+            return template.personalize(
+                [x.label for x in notification_event.impacted_addresses]
+            )
+
+        return wrapper
+
+    return decorator
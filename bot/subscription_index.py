@@ -0,0 +1,120 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+from ccdexplorer_fundamentals.user_v2 import (
+    AccountForUser,
+    ContractForUser,
+    OtherNotificationPreferences,
+    UserV2,
+)
+
+from notification_classes import *
+
+# The order in which `process_event_type_other` checks the properties
+# of an EventTypeOther. The first one that is set determines the
+# preference that is used.
+OTHER_EVENT_KINDS = (
+    "protocol_update",
+    "add_anonymity_revoker_update",
+    "add_identity_provider_update",
+    "module_deployed",
+    "contract_initialized",
+    "validator_lowered_stake",
+    "validator_commission_changed",
+    "account_transfer",
+    "transferred_with_schedule",
+    "domain_name_minted",
+    "account_created",
+)
+
+
+def other_event_kind(event_type_other: EventTypeOther) -> str | None:
+    for kind in OTHER_EVENT_KINDS:
+        if getattr(event_type_other, kind):
+            return kind
+    return None
+
+
+class SubscriptionIndex:
+    """
+    Inverted index from the things a user can subscribe to, to the users
+    (keys in `Bot.users`) that have notification preferences for them.
+
+    - accounts: account index -> users with account notification preferences.
+    - validators: account index -> users with validator notification preferences.
+    - contracts: (contract index, receive name) -> users with contract_update_issued
+        preferences for this method.
+    - other: event kind -> users with this other notification preference.
+
+    Indices are kept as strings, as they are stored as such in `UserV2.accounts`
+    and `UserV2.contracts`. Users are listed in the order of `Bot.users`.
+    """
+
+    def __init__(self, users: dict[str, UserV2]):
+        self.accounts: dict[str, list[str]] = {}
+        self.validators: dict[str, list[str]] = {}
+        self.contracts: dict[tuple[str, str], list[str]] = {}
+        self.other: dict[str, list[str]] = {}
+
+        for user_key, user in users.items():
+            for account_index, user_account in user.accounts.items():
+                user_account: AccountForUser
+                if user_account.account_notification_preferences:
+                    self.accounts.setdefault(account_index, []).append(user_key)
+                if user_account.validator_notification_preferences:
+                    self.validators.setdefault(account_index, []).append(user_key)
+
+            for contract_index, contract in user.contracts.items():
+                contract: ContractForUser
+                preferences = contract.contract_notification_preferences
+                if preferences and preferences.contract_update_issued:
+                    for receive_name in preferences.contract_update_issued.keys():
+                        self.contracts.setdefault(
+                            (contract_index, receive_name), []
+                        ).append(user_key)
+
+            if user.other_notification_preferences:
+                for kind in OtherNotificationPreferences.model_fields:
+                    if getattr(user.other_notification_preferences, kind):
+                        self.other.setdefault(kind, []).append(user_key)
+
+    def watches_account(self, account_index: int) -> bool:
+        return str(account_index) in self.accounts
+
+    def watches_validator(self, account_index: int) -> bool:
+        return str(account_index) in self.validators
+
+    def users_for_event(self, notification_event: NotificationEvent) -> list[str]:
+        """
+        Returns the keys of all users that could be notified of this event.
+        Whether they are notified (and to which service) is still up to
+        `determine_if_user_should_be_notified_of_event`.
+        """
+        category = notification_event.category
+        if category == "other":
+            kind = other_event_kind(notification_event.sub_type)
+            return self.other.get(kind, []) if kind else []
+
+        if not notification_event.impacted_addresses:
+            return []
+        impacted_address = notification_event.impacted_addresses[0]
+
+        if category in ("account", "validator"):
+            if not impacted_address.address.account:
+                return []
+            account_index = str(impacted_address.address.account.index)
+            if category == "account":
+                return self.accounts.get(account_index, [])
+            else:
+                return self.validators.get(account_index, [])
+
+        if category == "contract":
+            event_type: EventTypeContract = notification_event.sub_type
+            if not (
+                event_type.contract_update_issued
+                and impacted_address.address_type == AddressType.contract
+            ):
+                return []
+            contract_index = str(impacted_address.address.contract.index)
+            return self.contracts.get((contract_index, event_type.receive_name), [])
+
+        return []
@@ -1,5 +1,7 @@
 # ruff: noqa: F403, F405, E402, E501, F401
 
+import asyncio
+
 from pydantic import BaseModel, ConfigDict
 from rich import print
 from rich.console import Console
@@ -35,11 +37,121 @@ from ccdexplorer_fundamentals.user_v2 import (
     Reward,
     UserV2,
 )
+from .rendering import label_slot, rendering_template
 
 
 class Utils:
+    def account_index_for_address(
+        self, account_address: CCD_AccountAddress
+    ) -> CCD_AccountIndex:
+        """
+        Looks up the index of an account in the nightly accounts, then in the
+        address cache and only then on the node.
+        """
+        account_index = self.known_account_index_for_address(account_address)
+        if account_index is not None:
+            return account_index
+
+        account_info = self.connections.grpcclient.get_account_info(
+            "last_final", account_address
+        )
+        self.address_cache.put(
+            account_address, account_info.index, account_info.address
+        )
+        return account_info.index
+
+    def known_account_index_for_address(
+        self, account_address: CCD_AccountAddress
+    ) -> CCD_AccountIndex | None:
+        """The index from the nightly accounts or the address cache, if known."""
+        account_index = self.nightly_accounts.index_for(account_address)
+        if account_index is not None:
+            return account_index
+
+        account_index = self.address_cache.get_index(account_address)
+        if account_index is not None:
+            self.metrics.increment("address_cache_hits")
+            return account_index
+
+        self.metrics.increment("address_cache_misses")
+        return None
+
+    async def run_grpc(self, method, *args):
+        # the gRPC client blocks, so calls are made from threads, at most
+        # GRPC_CONCURRENCY at the same time.
+        async with self.grpc_semaphore:
+            return await asyncio.to_thread(method, *args)
+
+    async def get_account_info_concurrently(
+        self, block_hash: str, hex_address: str
+    ) -> CCD_AccountInfo:
+        return await self.run_grpc(
+            self.connections.grpcclient.get_account_info, block_hash, hex_address
+        )
+
+    async def account_indices_for_addresses(
+        self, account_addresses: list[CCD_AccountAddress]
+    ) -> list[CCD_AccountIndex]:
+        """
+        As `account_index_for_address`, for many accounts. Accounts that are
+        not known are looked up on the node concurrently.
+        """
+        account_indices = [
+            self.known_account_index_for_address(x) for x in account_addresses
+        ]
+        unknown = list(
+            {
+                account_address
+                for account_address, account_index in zip(
+                    account_addresses, account_indices
+                )
+                if account_index is None
+            }
+        )
+        if len(unknown) > 0:
+            account_infos = await asyncio.gather(
+                *[self.get_account_info_concurrently("last_final", x) for x in unknown]
+            )
+            for account_address, account_info in zip(unknown, account_infos):
+                self.address_cache.put(
+                    account_address, account_info.index, account_info.address
+                )
+            found = {
+                account_address: account_info.index
+                for account_address, account_info in zip(unknown, account_infos)
+            }
+            account_indices = [
+                found[account_address] if account_index is None else account_index
+                for account_address, account_index in zip(
+                    account_addresses, account_indices
+                )
+            ]
+        return account_indices
+
+    def account_address_for_index(
+        self, account_index: CCD_AccountIndex
+    ) -> CCD_AccountAddress:
+        """
+        Looks up the address of an account in the nightly accounts, then in the
+        address cache and only then on the node.
+        """
+        account_address = self.nightly_accounts.address_for(account_index)
+        if account_address is not None:
+            return account_address
+
+        account_address = self.address_cache.get_address(account_index)
+        if account_address is not None:
+            self.metrics.increment("address_cache_hits")
+            return account_address
+
+        self.metrics.increment("address_cache_misses")
+        account_info = self.connections.grpcclient.get_account_info(
+            "last_final", account_index=account_index
+        )
+        self.address_cache.put(account_info.address, account_index)
+        return account_info.address
+
     def complete_address(self, impacted_address):
-        grpcclient: GRPCClient = self.connections.grpcclient
         if impacted_address:
             if isinstance(impacted_address, CCD_ContractAddress):
                 return CCD_Address_Complete(contract=impacted_address)
@@ -47,14 +159,7 @@ class Utils:
             elif isinstance(impacted_address, CCD_AccountAddress):
                 if len(impacted_address) > 28:
                     account_id = impacted_address
-
-                    from_nightly = self.nightly_accounts_by_account_id.get(account_id)
-                    if from_nightly:
-                        account_index = from_nightly["index"]
-                    else:
-                        account_index = grpcclient.get_account_info(
-                            "last_final", impacted_address
-                        ).index
+                    account_index = self.account_index_for_address(account_id)
 
                     return CCD_Address_Complete(
                         account=CCD_AccountAddress_Complete(
@@ -68,13 +173,7 @@ class Utils:
 
             elif isinstance(impacted_address, int):
                 account_index = impacted_address
-                from_nightly = self.nightly_accounts_by_account_index.get(account_index)
-                if from_nightly:
-                    account_id = from_nightly["_id"]
-                else:
-                    account_id = self.connections.grpcclient.get_account_info(
-                        "last_final", account_index=impacted_address
-                    ).address
+                account_id = self.account_address_for_index(account_index)
 
                 return CCD_Address_Complete(
                     account=CCD_AccountAddress_Complete(
@@ -113,10 +212,17 @@ class Utils:
         notification_event: NotificationEvent,
     ) -> Optional[str]:
         enriched_impacted_addresses = []
-        for impacted_address in notification_event.impacted_addresses:
-            enriched_impacted_addresses.append(
-                self.find_label_for_impacted_address(impacted_address, user)
-            )
+        for position, impacted_address in enumerate(
+            notification_event.impacted_addresses
+        ):
+            if rendering_template.get():
+                # labels are filled in per user, see `render_once`.
+                impacted_address.label = label_slot(position)
+                enriched_impacted_addresses.append(impacted_address)
+            else:
+                enriched_impacted_addresses.append(
+                    self.find_label_for_impacted_address(impacted_address, user)
+                )
         notification_event.impacted_addresses = enriched_impacted_addresses
         return notification_event
 
@@ -0,0 +1,143 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+import asyncio
+import time
+from typing import Callable, Generic, TypeVar
+
+from pymongo.errors import OperationFailure
+from rich.console import Console
+
+from env import *
+from .metrics import Metrics
+
+console = Console()
+
+T = TypeVar("T")
+
+
+class WatchedCollection(Generic[T]):
+    """
+    An in-memory copy of a (small) reference collection, parsed into models.
+
+    `refresh` reads the collection and parses only the documents that are new
+    or differ from the previous read, so an unchanged collection costs a read
+    but no validation. With `watch` running (a change stream, needs a replica
+    set) changes are applied as they happen and `refresh` doesn't read at all.
+
+    If reading or parsing fails, the previous snapshot is kept. Load time and
+    size are reported as gauges `{name}_load_seconds` and `{name}_documents`.
+    `version` increases on every change, so derived lookups can be rebuilt only
+    when needed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        parse: Callable[[dict], T],
+        metrics: Metrics,
+        query: dict | None = None,
+    ):
+        self.name = name
+        self.parse = parse
+        self.metrics = metrics
+        self.query = query or {}
+        self.documents: dict[str, dict] = {}
+        self.items: dict[str, T] = {}
+        self.version = 0
+        self.watching = False
+
+    def load(self, documents: list[dict]) -> bool:
+        """
+        Replaces the snapshot with `documents` (all documents in the collection).
+        Returns whether anything changed.
+        """
+        new_documents = {x["_id"]: x for x in documents}
+        new_items = {}
+        changed = len(new_documents) != len(self.documents)
+        for _id, document in new_documents.items():
+            if self.documents.get(_id) == document:
+                new_items[_id] = self.items[_id]
+            else:
+                new_items[_id] = self.parse(document)
+                changed = True
+        if changed:
+            self.documents, self.items = new_documents, new_items
+            self.version += 1
+        self.metrics.set_gauge(f"{self.name}_documents", len(self.items))
+        return changed
+
+    def apply_change(self, change: dict) -> bool:
+        """Applies a change stream event (with the full document for updates)."""
+        _id = change["documentKey"]["_id"]
+        if change["operationType"] == "delete":
+            if _id not in self.documents:
+                return False
+            del self.documents[_id]
+            del self.items[_id]
+        elif change.get("fullDocument"):
+            item = self.parse(change["fullDocument"])
+            self.documents[_id] = change["fullDocument"]
+            self.items[_id] = item
+        else:
+            return False
+        self.version += 1
+        self.metrics.set_gauge(f"{self.name}_documents", len(self.items))
+        return True
+
+    async def refresh(self, collection) -> bool:
+        if self.watching:
+            return False
+        start = time.perf_counter()
+        try:
+            documents = await collection.find(self.query).to_list(length=None)
+            changed = self.load(documents)
+        except Exception as e:
+            console.log(f"Refresh of {self.name} has FAILED with {e}.")
+            self.metrics.increment(f"{self.name}_load_errors")
+            return False
+        self.metrics.set_gauge(f"{self.name}_load_seconds", time.perf_counter() - start)
+        return changed
+
+    async def watch(self, collection, on_change: Callable[[], None]):
+        """
+        Applies changes from a change stream until cancelled, calling
+        `on_change` after every change. Falls back to `refresh` (by the jobs
+        in main.py) if change streams are not available.
+        """
+        resume_after = None
+        while True:
+            try:
+                async with collection.watch(
+                    full_document="updateLookup", resume_after=resume_after
+                ) as stream:
+                    if resume_after is None:
+                        # changes before the stream was opened are not in it.
+                        self.watching = False
+                        if await self.refresh(collection):
+                            on_change()
+                    self.watching = True
+                    async for change in stream:
+                        resume_after = stream.resume_token
+                        try:
+                            if self.apply_change(change):
+                                on_change()
+                        except Exception as e:
+                            console.log(
+                                f"Change to {self.name} has FAILED with {e}, ignored."
+                            )
+                            self.metrics.increment(f"{self.name}_load_errors")
+
+            except asyncio.CancelledError:
+                self.watching = False
+                raise
+            except OperationFailure as e:
+                console.log(
+                    f"Can't watch {self.name} ({e}), falling back to refreshing."
+                )
+                self.watching = False
+                return
+            except Exception as e:
+                console.log(f"Watching {self.name} has FAILED with {e}, resuming.")
+                self.watching = False
+                resume_after = None
+                await asyncio.sleep(BLOCK_POLL_INTERVAL)
@@ -9,3 +9,39 @@ DEBUG = os.environ.get("DEBUG", False)
 API_TOKEN = os.environ.get("API_TOKEN")
 RUN_TESTNET_BOT = os.environ.get("RUN_TESTNET_BOT", True)
 ENVIRONMENT = os.environ.get("ENVIRONMENT")
+CATCHUP_MAX_BLOCKS = int(os.environ.get("CATCHUP_MAX_BLOCKS", 250))
+CATCHUP_MEMORY_BUDGET_MB = int(os.environ.get("CATCHUP_MEMORY_BUDGET_MB", 256))
+BLOCK_POLL_INTERVAL = float(os.environ.get("BLOCK_POLL_INTERVAL", 1))
+PIPELINE_BLOCK_QUEUE_SIZE = int(os.environ.get("PIPELINE_BLOCK_QUEUE_SIZE", 100))
+PIPELINE_NOTIFICATION_QUEUE_SIZE = int(
+    os.environ.get("PIPELINE_NOTIFICATION_QUEUE_SIZE", 100)
+)
+PIPELINE_DELIVERY_QUEUE_SIZE = int(os.environ.get("PIPELINE_DELIVERY_QUEUE_SIZE", 1000))
+BLOCK_CHANGE_STREAM = os.environ.get("BLOCK_CHANGE_STREAM", "false").lower() == "true"
+BLOCK_CHANGE_STREAM_TIMEOUT = float(os.environ.get("BLOCK_CHANGE_STREAM_TIMEOUT", 60))
+CHECKPOINT_MAX_BLOCKS = int(os.environ.get("CHECKPOINT_MAX_BLOCKS", 50))
+CHECKPOINT_INTERVAL = float(os.environ.get("CHECKPOINT_INTERVAL", 10))
+MESSAGE_LOG_BATCH_SIZE = int(os.environ.get("MESSAGE_LOG_BATCH_SIZE", 500))
+MESSAGE_LOG_FLUSH_INTERVAL = float(os.environ.get("MESSAGE_LOG_FLUSH_INTERVAL", 5))
+MESSAGE_LOG_MAX_BUFFER = int(os.environ.get("MESSAGE_LOG_MAX_BUFFER", 50_000))
+METADATA_CACHE_SIZE = int(os.environ.get("METADATA_CACHE_SIZE", 10_000))
+ENRICH_CONCURRENCY = int(os.environ.get("ENRICH_CONCURRENCY", 4))
+GRPC_CONCURRENCY = int(os.environ.get("GRPC_CONCURRENCY", 16))
+REFERENCE_CHANGE_STREAM = (
+    os.environ.get("REFERENCE_CHANGE_STREAM", "false").lower() == "true"
+)
+TELEGRAM_GLOBAL_RATE = float(os.environ.get("TELEGRAM_GLOBAL_RATE", 30))
+TELEGRAM_PER_CHAT_RATE = float(os.environ.get("TELEGRAM_PER_CHAT_RATE", 1))
+DELIVERY_TELEGRAM_WORKERS = int(os.environ.get("DELIVERY_TELEGRAM_WORKERS", 8))
+DELIVERY_EMAIL_WORKERS = int(os.environ.get("DELIVERY_EMAIL_WORKERS", 4))
+DELIVERY_MAX_RETRIES = int(os.environ.get("DELIVERY_MAX_RETRIES", 5))
+DELIVERY_RETRY_BASE_DELAY = float(os.environ.get("DELIVERY_RETRY_BASE_DELAY", 1))
+DELIVERY_REQUEST_TIMEOUT = float(os.environ.get("DELIVERY_REQUEST_TIMEOUT", 10))
+OUTBOX_LEASE_SECONDS = int(os.environ.get("OUTBOX_LEASE_SECONDS", 300))
+OUTBOX_REPLAY_INTERVAL = int(os.environ.get("OUTBOX_REPLAY_INTERVAL", 60))
+OUTBOX_REPLAY_BATCH_SIZE = int(os.environ.get("OUTBOX_REPLAY_BATCH_SIZE", 1000))
+OUTBOX_RETENTION_DAYS = int(os.environ.get("OUTBOX_RETENTION_DAYS", 7))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", 10))
+OUTBOX_RETRY_MAX_DELAY = int(os.environ.get("OUTBOX_RETRY_MAX_DELAY", 3600))
+ADDRESS_CACHE_SIZE = int(os.environ.get("ADDRESS_CACHE_SIZE", 100_000))
+ADDRESS_CACHE_TTL = float(os.environ.get("ADDRESS_CACHE_TTL", 24 * 60 * 60))
@@ -30,7 +30,13 @@ if __name__ == "__main__":
     )
     bot.do_initial_reads_from_collections()
 
-    application = ApplicationBuilder().token(API_TOKEN).build()
+    application = (
+        ApplicationBuilder()
+        .token(API_TOKEN)
+        .post_init(bot.start_pipeline)
+        .post_stop(bot.stop_pipeline)
+        .build()
+    )
     application.add_handler(CommandHandler("login", bot.user_login))
     application.add_handler(CommandHandler("start", bot.user_login))
     application.add_handler(CommandHandler("wintime", bot.user_win_time))
@@ -39,10 +45,8 @@ if __name__ == "__main__":
 
     job_queue = application.job_queue
 
-    job_minute = job_queue.run_repeating(bot.get_new_blocks_from_mongo, interval=2)
-    job_minute = job_queue.run_repeating(bot.process_new_blocks, interval=2, first=1)
     job_minute = job_queue.run_repeating(
-        bot.send_notification_queue, interval=2, first=2
+        bot.check_processing_heartbeat, interval=30, first=30
     )
     job_minute = job_queue.run_repeating(
         bot.async_read_users_from_collection, interval=10, first=10
@@ -62,4 +66,7 @@ if __name__ == "__main__":
     job_minute = job_queue.run_repeating(
         bot.get_new_dashboard_nodes_from_mongo, interval=5 * 60, first=60
     )
+    job_minute = job_queue.run_repeating(
+        bot.write_metrics_to_helpers, interval=60, first=60
+    )
     application.run_polling()
@@ -2,7 +2,7 @@
 
 from typing import Optional, Union
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, PrivateAttr
 from ccdexplorer_fundamentals.cis import (
     burnEvent,
     mintEvent,
@@ -175,6 +175,30 @@ class ImpactedAddress(BaseModel):
     address_type: Optional[AddressType] = None
 
 
+# Helper properties that are set next to the actual event, mapped to the
+# event type they belong to (used for the notification type in the footer).
+EVENT_KIND_ALIASES = {
+    "account": {
+        "previous_block_validator_info": "validator_commission_changed",
+        "previous_block_account_info": "delegation_configured",
+    },
+    "validator": {
+        "earliest_win_time": "block_validated",
+        "current_block_pool_info": "block_validated",
+        "block_baked_by_baker": "block_validated",
+        "previous_block_account_info": "delegation_configured",
+        "previous_block_validator_info": "validator_configured",
+        "baker_configured": "validator_configured",
+        "corresponding_account_reward": "payday_pool_reward",
+        "pool_info": "payday_pool_reward",
+    },
+    "contract": {
+        "receive_name": "contract_update_issued",
+    },
+    "other": {},
+}
+
+
 class NotificationEvent(BaseModel):
     event_type: EventType
     block_height: int
@@ -182,3 +206,61 @@ class NotificationEvent(BaseModel):
     block_slot_time: dt.datetime
     tx_hash: Optional[str] = None
     impacted_addresses: Optional[list[ImpactedAddress]] = None
+
+    # resolved once from event_type, see model_post_init.
+    _category: Optional[str] = PrivateAttr(default=None)
+    _kind: Optional[str] = PrivateAttr(default=None)
+    # message templates, rendered once for all users, see bot.rendering.
+    _rendered_messages: dict = PrivateAttr(default_factory=dict)
+
+    def model_post_init(self, __context):
+        """
+        Resolves which of account, validator, contract, other is set on the
+        event_type (the category) and which event within it this is (the kind),
+        so matching an event to users doesn't need to inspect the event type again.
+        """
+        for category in EventType.model_fields:
+            if getattr(self.event_type, category) is not None:
+                self._category = category
+                break
+        if not self._category:
+            return
+
+        set_fields = [
+            field
+            for field in type(self.sub_type).model_fields
+            if getattr(self.sub_type, field) is not None
+        ]
+        if not set_fields:
+            return
+
+        kind = set_fields[0]
+        if self._category == "other":
+            if "validator_lowered_stake" in set_fields:
+                kind = "validator_lowered_stake"
+            elif "validator_commission_changed" in set_fields:
+                kind = "validator_commission_changed"
+        self._kind = EVENT_KIND_ALIASES[self._category].get(kind, kind)
+
+    @property
+    def category(self) -> Optional[str]:
+        """The property of event_type that is set: account, validator, contract or other."""
+        return self._category
+
+    @property
+    def sub_type(
+        self,
+    ) -> Optional[
+        Union[EventTypeAccount, EventTypeValidator, EventTypeContract, EventTypeOther]
+    ]:
+        """The EventTypeAccount/Validator/Contract/Other of this event."""
+        return getattr(self.event_type, self._category) if self._category else None
+
+    @property
+    def rendered_messages(self) -> dict:
+        return self._rendered_messages
+
+    @property
+    def kind(self) -> Optional[str]:
+        """The event within the category, e.g. account_transfer or payday_pool_reward."""
+        return self._kind
@@ -0,0 +1,497 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+import asyncio
+import copy
+import datetime as dt
+import json
+import threading
+import time
+import types
+
+import bson
+import pytest
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from pymongo import ASCENDING, ReturnDocument
+from ccdexplorer_fundamentals.mongodb import Collections, CollectionsUtilities
+
+from bot import Bot
+from notification_classes import *
+
+MISSING = object()
+
+
+class FakeClock:
+    """A clock for `time.monotonic`, set by the test through `now`."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeGRPCClient:
+    """
+    Answers the node requests the bot makes from `accounts` (address -> index),
+    `delegators` (validator id -> addresses) and `special_events` (block hash
+    -> special events). Every call is recorded in `calls`, with the number of
+    calls in flight at the same time (each takes `delay` seconds).
+    """
+
+    def __init__(self):
+        self.accounts: dict[str, int] = {}
+        self.unavailable_accounts: set[str] = set()
+        self.delegators: dict[int, list[str]] = {}
+        self.special_events: dict[str, list] = {}
+        self.delay = 0.0
+        self.calls: list[tuple] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def record(self, *call):
+        with self.lock:
+            self.calls.append(call)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+
+    def calls_to(self, method: str) -> list[tuple]:
+        return [x[1:] for x in self.calls if x[0] == method]
+
+    def get_account_info(self, block_hash, hex_address=None, account_index=None):
+        self.record("get_account_info", block_hash, hex_address or account_index)
+        if hex_address in self.unavailable_accounts:
+            raise Exception(f"{hex_address} unavailable")
+        if hex_address is None:
+            hex_address = {v: k for k, v in self.accounts.items()}[account_index]
+        return types.SimpleNamespace(
+            index=self.accounts[hex_address], address=hex_address
+        )
+
+    def get_delegators_for_pool(self, validator_id: int, block_hash: str):
+        self.record("get_delegators_for_pool", validator_id, block_hash)
+        return [
+            types.SimpleNamespace(account=x)
+            for x in self.delegators.get(validator_id, [])
+        ]
+
+    def get_finalized_block_at_height(self, height: int):
+        self.record("get_finalized_block_at_height", height)
+        return types.SimpleNamespace(hash=f"block_at_{height}")
+
+    def get_pool_info_for_pool(self, pool_owner: int, block_hash: str):
+        self.record("get_pool_info_for_pool", pool_owner, block_hash)
+        return f"pool_info_{pool_owner}"
+
+    def get_block_special_events(self, block_hash: str, net):
+        self.record("get_block_special_events", block_hash)
+        return self.special_events.get(block_hash, [])
+
+
+class FakeResponse:
+    def __init__(self, status: int, body, headers: dict | None = None):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+
+    async def json(self):
+        # a body that is not a dict is returned as is, and fails to decode.
+        return self.body if isinstance(self.body, dict) else json.loads(self.body)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+
+class FakeRequest:
+    def __init__(self, session: "FakeHTTPSession", method: str, url: str, payload):
+        self.session = session
+        self.request = (method, url, payload)
+
+    async def __aenter__(self):
+        self.session.requests.append(self.request)
+        # `respond` raises for connection errors and timeouts.
+        return FakeResponse(*self.session.respond(*self.request))
+
+    async def __aexit__(self, *args):
+        return False
+
+
+class FakeHTTPSession:
+    """
+    Answers requests with `respond(method, url, payload)`, which returns the
+    status and the body (and optionally headers). Requests are recorded in
+    `requests`.
+    """
+
+    closed = False
+
+    def __init__(self):
+        self.requests: list[tuple] = []
+        self.respond = lambda method, url, payload: (200, {})
+
+    def get(self, url: str, timeout=None):
+        return FakeRequest(self, "get", url, None)
+
+    def post(self, url: str, json=None, timeout=None):
+        return FakeRequest(self, "post", url, json)
+
+    async def close(self):
+        self.closed = True
+
+
+def value_at(document: dict, path: str):
+    value = document
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return MISSING
+        value = value[part]
+    return value
+
+
+def compare(value, operand, comparison) -> bool:
+    return (value is not MISSING) and (value is not None) and comparison(value, operand)
+
+
+OPERATORS = {
+    "$in": lambda value, operand: value is not MISSING and value in operand,
+    "$nin": lambda value, operand: value is MISSING or value not in operand,
+    "$ne": lambda value, operand: (None if value is MISSING else value) != operand,
+    "$gt": lambda value, operand: compare(value, operand, lambda a, b: a > b),
+    "$gte": lambda value, operand: compare(value, operand, lambda a, b: a >= b),
+    "$lt": lambda value, operand: compare(value, operand, lambda a, b: a < b),
+    "$lte": lambda value, operand: compare(value, operand, lambda a, b: a <= b),
+    "$exists": lambda value, operand: (value is not MISSING) == operand,
+}
+
+
+def matches(document: dict, query: dict | None) -> bool:
+    """The subset of the Mongo query language the bot uses."""
+    for path, condition in (query or {}).items():
+        if path == "$or":
+            if not any(matches(document, x) for x in condition):
+                return False
+            continue
+        value = value_at(document, path)
+        if isinstance(condition, dict) and all(x.startswith("$") for x in condition):
+            if not all(OPERATORS[op](value, x) for op, x in condition.items()):
+                return False
+        elif condition is None:
+            if value not in (MISSING, None):
+                return False
+        elif value is MISSING or value != condition:
+            return False
+    return True
+
+
+def project(document: dict, projection: dict | None) -> dict:
+    if not projection:
+        return copy.deepcopy(document)
+    if any(include for path, include in projection.items() if path != "_id"):
+        result = {"_id": document["_id"]} if projection.get("_id", 1) else {}
+        for path, include in projection.items():
+            value = value_at(document, path)
+            if path == "_id" or not include or value is MISSING:
+                continue
+            target = result
+            *parents, field = path.split(".")
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[field] = copy.deepcopy(value)
+        return result
+    result = copy.deepcopy(document)
+    for path in projection:
+        result.pop(path, None)
+    return result
+
+
+def apply_update(document: dict, update: dict, inserting: bool):
+    for op, fields in update.items():
+        if op == "$set" or (op == "$setOnInsert" and inserting):
+            document.update(copy.deepcopy(fields))
+        elif op == "$unset":
+            for field in fields:
+                document.pop(field, None)
+        elif op == "$inc":
+            for field, amount in fields.items():
+                document[field] = document.get(field, 0) + amount
+
+
+class FakeCursor:
+    def __init__(self, documents: list, codec_options: CodecOptions):
+        self.documents = documents
+        self.codec_options = codec_options
+
+    def sort(self, key: str, direction: int = ASCENDING):
+        self.documents.sort(
+            key=lambda x: x.get(key), reverse=(direction != ASCENDING)
+        )
+        return self
+
+    def limit(self, length: int):
+        self.documents = self.documents[:length]
+        return self
+
+    def result(self) -> list:
+        if self.codec_options.document_class is RawBSONDocument:
+            return [RawBSONDocument(bson.encode(x)) for x in self.documents]
+        return self.documents
+
+    async def to_list(self, length: int | None = None):
+        return self.result()[:length] if length else self.result()
+
+    def __iter__(self):
+        return iter(self.result())
+
+    async def __aiter__(self):
+        for x in self.result():
+            yield x
+
+
+class FakeChangeStream:
+    """Returns the changes added to the collection, then waits for more."""
+
+    def __init__(self, collection: "FakeCollection"):
+        self.collection = collection
+        self.resume_token = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while len(self.collection.changes) == 0:
+            await asyncio.sleep(0.01)
+        change = self.collection.changes.pop(0)
+        self.resume_token = {"_data": len(self.collection.changes)}
+        return change
+
+
+class FakeCollection:
+    """
+    An in-memory collection with the Motor (async) and pymongo (sync) methods
+    the bot uses. Writes raise the exceptions in `failures` first, one per write.
+    Bulk writes wait `write_delay` seconds and are recorded in `bulk_writes`.
+    """
+
+    def __init__(self, codec_options: CodecOptions | None = None):
+        self.codec_options = codec_options or CodecOptions()
+        self.documents: dict = {}
+        self.failures: list[Exception] = []
+        self.changes: list[dict] = []
+        self.watch_error: Exception | None = None
+        self.queries: list[dict] = []
+        self.bulk_writes: list[list] = []
+        self.write_delay = 0.0
+
+    def add(self, *documents: dict):
+        for x in documents:
+            self.documents[x["_id"]] = copy.deepcopy(x)
+
+    def with_options(self, codec_options: CodecOptions):
+        view = FakeCollection(codec_options)
+        view.documents = self.documents
+        view.queries = self.queries
+        return view
+
+    def fail_on_write(self):
+        if self.failures:
+            raise self.failures.pop(0)
+
+    def find(self, query: dict | None = None, projection: dict | None = None):
+        self.queries.append(query or {})
+        return FakeCursor(
+            [
+                project(x, projection)
+                for x in self.documents.values()
+                if matches(x, query)
+            ],
+            self.codec_options,
+        )
+
+    def aggregate(self, pipeline: list[dict]):
+        cursor = self.find({})
+        for stage in pipeline:
+            if "$sort" in stage:
+                for key, direction in reversed(stage["$sort"].items()):
+                    cursor.sort(key, direction)
+            elif "$limit" in stage:
+                cursor.limit(stage["$limit"])
+        return cursor
+
+    async def find_one(self, query: dict, projection: dict | None = None):
+        documents = await self.find(query, projection).to_list(length=1)
+        return documents[0] if documents else None
+
+    async def find_one_and_update(
+        self,
+        query: dict,
+        update: dict,
+        return_document: ReturnDocument = ReturnDocument.BEFORE,
+    ):
+        self.fail_on_write()
+        for x in self.documents.values():
+            if matches(x, query):
+                before = copy.deepcopy(x)
+                apply_update(x, update, inserting=False)
+                return copy.deepcopy(x) if return_document else before
+        return None
+
+    async def update_one(self, query: dict, update: dict, upsert: bool = False):
+        self.fail_on_write()
+        self.update(query, update, upsert)
+
+    async def replace_one(self, query: dict, replacement: dict, upsert: bool = False):
+        self.fail_on_write()
+        self.update(query, replacement, upsert)
+
+    def update(self, query: dict, update: dict, upsert: bool):
+        for x in self.documents.values():
+            if matches(x, query):
+                if any(op.startswith("$") for op in update):
+                    apply_update(x, update, inserting=False)
+                else:
+                    self.documents[x["_id"]] = copy.deepcopy(update)
+                return
+        if upsert:
+            document = {k: v for k, v in query.items() if not k.startswith("$")}
+            if any(op.startswith("$") for op in update):
+                apply_update(document, update, inserting=True)
+            else:
+                document.update(copy.deepcopy(update))
+            self.documents[document["_id"]] = document
+
+    async def bulk_write(self, requests: list, ordered: bool = True):
+        await asyncio.sleep(self.write_delay)
+        self.fail_on_write()
+        self.bulk_writes.append(requests)
+        for request in requests:
+            self.update(request._filter, request._doc, request._upsert)
+
+    async def create_index(self, keys, **kwargs):
+        pass
+
+    def watch(self, pipeline: list | None = None, **kwargs):
+        if self.watch_error:
+            raise self.watch_error
+        return FakeChangeStream(self)
+
+
+class FakeDatabase(dict):
+    """Collections by name, created when first used."""
+
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+
+class FakeMongo:
+    """Stands in for both `MongoDB` and `MongoMotor`."""
+
+    def __init__(self):
+        self.mainnet = FakeDatabase()
+        self.testnet = FakeDatabase()
+        self.utilities = FakeDatabase()
+        self.utilities_db = FakeDatabase()
+
+
+def block_document(height: int, transaction_hashes: list[str] | None = None) -> dict:
+    return {
+        "_id": f"block_{height}",
+        "hash": f"block_{height}",
+        "height": height,
+        "last_finalized_block": f"block_{height - 1}",
+        "parent_block": f"block_{height - 1}",
+        "slot_time": dt.datetime(2024, 1, 1) + dt.timedelta(seconds=height),
+        "era_block_height": height,
+        "finalized": True,
+        "genesis_index": 0,
+        "transaction_count": len(transaction_hashes or []),
+        "transactions_energy_cost": 0,
+        "transactions_size": 0,
+        "transaction_hashes": transaction_hashes or [],
+    }
+
+
+def payday_document() -> dict:
+    return {
+        "_id": "2024-01-01",
+        "date": "2024-01-01",
+        "height_for_first_block": 1,
+        "height_for_last_block": 100,
+        "hash_for_first_block": "first",
+        "hash_for_last_block": "last",
+        "payday_duration_in_seconds": 86400,
+        "payday_block_slot_time": dt.datetime(2024, 1, 1),
+        "bakers_with_delegation_information": {},
+        "baker_account_ids": {},
+    }
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def fake_grpcclient() -> FakeGRPCClient:
+    return FakeGRPCClient()
+
+
+@pytest.fixture
+def fake_mongodb() -> FakeMongo:
+    mongodb = FakeMongo()
+    mongodb.mainnet[Collections.paydays].add(payday_document())
+    return mongodb
+
+
+@pytest.fixture
+def fake_mongomoter() -> FakeMongo:
+    return FakeMongo()
+
+
+@pytest.fixture
+def add_block(fake_mongomoter: FakeMongo):
+    """Adds a block to the (mainnet) blocks collection the pipeline reads."""
+
+    def add(height: int, transaction_hashes: list[str] | None = None) -> dict:
+        document = block_document(height, transaction_hashes)
+        fake_mongomoter.mainnet[Collections.blocks].add(document)
+        return document
+
+    return add
+
+
+@pytest.fixture
+def offline_bot(
+    fake_grpcclient: FakeGRPCClient,
+    fake_mongodb: FakeMongo,
+    fake_mongomoter: FakeMongo,
+) -> Bot:
+    """A `Bot` on in-memory fakes of the node, the databases and HTTP."""
+    bot = Bot(
+        Connections.model_construct(
+            tooter=types.SimpleNamespace(
+                plain_url="https://tooter",
+                BOT_API_TOKEN="token",
+                email_part_1="mailtos://?to=",
+                email_part_2="&user=bot",
+            ),
+            mongodb=fake_mongodb,
+            mongomoter=fake_mongomoter,
+            grpcclient=fake_grpcclient,
+        )
+    )
+    bot.http_session = FakeHTTPSession()
+    return bot
@@ -0,0 +1,64 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+import asyncio
+import types
+
+import pytest
+
+from bot import Bot
+
+
+def transaction(sender: str, effect: str):
+    effects = types.SimpleNamespace(model_fields_set={effect})
+    return types.SimpleNamespace(
+        account_transaction=types.SimpleNamespace(sender=sender, effects=effects)
+    )
+
+
+def block():
+    return types.SimpleNamespace(
+        block_info=types.SimpleNamespace(hash="hash", parent_block="parent"),
+        transaction_summaries=[
+            transaction("a", "delegation_configured"),
+            transaction("b", "baker_configured"),
+            transaction("b", "baker_configured"),
+            transaction("c", "account_transfer"),
+            types.SimpleNamespace(account_transaction=None),
+        ],
+    )
+
+
+@pytest.fixture
+def bot(offline_bot: Bot) -> Bot:
+    grpcclient = offline_bot.connections.grpcclient
+    grpcclient.accounts = {"a": 1, "b": 2}
+    grpcclient.unavailable_accounts = {"b"}
+    grpcclient.delay = 0.05
+    return offline_bot
+
+
+def test_lookups_are_collected_once(bot: Bot):
+    assert bot.account_info_lookups(block()) == {
+        ("hash", "a"),
+        ("parent", "a"),
+        ("parent", "b"),
+    }
+
+
+def test_prefetch_is_concurrent_and_capped(bot: Bot):
+    bot.grpc_semaphore = asyncio.Semaphore(2)
+    account_infos = asyncio.run(bot.prefetch_account_infos(block()))
+    assert {k: v.address for k, v in account_infos.items()} == {
+        ("hash", "a"): "a",
+        ("parent", "a"): "a",
+    }
+    assert bot.connections.grpcclient.max_in_flight == 2
+
+
+def test_failed_lookups_are_retried_when_used(bot: Bot):
+    account_infos = asyncio.run(bot.prefetch_account_infos(block()))
+    assert bot.account_info_at(account_infos, "hash", "a").index == 1
+    calls = len(bot.connections.grpcclient.calls)
+    with pytest.raises(Exception):
+        bot.account_info_at(account_infos, "parent", "b")
+    assert len(bot.connections.grpcclient.calls) == calls + 1
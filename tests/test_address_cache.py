@@ -0,0 +1,41 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+from bot import Bot
+from bot.address_cache import AddressResolutionCache
+
+
+def test_one_lookup_fills_both_directions():
+    cache = AddressResolutionCache(max_size=10, ttl=60)
+    cache.put("alias", 7, canonical_address="canonical")
+    assert cache.get_index("alias") == 7
+    assert cache.get_index("canonical") == 7
+    assert cache.get_address(7) == "canonical"
+
+
+def test_entries_expire_and_are_evicted(clock):
+    cache = AddressResolutionCache(max_size=2, ttl=60, clock=clock)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get_index("a")
+    cache.put("c", 3)
+    # "b" was least recently used
+    assert cache.get_index("b") is None
+    assert cache.get_index("a") == 1
+
+    clock.now = 61
+    assert cache.get_index("a") is None
+    assert cache.get_address(3) is None
+
+
+def test_node_is_asked_once_per_account(offline_bot: Bot):
+    offline_bot.connections.grpcclient.accounts = {"a" * 50: 42}
+
+    for _ in range(3):
+        address = offline_bot.complete_address("a" * 50)
+    assert address.account.index == 42
+    assert offline_bot.complete_address(42).account.id == "a" * 50
+    assert len(offline_bot.connections.grpcclient.calls) == 1
+    assert offline_bot.metrics.counters == {
+        "address_cache_misses": 1,
+        "address_cache_hits": 3,
+    }
@@ -0,0 +1,73 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+import datetime as dt
+
+from ccdexplorer_fundamentals.cis import MongoTypeLoggedEvent
+from ccdexplorer_fundamentals.GRPCClient.CCD_Types import *
+
+from bot.block_filters import *
+
+
+def transaction(effects: dict) -> dict:
+    return {
+        "_id": "hash",
+        "hash": "hash",
+        "account_transaction": {
+            "cost": 1,
+            "sender": "sender",
+            "outcome": "success",
+            "effects": effects,
+        },
+        "block_info": {
+            "height": 1,
+            "hash": "block",
+            "slot_time": dt.datetime.now().astimezone(tz=dt.timezone.utc),
+        },
+        "recognized_sender_id": "sender",
+    }
+
+
+def test_notifying_effects():
+    assert "account_transfer" in NOTIFYING_EFFECTS
+    assert "delegation_configured" in NOTIFYING_EFFECTS
+    assert "baker_stake_updated" not in NOTIFYING_EFFECTS
+    assert "none" not in NOTIFYING_EFFECTS
+    assert transaction_can_notify(
+        transaction({"account_transfer": {"amount": 1, "receiver": "receiver"}})
+    )
+    assert not transaction_can_notify(transaction({"baker_removed": 1}))
+    assert transaction_can_notify({"_id": "hash", "account_creation": {}})
+
+
+def test_transactions_query_matches_every_notifying_effect():
+    query = transactions_query(["hash"])
+    assert query["_id"] == {"$in": ["hash"]}
+    fields = [list(x.keys())[0] for x in query["$or"]]
+    for effect in NOTIFYING_EFFECTS:
+        assert f"account_transaction.effects.{effect}" in fields
+    assert "account_creation" in fields and "update" in fields
+
+
+def test_projected_documents_still_validate():
+    document = transaction({"account_transfer": {"amount": 1, "receiver": "receiver"}})
+    projected = {k: v for k, v in document.items() if k not in TRANSACTIONS_PROJECTION}
+    assert CCD_BlockItemSummary(**projected).account_transaction.effects.account_transfer
+
+    logged_event = {
+        "_id": "1-hash-0",
+        "logged_event": "ff",
+        "result": {},
+        "tag": 255,
+        "event_type": "transfer_event",
+        "block_height": 1,
+        "tx_index": 0,
+        "ordering": 0,
+        "tx_hash": "hash",
+        "token_address": "<1,0>-",
+        "contract": "<1,0>",
+        "date": "2024-01-01",
+    }
+    MongoTypeLoggedEvent(
+        **{k: v for k, v in logged_event.items() if k not in LOGGED_EVENTS_PROJECTION}
+    )
+    assert logged_events_query(1, 2)["tag"] == {"$in": [253, 254, 255]}
@@ -0,0 +1,149 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+import asyncio
+
+import bson
+import pytest
+from ccdexplorer_fundamentals.GRPCClient.CCD_Types import *
+from ccdexplorer_fundamentals.mongodb import Collections
+
+from bot import Bot
+
+
+def transaction_document(tx_hash: str, effects: dict) -> dict:
+    return {
+        "_id": tx_hash,
+        "hash": tx_hash,
+        "index": 0,
+        "energy_cost": 600,
+        "account_transaction": {
+            "cost": 1000,
+            "sender": "sender",
+            "outcome": "success",
+            "effects": effects,
+        },
+        "block_info": {"height": 1},
+    }
+
+
+def logged_event_document(height: int, tx_index: int, ordering: int) -> dict:
+    return {
+        "_id": f"{height}-{tx_index}-{ordering}",
+        "logged_event": "ff",
+        "result": {"tag": 255},
+        "tag": 255,
+        "event_type": "transfer_event",
+        "block_height": height,
+        "tx_index": tx_index,
+        "ordering": ordering,
+        "tx_hash": f"tx_{tx_index}",
+        "token_address": "<9390,0>-01",
+        "contract": "<9390,0>",
+    }
+
+
+def payday_account_reward(account: str) -> dict:
+    return {
+        "payday_account_reward": {
+            "account": account,
+            "transaction_fees": 1,
+            "baker_reward": 2,
+            "finalization_reward": 0,
+        }
+    }
+
+
+def get_blocks_in_range(bot: Bot, start_height: int, end_height: int):
+    return asyncio.run(
+        bot.get_blocks_in_range(
+            bot.connections.mongomoter.mainnet, "mainnet", start_height, end_height
+        )
+    )
+
+
+@pytest.fixture
+def db(offline_bot: Bot):
+    return offline_bot.connections.mongomoter.mainnet
+
+
+def test_stops_at_the_first_missing_height(offline_bot: Bot, add_block):
+    for height in [10, 11, 13]:
+        add_block(height)
+    blocks, missing_height, fetched_bytes = get_blocks_in_range(offline_bot, 10, 14)
+    assert [x.block_info.height for x in blocks] == [10, 11]
+    assert missing_height == 12
+    assert fetched_bytes > 0
+
+    blocks, missing_height, _ = get_blocks_in_range(offline_bot, 12, 14)
+    assert blocks == []
+    assert missing_height == 12
+
+
+def test_transactions_are_mapped_to_their_blocks(offline_bot: Bot, add_block, db):
+    add_block(10, ["tx_a", "tx_removed", "tx_b"])
+    add_block(11, ["tx_c"])
+    db[Collections.transactions].add(
+        transaction_document("tx_a", {"account_transfer": {"amount": 1, "receiver": "r"}}),
+        transaction_document("tx_b", {"data_registered": "ab"}),
+        # can't lead to a notification, so not retrieved
+        transaction_document("tx_removed", {"baker_removed": 1}),
+        transaction_document("tx_c", {"account_transfer": {"amount": 2, "receiver": "r"}}),
+    )
+    blocks, missing_height, _ = get_blocks_in_range(offline_bot, 10, 11)
+    assert missing_height is None
+    assert [[x.hash for x in block.transaction_summaries] for block in blocks] == [
+        ["tx_a", "tx_b"],
+        ["tx_c"],
+    ]
+    assert all(block.net == "mainnet" for block in blocks)
+
+
+def test_logged_events_are_sorted_per_block(offline_bot: Bot, add_block, db):
+    add_block(10)
+    add_block(11)
+    db[Collections.tokens_logged_events].add(
+        logged_event_document(10, 1, 0),
+        logged_event_document(11, 0, 0),
+        logged_event_document(10, 0, 1),
+        logged_event_document(10, 0, 0),
+    )
+    blocks, _, _ = get_blocks_in_range(offline_bot, 10, 11)
+    assert [(x.tx_index, x.ordering) for x in blocks[0].logged_events] == [
+        (0, 0),
+        (0, 1),
+        (1, 0),
+    ]
+    assert [(x.tx_index, x.ordering) for x in blocks[1].logged_events] == [(0, 0)]
+
+
+def test_special_events_fall_back_to_the_node(offline_bot: Bot, add_block, db):
+    add_block(10)
+    add_block(11)
+    db[Collections.special_events].add(
+        {"_id": 10, "special_events": [payday_account_reward("stored")]}
+    )
+    grpcclient = offline_bot.connections.grpcclient
+    grpcclient.special_events["block_11"] = [
+        CCD_BlockSpecialEvent(**payday_account_reward("from_node"))
+    ]
+    blocks, _, _ = get_blocks_in_range(offline_bot, 10, 11)
+    assert [
+        [x.payday_account_reward.account for x in block.special_events]
+        for block in blocks
+    ] == [["stored"], ["from_node"]]
+    assert [x[0] for x in grpcclient.calls_to("get_block_special_events")] == [
+        "block_11"
+    ]
+
+
+def test_fetched_bytes_include_special_events(offline_bot: Bot, add_block, db):
+    block_document = add_block(10)
+    special_events = {
+        "_id": 10,
+        "special_events": [payday_account_reward(f"account_{i}") for i in range(100)],
+    }
+    db[Collections.special_events].add(special_events)
+    _, _, fetched_bytes = get_blocks_in_range(offline_bot, 10, 10)
+    assert fetched_bytes == len(bson.encode(block_document)) + len(
+        bson.encode(special_events)
+    )
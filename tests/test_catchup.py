@@ -0,0 +1,36 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+from bot.catchup import CatchUpWindow
+
+
+def test_window_is_single_block_at_tip():
+    window = CatchUpWindow(max_blocks=250, memory_budget_bytes=256 * 1024 * 1024)
+    assert window.next_step(0) == 0
+    assert window.next_step(1) == 1
+    assert window.next_step(1) == 1
+
+
+def test_window_grows_up_to_ceiling_when_behind():
+    window = CatchUpWindow(max_blocks=16, memory_budget_bytes=256 * 1024 * 1024)
+    steps = [window.next_step(10_000) for _ in range(6)]
+    assert steps == [2, 4, 8, 16, 16, 16]
+
+
+def test_window_shrinks_back_when_caught_up():
+    window = CatchUpWindow(max_blocks=64, memory_budget_bytes=256 * 1024 * 1024)
+    for _ in range(6):
+        window.next_step(10_000)
+    assert window.next_step(3) == 3
+    assert window.next_step(1) == 1
+    assert window.size == 1
+
+
+def test_window_respects_memory_budget():
+    window = CatchUpWindow(max_blocks=1_000, memory_budget_bytes=100_000)
+    window.record_fetch(block_count=10, fetched_bytes=100_000)
+    for _ in range(12):
+        step = window.next_step(10_000)
+    assert step == 10
+    # blocks still waiting to be processed count against the budget
+    assert window.next_step(10_000, pending_blocks=4) == 6
+    assert window.next_step(10_000, pending_blocks=10) == 0
@@ -0,0 +1,56 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+import asyncio
+import types
+
+import pytest
+
+from bot import Bot
+from bot.checkpoint import CheckpointManager
+
+
+def test_due_after_max_blocks_or_max_seconds(clock):
+    checkpoints = CheckpointManager(max_blocks=3, max_seconds=10, clock=clock)
+    assert not checkpoints.advance(1, "mainnet")
+    assert not checkpoints.advance(2, "mainnet")
+    assert checkpoints.advance(3, "mainnet")
+    assert checkpoints.take() == (3, "mainnet")
+    assert checkpoints.take() is None
+
+    assert not checkpoints.advance(4, "mainnet")
+    clock.now = 10
+    assert checkpoints.is_due()
+    assert checkpoints.take() == (4, "mainnet")
+    assert not checkpoints.is_due()
+
+
+@pytest.fixture
+def bot(offline_bot: Bot) -> Bot:
+    offline_bot.checkpoints = CheckpointManager(max_blocks=2, max_seconds=60)
+    offline_bot.written = []
+
+    async def update_helper(id, replacement_value, net):
+        offline_bot.written.append(replacement_value["height"])
+
+    offline_bot.update_helper = update_helper
+    return offline_bot
+
+
+def block(height: int):
+    return types.SimpleNamespace(
+        net="mainnet", block_info=types.SimpleNamespace(height=height, slot_time=None)
+    )
+
+
+def test_blocks_are_checkpointed_in_batches(bot: Bot):
+
+    async def process():
+        for height in range(1, 6):
+            await bot.checkpoint_block(block(height))
+        # on shutdown
+        await bot.commit_checkpoint()
+
+    asyncio.run(process())
+    assert bot.written == [2, 4, 5]
+    assert bot.last_processed_block_height == 5
+    assert bot.metrics.counters["checkpoints_written"] == 3
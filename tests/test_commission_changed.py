@@ -0,0 +1,40 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+import asyncio
+
+import pytest
+
+from bot import Bot
+
+
+@pytest.fixture
+def bot(offline_bot: Bot) -> Bot:
+    grpcclient = offline_bot.connections.grpcclient
+    grpcclient.delegators = {5: ["nightly", "cached", "new_1", "new_2"]}
+    grpcclient.accounts = {"new_1": 101, "new_2": 102}
+    offline_bot.set_nightly_accounts([{"_id": "nightly", "index": 1}])
+    offline_bot.address_cache.put("cached", 2)
+    return offline_bot
+
+
+def test_only_unknown_delegators_are_looked_up(bot: Bot):
+    delegators = asyncio.run(bot.delegators_for_pool(5, {}))
+    assert delegators == [1, 2, 101, 102]
+    assert sorted(
+        x[1] for x in bot.connections.grpcclient.calls_to("get_account_info")
+    ) == ["new_1", "new_2"]
+    # and are cached for later lookups
+    assert bot.address_cache.get_index("new_1") == 101
+
+
+def test_delegators_are_looked_up_once_per_pool_per_block(bot: Bot):
+    pool_delegators = {}
+
+    async def two_commission_changes():
+        await bot.delegators_for_pool(5, pool_delegators)
+        await bot.delegators_for_pool(5, pool_delegators)
+
+    asyncio.run(two_commission_changes())
+    grpcclient = bot.connections.grpcclient
+    assert [x[0] for x in grpcclient.calls_to("get_delegators_for_pool")] == [5]
+    assert len(grpcclient.calls_to("get_account_info")) == 2
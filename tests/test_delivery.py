@@ -0,0 +1,121 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+import asyncio
+
+import pytest
+
+import bot.delivery_logic
+from bot import Bot
+from bot.delivery_logic import DeliveryError
+from bot.rate_limit import ChatRateLimiter, TokenBucket
+
+
+def test_token_bucket_allows_burst_then_waits(clock):
+    bucket = TokenBucket(rate=30, clock=clock)
+    waits = [bucket.reserve() for _ in range(31)]
+    assert waits[:30] == [0.0] * 30
+    assert abs(waits[30] - 1 / 30) < 1e-9
+
+    clock.now = 1.0
+    assert bucket.reserve() == 0.0
+
+
+def test_per_chat_limit_is_independent_per_chat(clock):
+    limiter = ChatRateLimiter(global_rate=30, per_chat_rate=1, clock=clock)
+    assert limiter.chat_bucket(1).reserve() == 0.0
+    assert limiter.chat_bucket(2).reserve() == 0.0
+    assert limiter.chat_bucket(1).reserve() == 1.0
+
+
+@pytest.fixture
+def b(offline_bot: Bot, monkeypatch) -> Bot:
+    monkeypatch.setattr(bot.delivery_logic, "DELIVERY_RETRY_BASE_DELAY", 0)
+    monkeypatch.setattr(bot.delivery_logic, "DELIVERY_MAX_RETRIES", 3)
+    return offline_bot
+
+
+def test_retries_on_rate_limit_and_server_errors(b: Bot):
+    responses = [
+        DeliveryError("429", retry=True),
+        DeliveryError("502", retry=True),
+        None,
+    ]
+
+    async def send():
+        response = responses.pop(0)
+        if response:
+            raise response
+
+    assert asyncio.run(b.with_retries("telegram", send))
+    assert b.metrics.counters == {"telegram_retries": 2, "telegram_delivered": 1}
+
+
+def test_does_not_retry_client_errors(b: Bot):
+    calls = []
+
+    async def send():
+        calls.append(1)
+        raise DeliveryError("400", retry=False)
+
+    assert not asyncio.run(b.with_retries("telegram", send))
+    assert len(calls) == 1
+    assert b.metrics.counters == {"telegram_failed": 1}
+
+
+def test_gives_up_after_max_retries(b: Bot):
+
+    async def send():
+        raise ConnectionError("no route")
+
+    assert not asyncio.run(b.with_retries("email", send))
+    assert b.metrics.counters == {"email_retries": 3, "email_failed": 1}
+
+
+def test_email_is_retried_on_server_errors(b: Bot):
+    statuses = [503, 429, 200]
+    b.http_session.respond = lambda method, url, payload: (statuses.pop(0), {})
+
+    assert asyncio.run(b.send_email("a@b.c", "title", "body"))
+    method, url, payload = b.http_session.requests[0]
+    assert (method, url) == ("post", "https://tooter/notify")
+    assert payload["urls"] == "mailtos://?to=a@b.c&user=bot"
+    assert payload["body"].startswith("body")
+    assert b.metrics.counters == {"email_retries": 2, "email_delivered": 1}
+
+
+def test_email_timeouts_are_retried(b: Bot):
+    def respond(method, url, payload):
+        raise asyncio.TimeoutError()
+
+    b.http_session.respond = respond
+    assert not asyncio.run(b.send_email("a@b.c", "title", "body"))
+    assert len(b.http_session.requests) == 4
+    assert b.metrics.counters == {"email_retries": 3, "email_failed": 1}
+
+
+def test_a_retry_after_beyond_the_lease_is_left_to_the_outbox(b: Bot):
+    b.http_session.respond = lambda method, url, payload: (
+        429,
+        {},
+        {"Retry-After": "3600"},
+    )
+
+    result = asyncio.run(asyncio.wait_for(b.send_email("a@b.c", "title", "body"), 1))
+    assert not result
+    assert result.retry_after == 3600
+    assert len(b.http_session.requests) == 1
+    assert b.metrics.counters == {"email_failed": 1}
+
+
+def test_retries_stop_when_the_budget_is_spent(b: Bot, monkeypatch):
+    monkeypatch.setattr(bot.delivery_logic, "DELIVERY_RETRY_BASE_DELAY", 0.01)
+    monkeypatch.setattr(bot.delivery_logic, "DELIVERY_REQUEST_TIMEOUT", 0)
+    monkeypatch.setattr(bot.delivery_logic, "DELIVERY_RETRY_BUDGET", 0.05)
+
+    async def send():
+        raise ConnectionError("no route")
+
+    # waits 0.01 and 0.02; the next wait (0.04) would pass the budget.
+    result = asyncio.run(b.with_retries("email", send))
+    assert result.retry_after == 0.04
+    assert b.metrics.counters == {"email_retries": 2, "email_failed": 1}
@@ -0,0 +1,82 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+import asyncio
+
+import pytest
+
+from bot.message_log import MessageLogWriter
+from bot.metrics import Metrics
+
+
+@pytest.fixture
+def collection(fake_mongomoter):
+    return fake_mongomoter.utilities["message_log"]
+
+
+def batches(collection) -> list[list[str]]:
+    return [[x._doc["_id"] for x in batch] for batch in collection.bulk_writes]
+
+
+def test_records_are_written_in_batches(collection):
+    writer = MessageLogWriter(Metrics(), batch_size=2, flush_interval=60, max_buffer=10)
+    for i in range(5):
+        writer.add({"_id": f"event-{i}"})
+    assert writer.batch_ready.is_set()
+    asyncio.run(writer.flush(collection))
+    assert batches(collection) == [
+        ["event-0", "event-1"],
+        ["event-2", "event-3"],
+        ["event-4"],
+    ]
+    assert len(collection.documents) == 5
+    assert writer.metrics.counters["message_log_written"] == 5
+
+
+def test_a_full_buffer_drops_the_oldest_records():
+    writer = MessageLogWriter(Metrics(), batch_size=10, flush_interval=60, max_buffer=2)
+    for i in range(3):
+        writer.add({"_id": f"event-{i}"})
+    assert [x["_id"] for x in writer.records] == ["event-1", "event-2"]
+    assert writer.metrics.counters["message_log_dropped"] == 1
+
+
+def test_failed_writes_dont_raise(collection):
+    writer = MessageLogWriter(Metrics(), batch_size=10, flush_interval=60, max_buffer=10)
+    writer.add({"_id": "event-0"})
+    collection.failures.append(Exception("not available"))
+    asyncio.run(writer.flush(collection))
+    assert writer.metrics.counters["message_log_failed"] == 1
+    assert len(writer.records) == 0
+
+
+def test_run_flushes_on_interval(collection):
+    writer = MessageLogWriter(Metrics(), batch_size=10, flush_interval=0.01, max_buffer=10)
+
+    async def run():
+        task = asyncio.create_task(writer.run(collection))
+        writer.add({"_id": "event-0"})
+        await asyncio.sleep(0.1)
+        task.cancel()
+
+    asyncio.run(run())
+    assert batches(collection) == [["event-0"]]
+
+
+def test_a_cancelled_write_keeps_its_batch_for_the_final_flush(collection):
+    writer = MessageLogWriter(Metrics(), batch_size=2, flush_interval=60, max_buffer=10)
+    for i in range(3):
+        writer.add({"_id": f"event-{i}"})
+    collection.write_delay = 60
+
+    async def run():
+        task = asyncio.create_task(writer.run(collection))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        # what stop_pipeline does after cancelling the writer.
+        collection.write_delay = 0
+        await writer.flush(collection)
+
+    asyncio.run(run())
+    assert [x["_id"] for x in writer.records] == []
+    assert batches(collection) == [["event-0", "event-1"], ["event-2"]]
@@ -0,0 +1,45 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+from bot.nightly_accounts import NightlyAccountIndex
+
+
+def test_index_resolves_both_directions():
+    index = NightlyAccountIndex.from_documents(
+        iter(
+            [
+                {"_id": "address_0", "index": 0},
+                {"_id": "address_2", "index": 2},
+                {"_id": "address_1", "index": 1},
+            ]
+        )
+    )
+    assert len(index) == 3
+    assert index.index_for("address_2") == 2
+    assert index.address_for(1) == "address_1"
+    # the same string is used in both directions
+    assert index.address_for(2) is next(k for k in index.indices if k == "address_2")
+
+
+def test_unknown_accounts():
+    index = NightlyAccountIndex.from_documents([{"_id": "address_3", "index": 3}])
+    assert index.address_for(1) is None
+    assert index.address_for(4) is None
+    assert index.address_for(-1) is None
+    assert index.index_for("address_0") is None
+
+
+def test_accounts_seen_in_blocks_dont_move_the_collection_position():
+    index = NightlyAccountIndex.from_documents(
+        [{"_id": "address_0", "index": 0}, {"_id": "address_1", "index": 1}]
+    )
+    assert index.max_collection_index == 1
+    # created after the nightly run, seen in a block
+    index.add("address_3", 3)
+    assert index.max_collection_index == 1
+    # a later read of the collection also returns address_2 and address_3
+    index.add_documents(
+        [{"_id": "address_2", "index": 2}, {"_id": "address_3", "index": 3}]
+    )
+    assert index.max_collection_index == 3
+    assert len(index) == 4
+    assert index.address_for(2) == "address_2"
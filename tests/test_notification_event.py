@@ -0,0 +1,54 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+import datetime as dt
+
+from notification_classes import *
+
+
+def event(event_type: EventType) -> NotificationEvent:
+    return NotificationEvent(
+        event_type=event_type,
+        block_height=1,
+        block_hash="hash",
+        block_slot_time=dt.datetime.now().astimezone(tz=dt.timezone.utc),
+    )
+
+
+def test_category_and_sub_type_are_resolved_on_creation():
+    validator = EventTypeValidator(block_validated=True)
+    notification_event = event(EventType(validator=validator))
+    assert notification_event.category == "validator"
+    assert notification_event.sub_type is notification_event.event_type.validator
+    assert notification_event.kind == "block_validated"
+
+
+def test_helper_properties_map_to_their_event_kind():
+    notification_event = event(
+        EventType(
+            validator=EventTypeValidator(
+                earliest_win_time=dt.datetime.now().astimezone(tz=dt.timezone.utc)
+            )
+        )
+    )
+    assert notification_event.kind == "block_validated"
+
+    notification_event = event(
+        EventType(
+            contract=EventTypeContract(
+                contract_update_issued=CCD_ContractUpdateIssued(effects=[]),
+                receive_name="nft.mint",
+            )
+        )
+    )
+    assert notification_event.category == "contract"
+    assert notification_event.kind == "contract_update_issued"
+
+
+def test_kind_survives_a_round_trip():
+    notification_event = event(
+        EventType(other=EventTypeOther(domain_name_minted="name.ccd"))
+    )
+    copied = NotificationEvent(**notification_event.model_dump())
+    assert copied.category == "other"
+    assert copied.kind == "domain_name_minted"
+    assert "_kind" not in notification_event.model_dump()
@@ -0,0 +1,275 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+import asyncio
+import datetime as dt
+import types
+
+import pytest
+from ccdexplorer_fundamentals.mongodb import Collections
+from ccdexplorer_fundamentals.user_v2 import NotificationServices, UserV2
+
+from bot import Bot, outbox_logic
+from bot.checkpoint import CheckpointManager
+from bot.outbox_logic import OutboxMessage, OutboxStatus, event_keys
+from notification_classes import *
+
+
+def transfer_event(tx_hash: str, account_index: int) -> NotificationEvent:
+    return NotificationEvent(
+        event_type=EventType(
+            account=EventTypeAccount(
+                account_transfer=CCD_AccountTransfer(amount=1, receiver="receiver")
+            )
+        ),
+        block_height=1,
+        block_hash="block_hash",
+        block_slot_time=dt.datetime.now().astimezone(tz=dt.timezone.utc),
+        tx_hash=tx_hash,
+        impacted_addresses=[
+            ImpactedAddress(
+                address=CCD_Address_Complete(
+                    account=CCD_AccountAddress_Complete(index=account_index)
+                ),
+                address_type=AddressType.receiver,
+            )
+        ],
+    )
+
+
+def test_event_keys_are_stable_and_unique_within_a_block():
+    events = [
+        transfer_event("tx_1", 5),
+        transfer_event("tx_1", 6),
+        transfer_event("tx_1", 5),
+    ]
+    keys = event_keys(events)
+    assert len(set(keys)) == 3
+    assert keys[2] == f"{keys[0]}-2"
+
+    # labels are set per user and don't change the key
+    events[0].impacted_addresses[0].label = "label"
+    assert event_keys(events) == keys
+    # a block that is processed again gives the same keys
+    assert event_keys([transfer_event("tx_1", 5)]) == keys[:1]
+
+
+def test_outbox_messages_per_channel(offline_bot: Bot):
+    user = UserV2(token="token", telegram_chat_id=1, email_address="a@b.c")
+    message_response = MessageResponse(
+        title_telegram="t", title_email="e", message_telegram="mt", message_email="me"
+    )
+    messages = offline_bot.outbox_messages_for(
+        "key",
+        transfer_event("tx_1", 5),
+        user,
+        {NotificationServices.telegram: True, NotificationServices.email: True},
+        message_response,
+    )
+    assert [(x.id, x.recipient, x.body) for x in messages] == [
+        ("key-token-telegram", 1, "mt"),
+        ("key-token-email", "a@b.c", "me"),
+    ]
+    document = messages[0].model_dump(by_alias=True)
+    assert document["_id"] == "key-token-telegram"
+    assert document["status"] == "pending"
+    assert OutboxMessage(**document) == messages[0]
+
+
+def now() -> dt.datetime:
+    return dt.datetime.now().astimezone(tz=dt.timezone.utc)
+
+
+def outbox_message(id: str, created_at: dt.datetime | None = None) -> OutboxMessage:
+    return OutboxMessage(
+        id=id,
+        event_key="key",
+        user_key="token",
+        channel=NotificationServices.telegram,
+        recipient=1,
+        title="title",
+        body="body",
+        block_height=1,
+        created_at=created_at or now(),
+    )
+
+
+@pytest.fixture
+def outbox(offline_bot: Bot):
+    return offline_bot.outbox()
+
+
+def test_a_message_is_claimed_once(offline_bot: Bot, outbox):
+    message = outbox_message("a")
+    asyncio.run(offline_bot.write_to_outbox([message]))
+    claimed = asyncio.run(offline_bot.claim_outbox_message(message))
+    assert claimed.status == OutboxStatus.sending
+    assert claimed.attempts == 1
+    assert asyncio.run(offline_bot.claim_outbox_message(message)) is None
+
+    # writing it again (block processed again) doesn't reset it.
+    asyncio.run(offline_bot.write_to_outbox([message]))
+    assert outbox.documents["a"]["status"] == OutboxStatus.sending
+
+
+def test_an_expired_lease_can_be_claimed_again(offline_bot: Bot, outbox):
+    message = outbox_message("a")
+    asyncio.run(offline_bot.write_to_outbox([message]))
+    asyncio.run(offline_bot.claim_outbox_message(message))
+    outbox.documents["a"]["lease_until"] = now() - dt.timedelta(seconds=1)
+
+    claimed = asyncio.run(offline_bot.claim_outbox_message(message))
+    assert claimed.attempts == 2
+
+
+def test_replay_picks_up_undelivered_messages(offline_bot: Bot, outbox):
+    cutoff = now()
+    messages = [
+        outbox_message("old", cutoff - dt.timedelta(minutes=2)),
+        outbox_message("new", cutoff + dt.timedelta(minutes=1)),
+        outbox_message("expired", cutoff - dt.timedelta(minutes=3)),
+        outbox_message("sending", cutoff - dt.timedelta(minutes=4)),
+        outbox_message("delivered", cutoff - dt.timedelta(minutes=5)),
+    ]
+    asyncio.run(offline_bot.write_to_outbox(messages))
+    for id in ["expired", "sending", "delivered"]:
+        asyncio.run(offline_bot.claim_outbox_message(outbox_message(id)))
+    outbox.documents["expired"]["lease_until"] = now() - dt.timedelta(seconds=1)
+    asyncio.run(
+        offline_bot.complete_outbox_message(outbox_message("delivered"), True)
+    )
+
+    replayed = asyncio.run(offline_bot.find_outbox_messages_to_replay(cutoff))
+    assert [x.id for x in replayed] == ["expired", "old"]
+
+
+def test_queued_messages_are_not_replayed(offline_bot: Bot, outbox):
+    cutoff = now()
+    messages = [
+        outbox_message("queued", cutoff - dt.timedelta(minutes=2)),
+        outbox_message("old", cutoff - dt.timedelta(minutes=1)),
+    ]
+    messages[1].recipient = 2
+    asyncio.run(offline_bot.write_to_outbox(messages))
+
+    async def run():
+        # the match stage queued "queued", no worker has picked it up yet.
+        await offline_bot.enqueue_outbox_messages(messages[:1])
+        replayed = await offline_bot.find_outbox_messages_to_replay(cutoff)
+        assert [x.id for x in replayed] == ["old"]
+        await offline_bot.enqueue_outbox_messages(messages)
+        assert offline_bot.telegram_queue.qsize() == 2
+
+        worker = asyncio.create_task(offline_bot.telegram_worker())
+        await asyncio.wait_for(offline_bot.telegram_queue.join(), timeout=1)
+        worker.cancel()
+
+    asyncio.run(run())
+    assert offline_bot.queued_outbox_ids == set()
+    assert outbox.documents["queued"]["status"] == OutboxStatus.delivered
+
+
+def test_failed_messages_are_sent_again_until_abandoned(
+    offline_bot: Bot, outbox, monkeypatch
+):
+    monkeypatch.setattr(outbox_logic, "OUTBOX_MAX_ATTEMPTS", 2)
+    # Telegram doesn't accept the message.
+    offline_bot.http_session.respond = lambda method, url, payload: (400, {})
+    message = outbox_message("a")
+    asyncio.run(offline_bot.write_to_outbox([message]))
+
+    asyncio.run(offline_bot.deliver_outbox_message(message))
+    document = outbox.documents["a"]
+    assert document["status"] == OutboxStatus.failed
+    assert document["next_attempt_at"] > now()
+    assert document.get("delivered_at") is None
+    # not before the next attempt is due
+    assert asyncio.run(offline_bot.find_outbox_messages_to_replay(now())) == []
+    assert asyncio.run(offline_bot.claim_outbox_message(message)) is None
+
+    document["next_attempt_at"] = now() - dt.timedelta(seconds=1)
+    replayed = asyncio.run(offline_bot.find_outbox_messages_to_replay(now()))
+    assert [x.id for x in replayed] == ["a"]
+    asyncio.run(offline_bot.deliver_outbox_message(replayed[0]))
+    document = outbox.documents["a"]
+    assert document["status"] == OutboxStatus.abandoned
+    assert document["attempts"] == 2
+    assert document.get("next_attempt_at") is None
+    assert document.get("delivered_at") is None
+    assert offline_bot.metrics.counters["outbox_abandoned"] == 1
+
+
+def test_a_failed_message_waits_for_retry_after(offline_bot: Bot, outbox):
+    offline_bot.http_session.respond = lambda method, url, payload: (
+        429,
+        {},
+        {"Retry-After": "7200"},
+    )
+    message = outbox_message("a")
+    asyncio.run(offline_bot.write_to_outbox([message]))
+
+    asyncio.run(offline_bot.deliver_outbox_message(message))
+    document = outbox.documents["a"]
+    assert document["status"] == OutboxStatus.failed
+    assert document["next_attempt_at"] > now() + dt.timedelta(seconds=7100)
+
+
+def test_delivered_messages_expire(offline_bot: Bot, outbox):
+    message = outbox_message("a")
+    asyncio.run(offline_bot.write_to_outbox([message]))
+    asyncio.run(offline_bot.deliver_outbox_message(message))
+    assert outbox.documents["a"]["status"] == OutboxStatus.delivered
+    assert outbox.documents["a"]["delivered_at"] is not None
+
+
+def test_a_block_is_not_checkpointed_before_its_messages_are_written(
+    offline_bot: Bot, outbox, monkeypatch
+):
+    monkeypatch.setattr(outbox_logic, "BLOCK_POLL_INTERVAL", 0.01)
+    offline_bot.checkpoints = CheckpointManager(max_blocks=1, max_seconds=60)
+    outbox.failures = [Exception("not primary"), Exception("not primary")]
+    user = UserV2(token="token", telegram_chat_id=1)
+    message_response = MessageResponse(
+        title_telegram="t", title_email="e", message_telegram="mt", message_email="me"
+    )
+
+    async def match_notification_event(notification_event, key=None):
+        services = {
+            NotificationServices.telegram: True,
+            NotificationServices.email: False,
+        }
+        return [(user, services, message_response)]
+
+    offline_bot.match_notification_event = match_notification_event
+    checkpointed = []
+    checkpoint_block = offline_bot.checkpoint_block
+
+    async def record_checkpoint(block):
+        checkpointed.append((block.block_info.height, sorted(outbox.documents)))
+        await checkpoint_block(block)
+
+    offline_bot.checkpoint_block = record_checkpoint
+
+    def block(height: int):
+        return types.SimpleNamespace(
+            net="mainnet",
+            block_info=types.SimpleNamespace(height=height, slot_time=None),
+        )
+
+    async def run():
+        match = asyncio.create_task(offline_bot.match_stage())
+        for height, tx_hash in [(1, "tx_1"), (2, "tx_2")]:
+            await offline_bot.notification_queue.put(
+                (block(height), [transfer_event(tx_hash, 5)], True)
+            )
+        await asyncio.wait_for(offline_bot.notification_queue.join(), timeout=2)
+        match.cancel()
+
+    asyncio.run(run())
+    keys = event_keys([transfer_event("tx_1", 5), transfer_event("tx_2", 5)])
+    assert checkpointed == [
+        (1, [f"{keys[0]}-token-telegram"]),
+        (2, sorted(f"{x}-token-telegram" for x in keys)),
+    ]
+    helpers = offline_bot.connections.mongomoter.mainnet[Collections.helpers]
+    assert helpers.documents["bot_last_processed_block"]["height"] == 2
+    assert offline_bot.metrics.counters["outbox_write_retries"] == 2
@@ -0,0 +1,113 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+import asyncio
+import datetime as dt
+import types
+
+import pytest
+
+from bot import Bot
+from notification_classes import *
+
+
+@pytest.fixture
+def bot(offline_bot: Bot) -> Bot:
+    offline_bot.connections.grpcclient.accounts = {"account_3": 3}
+    offline_bot.set_nightly_accounts(
+        [{"_id": "account_1", "index": 1}, {"_id": "account_2", "index": 2}]
+    )
+    offline_bot.subscription_index.accounts = {"1": ["a"], "2": ["a"], "3": ["b"]}
+    return offline_bot
+
+
+def account_reward(account: str):
+    return types.SimpleNamespace(
+        payday_account_reward=CCD_BlockSpecialEvent_PaydayAccountReward(
+            account=account,
+            transaction_fees=1,
+            baker_reward=2,
+            finalization_reward=0,
+        ),
+        payday_pool_reward=None,
+    )
+
+
+def pool_reward(pool_owner: int):
+    return types.SimpleNamespace(
+        payday_account_reward=None,
+        payday_pool_reward=CCD_BlockSpecialEvent_PaydayPoolReward(
+            pool_owner=pool_owner,
+            transaction_fees=1,
+            baker_reward=2,
+            finalization_reward=0,
+        ),
+    )
+
+
+def block(special_events: list):
+    return types.SimpleNamespace(
+        special_events=special_events,
+        block_info=types.SimpleNamespace(
+            height=100,
+            hash="hash",
+            slot_time=dt.datetime.now().astimezone(tz=dt.timezone.utc),
+        ),
+    )
+
+
+def test_no_lookups_outside_payday(bot: Bot):
+    reward = types.SimpleNamespace(payday_account_reward=None, payday_pool_reward=None)
+    asyncio.run(bot.find_events_in_block_special_events(block([reward])))
+    assert bot.connections.grpcclient.calls == []
+    assert bot.event_queue == []
+
+
+def test_reward_accounts_are_resolved_in_one_batch(bot: Bot):
+    asyncio.run(
+        bot.find_events_in_block_special_events(
+            block(
+                [
+                    account_reward("account_1"),
+                    account_reward("account_2"),
+                    account_reward("account_3"),
+                ]
+            )
+        )
+    )
+    assert [
+        x.impacted_addresses[0].address.account.index for x in bot.event_queue
+    ] == [1, 2, 3]
+    # only the account that is not in the nightly accounts is looked up
+    grpcclient = bot.connections.grpcclient
+    assert [x[1] for x in grpcclient.calls_to("get_account_info")] == ["account_3"]
+    assert len(grpcclient.calls) == 2
+    assert "payday_processing_seconds" in bot.metrics.gauges
+
+
+def test_pool_infos_are_retrieved_for_the_last_block_of_the_payday(bot: Bot):
+    pool_infos = asyncio.run(bot.pool_infos_for_payday([1, 2], "last_block_of_payday"))
+    assert pool_infos == {1: "pool_info_1", 2: "pool_info_2"}
+    assert (2, "last_block_of_payday") in bot.connections.grpcclient.calls_to(
+        "get_pool_info_for_pool"
+    )
+
+
+def test_only_subscribed_rewards_become_events(bot: Bot):
+    bot.subscription_index.accounts = {"2": ["a"]}
+    asyncio.run(
+        bot.find_events_in_block_special_events(
+            block(
+                [
+                    account_reward("account_1"),
+                    account_reward("account_2"),
+                    pool_reward(1),
+                ]
+            )
+        )
+    )
+    assert [
+        x.impacted_addresses[0].address.account.index for x in bot.event_queue
+    ] == [2]
+    # no pool info for a validator no one is subscribed to
+    assert bot.connections.grpcclient.calls_to("get_pool_info_for_pool") == []
+    assert bot.metrics.counters["payday_rewards_skipped"] == 2
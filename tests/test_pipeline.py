@@ -0,0 +1,106 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+import asyncio
+import time
+
+import pytest
+from pymongo.errors import OperationFailure
+from ccdexplorer_fundamentals.GRPCClient.CCD_Types import *
+from ccdexplorer_fundamentals.mongodb import Collections
+
+from bot import Bot, pipeline_logic
+from bot.catchup import CatchUpWindow
+
+
+@pytest.fixture
+def bot(offline_bot: Bot, add_block, monkeypatch) -> Bot:
+    monkeypatch.setattr(pipeline_logic, "BLOCK_POLL_INTERVAL", 5)
+    monkeypatch.setattr(pipeline_logic, "BLOCK_CHANGE_STREAM_TIMEOUT", 60)
+    offline_bot.connections.mongomoter.mainnet[Collections.helpers].add(
+        {"_id": "bot_last_processed_block", "height": 0}
+    )
+    for height in range(1, 6):
+        add_block(height)
+    return offline_bot
+
+
+def blocks(offline_bot: Bot):
+    return offline_bot.connections.mongomoter.mainnet[Collections.blocks]
+
+
+def test_fetch_stage_continues_when_waiting_blocks_are_processed(bot: Bot):
+    # a change stream is open, but no new blocks are inserted.
+    bot.change_stream_active = True
+    # every block is over the memory budget, so blocks are fetched one by one.
+    bot.catch_up_window = CatchUpWindow(max_blocks=10, memory_budget_bytes=1)
+    bot.catch_up_window.average_block_bytes = 1_000
+
+    async def run():
+        fetch = asyncio.create_task(bot.fetch_stage("mainnet"))
+        heights = []
+        while len(heights) < 5:
+            block = await bot.block_queue.get()
+            heights.append(block.block_info.height)
+            await asyncio.sleep(0.01)
+            bot.block_queue.task_done()
+        fetch.cancel()
+        return heights
+
+    start = time.perf_counter()
+    assert asyncio.run(asyncio.wait_for(run(), timeout=5)) == [1, 2, 3, 4, 5]
+    # neither waited for a new block nor for the poll interval.
+    assert time.perf_counter() - start < 1
+
+
+def test_change_stream_is_active_once_opened(bot: Bot):
+    async def run():
+        assert not bot.change_stream_active
+        watch = asyncio.create_task(bot.watch_blocks("mainnet"))
+        await asyncio.sleep(0.05)
+        # the fetch stage is woken up to look at the tip again.
+        assert bot.change_stream_active
+        assert bot.new_block_event.is_set()
+
+        bot.new_block_event.clear()
+        new_block = blocks(bot).documents["block_5"] | {"height": 6}
+        blocks(bot).changes.append({"fullDocument": new_block})
+        await asyncio.wait_for(bot.new_block_event.wait(), timeout=1)
+        assert bot.last_known_block_info.height == 6
+        watch.cancel()
+
+    asyncio.run(run())
+
+
+def test_without_change_streams_the_fetch_stage_polls(bot: Bot):
+    blocks(bot).watch_error = OperationFailure("not a replica set")
+
+    async def run():
+        await asyncio.wait_for(bot.watch_blocks("mainnet"), timeout=1)
+
+    asyncio.run(run())
+    assert not bot.change_stream_active
+    assert bot.new_block_event.is_set()
+    assert bot.metrics.gauges["block_change_stream_active"] == 0
+
+
+def test_new_blocks_wake_up_the_fetch_stage(bot: Bot):
+    async def run():
+        watch = asyncio.create_task(bot.watch_blocks("mainnet"))
+        fetch = asyncio.create_task(bot.fetch_stage("mainnet"))
+        heights = [(await bot.block_queue.get()).block_info.height for _ in range(5)]
+
+        new_block = blocks(bot).documents["block_5"] | {
+            "_id": "block_6",
+            "hash": "block_6",
+            "height": 6,
+        }
+        blocks(bot).add(new_block)
+        blocks(bot).changes.append({"fullDocument": new_block})
+        heights.append((await bot.block_queue.get()).block_info.height)
+        watch.cancel()
+        fetch.cancel()
+        return heights
+
+    start = time.perf_counter()
+    assert asyncio.run(asyncio.wait_for(run(), timeout=5)) == [1, 2, 3, 4, 5, 6]
+    assert time.perf_counter() - start < 1
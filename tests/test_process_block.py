@@ -0,0 +1,105 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+import asyncio
+import types
+
+import pytest
+
+from bot import Bot, pipeline_logic
+
+
+@pytest.fixture
+def bot(offline_bot: Bot) -> Bot:
+    bot = offline_bot
+    bot.errors = []
+    bot.running = 0
+    bot.max_running = 0
+
+    async def log_error(error, block, caller):
+        bot.errors.append(caller)
+
+    bot.log_error = log_error
+
+    def extractor(name: str, delay: float, fail: bool = False):
+        async def extract(block):
+            bot.running += 1
+            bot.max_running = max(bot.max_running, bot.running)
+            await asyncio.sleep(delay)
+            bot.running -= 1
+            for tx_index in range(2):
+                bot.add_notification_event_to_queue(
+                    (block.block_info.height, name, tx_index)
+                )
+            if fail:
+                raise Exception("failed")
+
+        extract.__name__ = name
+        return extract
+
+    bot.process_block_for_baker = extractor("validator", 0.1)
+    bot.find_events_in_block_transactions = extractor("transactions", 0.05)
+    bot.find_events_in_block_special_events = extractor("special", 0.1, fail=True)
+    bot.find_events_in_logged_events = extractor("logged", 0.01)
+    return bot
+
+
+def block(height: int):
+    return types.SimpleNamespace(
+        net="mainnet", block_info=types.SimpleNamespace(height=height)
+    )
+
+
+def test_extractors_run_concurrently_in_deterministic_order(bot: Bot):
+    bot.event_queue.append("dashboard")
+    notification_events, completed = asyncio.run(bot.process_block(block(1)))
+    # all four were running at the same time.
+    assert bot.max_running == 4
+    assert notification_events == [
+        (1, "validator", 0),
+        (1, "validator", 1),
+        (1, "transactions", 0),
+        (1, "transactions", 1),
+        (1, "special", 0),
+        (1, "special", 1),
+        (1, "logged", 0),
+        (1, "logged", 1),
+        "dashboard",
+    ]
+    assert not completed
+    assert bot.errors == ["special"]
+    assert bot.event_queue == []
+
+
+def test_enrich_stage_passes_blocks_on_in_height_order(
+    offline_bot: Bot, monkeypatch
+):
+    monkeypatch.setattr(pipeline_logic, "ENRICH_CONCURRENCY", 4)
+    bot = offline_bot
+    running = []
+    all_running = asyncio.Event()
+
+    async def process_block(block):
+        # blocks only finish once all four are being processed.
+        running.append(block.block_info.height)
+        if len(running) == 4:
+            all_running.set()
+        await asyncio.wait_for(all_running.wait(), timeout=1)
+        # later blocks finish first
+        await asyncio.sleep(0.01 * (5 - block.block_info.height))
+        return [block.block_info.height], True
+
+    bot.process_block = process_block
+
+    async def run():
+        for height in range(1, 5):
+            await bot.block_queue.put(block(height))
+        task = asyncio.create_task(bot.enrich_stage())
+        heights = []
+        for _ in range(4):
+            _, events, _ = await bot.notification_queue.get()
+            heights.extend(events)
+        task.cancel()
+        return heights
+
+    assert asyncio.run(asyncio.wait_for(run(), timeout=5)) == [1, 2, 3, 4]
+    assert all_running.is_set()
@@ -0,0 +1,65 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+import datetime as dt
+
+from ccdexplorer_fundamentals.user_v2 import AccountForUser, UserV2
+
+from bot import Bot
+from notification_classes import *
+
+
+def user(label: str) -> UserV2:
+    return UserV2(
+        token=label,
+        accounts={"5": AccountForUser(account_index=5, label=label)},
+    )
+
+
+def account_transfer_event() -> NotificationEvent:
+    return NotificationEvent(
+        event_type=EventType(
+            account=EventTypeAccount(
+                account_transfer=CCD_AccountTransfer(amount=1, receiver="receiver")
+            )
+        ),
+        block_height=1,
+        block_hash="hash",
+        block_slot_time=dt.datetime.now().astimezone(tz=dt.timezone.utc),
+        tx_hash="tx_hash",
+        impacted_addresses=[
+            ImpactedAddress(
+                address=CCD_Address_Complete(
+                    account=CCD_AccountAddress_Complete(id="account_id", index=5)
+                ),
+                address_type=AddressType.receiver,
+            )
+        ],
+    )
+
+
+def test_message_is_rendered_once_and_labelled_per_user(offline_bot: Bot):
+    b = offline_bot
+    notification_event = account_transfer_event()
+
+    alice = b.define_account_transfer_message(notification_event, user("Alice"))
+    bob = b.define_account_transfer_message(notification_event, user("Bob"))
+    stranger = b.define_account_transfer_message(notification_event, UserV2(token="x"))
+
+    assert b.metrics.counters["messages_rendered"] == 1
+    assert b.metrics.counters["messages_personalized"] == 3
+    assert "Alice" in alice.title_email and "Alice" in alice.message_telegram
+    assert "Bob" in bob.message_telegram and "Alice" not in bob.message_telegram
+    # without a label, the account index is shown
+    assert ">5</a>" in stranger.message_telegram
+    assert "\x00" not in alice.message_telegram + alice.message_email
+
+
+def test_personalized_message_matches_direct_rendering(offline_bot: Bot):
+    b = offline_bot
+    rendered = b.define_account_transfer_message(
+        account_transfer_event(), user("Alice")
+    )
+    direct = b.define_account_transfer_message.__wrapped__(
+        b, account_transfer_event(), user("Alice")
+    )
+    assert rendered == direct
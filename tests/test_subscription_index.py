@@ -0,0 +1,132 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+import datetime as dt
+
+from ccdexplorer_fundamentals.user_v2 import (
+    AccountForUser,
+    AccountNotificationPreferences,
+    ContractForUser,
+    ContractNotificationPreferences,
+    NotificationPreferences,
+    NotificationService,
+    OtherNotificationPreferences,
+    UserV2,
+    ValidatorNotificationPreferences,
+)
+
+from bot.subscription_index import SubscriptionIndex
+from notification_classes import *
+
+ENABLED = NotificationPreferences(telegram=NotificationService(enabled=True))
+
+
+def users() -> dict[str, UserV2]:
+    return {
+        "account_user": UserV2(
+            token="a",
+            accounts={
+                "5": AccountForUser(
+                    account_index=5,
+                    account_notification_preferences=AccountNotificationPreferences(
+                        account_transfer=ENABLED
+                    ),
+                )
+            },
+        ),
+        "validator_user": UserV2(
+            token="v",
+            accounts={
+                "5": AccountForUser(
+                    account_index=5,
+                    validator_notification_preferences=ValidatorNotificationPreferences(
+                        block_validated=ENABLED
+                    ),
+                )
+            },
+        ),
+        "contract_user": UserV2(
+            token="c",
+            contracts={
+                "9": ContractForUser(
+                    contract=CCD_ContractAddress(index=9, subindex=0),
+                    contract_notification_preferences=ContractNotificationPreferences(
+                        contract_update_issued={"nft.mint": ENABLED}
+                    ),
+                )
+            },
+        ),
+        "other_user": UserV2(
+            token="o",
+            other_notification_preferences=OtherNotificationPreferences(
+                protocol_update=ENABLED
+            ),
+        ),
+    }
+
+
+def event(
+    event_type: EventType,
+    address: CCD_Address_Complete | None = None,
+    address_type: AddressType | None = None,
+):
+    return NotificationEvent(
+        event_type=event_type,
+        block_height=1,
+        block_hash="hash",
+        block_slot_time=dt.datetime.now().astimezone(tz=dt.timezone.utc),
+        impacted_addresses=(
+            [ImpactedAddress(address=address, address_type=address_type)]
+            if address
+            else None
+        ),
+    )
+
+
+def test_account_and_validator_events_go_to_their_subscribers():
+    index = SubscriptionIndex(users())
+    account_5 = CCD_Address_Complete(account=CCD_AccountAddress_Complete(index=5))
+    account_6 = CCD_Address_Complete(account=CCD_AccountAddress_Complete(index=6))
+    transfer = EventType(
+        account=EventTypeAccount(
+            account_transfer=CCD_AccountTransfer(amount=1, receiver="receiver")
+        )
+    )
+    validated = EventType(validator=EventTypeValidator(block_validated=True))
+
+    assert index.users_for_event(event(transfer, account_5)) == ["account_user"]
+    assert index.users_for_event(event(validated, account_5)) == ["validator_user"]
+    assert index.users_for_event(event(transfer, account_6)) == []
+
+
+def test_contract_events_are_keyed_by_receive_name():
+    index = SubscriptionIndex(users())
+    contract_9 = CCD_Address_Complete(
+        contract=CCD_ContractAddress(index=9, subindex=0)
+    )
+
+    def update(receive_name: str):
+        return event(
+            EventType(
+                contract=EventTypeContract(
+                    contract_update_issued=CCD_ContractUpdateIssued(effects=[]),
+                    receive_name=receive_name,
+                )
+            ),
+            contract_9,
+            AddressType.contract,
+        )
+
+    assert index.users_for_event(update("nft.mint")) == ["contract_user"]
+    assert index.users_for_event(update("nft.burn")) == []
+
+
+def test_other_events_go_to_users_with_that_preference():
+    index = SubscriptionIndex(users())
+    protocol_update = EventType(
+        other=EventTypeOther(
+            protocol_update=CCD_ProtocolUpdate(
+                message_="update", specification_url="url", specificationHash="hash"
+            )
+        )
+    )
+    assert index.users_for_event(event(protocol_update)) == ["other_user"]
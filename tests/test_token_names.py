@@ -0,0 +1,39 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+import asyncio
+import types
+
+from ccdexplorer_fundamentals.mongodb import Collections
+
+from bot import Bot
+
+
+def block(token_addresses: list[str]):
+    return types.SimpleNamespace(
+        logged_events=[types.SimpleNamespace(token_address=x) for x in token_addresses]
+    )
+
+
+def test_one_query_per_block_and_cached_across_blocks(offline_bot: Bot):
+    bot = offline_bot
+    token_addresses = bot.connections.mongomoter.mainnet[
+        Collections.tokens_token_addresses
+    ]
+    token_addresses.add(
+        {"_id": "<1,0>-", "token_metadata": {"name": "EURe"}},
+        {"_id": "<2,0>-", "token_metadata": None},
+    )
+    airdrop = ["<1,0>-"] * 100 + ["<2,0>-", "<3,0>-"]
+    assert asyncio.run(bot.token_names_for_block(block(airdrop))) == {
+        "<1,0>-": "EURe",
+        "<2,0>-": "Not yet available...",
+        "<3,0>-": None,
+    }
+    assert [x["_id"]["$in"] for x in token_addresses.queries] == [
+        ["<1,0>-", "<2,0>-", "<3,0>-"]
+    ]
+
+    asyncio.run(bot.token_names_for_block(block(airdrop)))
+    # only tokens without metadata are looked up again
+    assert token_addresses.queries[1]["_id"]["$in"] == ["<2,0>-", "<3,0>-"]
+    assert bot.metrics.counters["token_name_cache_hits"] == 1
@@ -0,0 +1,57 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+import datetime as dt
+
+import pytest
+
+from bot import Bot
+
+
+def user_document(user_id: str, minute: int, account_index: str = "1") -> dict:
+    return {
+        "_id": user_id,
+        "token": f"token-{user_id}",
+        "last_modified": dt.datetime(2024, 1, 1, 0, minute),
+        "accounts": {
+            account_index: {
+                "account_index": int(account_index),
+                "account_notification_preferences": {
+                    "account_transfer": {"telegram": {"enabled": True}}
+                },
+            }
+        },
+    }
+
+
+@pytest.fixture
+def bot(offline_bot: Bot) -> Bot:
+    offline_bot.set_users([user_document("a", 1), user_document("b", 2)])
+    return offline_bot
+
+
+def test_full_read_sets_last_modified(bot: Bot):
+    assert bot.users_last_modified == dt.datetime(2024, 1, 1, 0, 2)
+    assert bot.subscription_index.accounts["1"] == ["a", "b"]
+
+
+def test_only_changed_users_are_replaced(bot: Bot):
+    user_a = bot.users["a"]
+    bot.update_users([user_document("b", 3, account_index="2")], {"a", "b"})
+    assert bot.users["a"] is user_a
+    assert "2" in bot.users["b"].accounts
+    assert bot.subscription_index.accounts["1"] == ["a"]
+    assert bot.subscription_index.accounts["2"] == ["b"]
+    assert bot.users_last_modified == dt.datetime(2024, 1, 1, 0, 3)
+
+
+def test_unchanged_users_read_again_keep_the_index(bot: Bot):
+    users, subscription_index = bot.users, bot.subscription_index
+    bot.update_users([user_document("b", 2)], {"a", "b"})
+    assert bot.users is users
+    assert bot.subscription_index is subscription_index
+
+
+def test_deleted_and_new_users(bot: Bot):
+    bot.update_users([user_document("c", 4)], {"b", "c"})
+    assert set(bot.users) == {"b", "c"}
+    assert bot.subscription_index.accounts["1"] == ["b", "c"]
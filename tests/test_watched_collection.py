@@ -0,0 +1,112 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+import asyncio
+
+from pymongo.errors import OperationFailure
+
+from ccdexplorer_fundamentals.cis import MongoTypeTokensTag
+
+from bot.metrics import Metrics
+from bot.watched_collection import WatchedCollection
+
+
+def token_tags() -> WatchedCollection:
+    return WatchedCollection(
+        "tokens_tags", lambda x: MongoTypeTokensTag(**x), Metrics()
+    )
+
+
+def test_only_changed_documents_are_parsed():
+    collection = token_tags()
+    assert collection.load(
+        [{"_id": "EURe", "contracts": ["<1,0>"]}, {"_id": "USDC", "contracts": ["<2,0>"]}]
+    )
+    eure = collection.items["EURe"]
+    assert collection.load(
+        [{"_id": "EURe", "contracts": ["<1,0>"]}, {"_id": "USDC", "contracts": ["<3,0>"]}]
+    )
+    assert collection.items["EURe"] is eure
+    assert collection.items["USDC"].contracts == ["<3,0>"]
+    version = collection.version
+    assert not collection.load(
+        [{"_id": "EURe", "contracts": ["<1,0>"]}, {"_id": "USDC", "contracts": ["<3,0>"]}]
+    )
+    assert collection.version == version
+    assert collection.load([{"_id": "EURe", "contracts": ["<1,0>"]}])
+    assert list(collection.items) == ["EURe"]
+
+
+def test_failed_refresh_keeps_previous_snapshot(fake_mongomoter):
+    collection = token_tags()
+    collection.load([{"_id": "EURe", "contracts": ["<1,0>"]}])
+    tags = fake_mongomoter.utilities["tokens_tags"]
+    tags.add({"_id": "EURe", "contracts": None})
+
+    assert not asyncio.run(collection.refresh(tags))
+    assert collection.items["EURe"].contracts == ["<1,0>"]
+    assert collection.metrics.counters["tokens_tags_load_errors"] == 1
+
+
+def test_change_stream_events():
+    collection = token_tags()
+    collection.load([{"_id": "EURe", "contracts": ["<1,0>"]}])
+    assert collection.apply_change(
+        {
+            "operationType": "update",
+            "documentKey": {"_id": "EURe"},
+            "fullDocument": {"_id": "EURe", "contracts": ["<1,0>", "<4,0>"]},
+        }
+    )
+    assert collection.items["EURe"].contracts == ["<1,0>", "<4,0>"]
+    assert collection.apply_change(
+        {"operationType": "delete", "documentKey": {"_id": "EURe"}}
+    )
+    assert collection.items == {}
+    assert collection.metrics.gauges["tokens_tags_documents"] == 0
+
+
+def test_watch_reports_the_initial_read_and_every_change(fake_mongomoter):
+    collection = token_tags()
+    tags = fake_mongomoter.utilities["tokens_tags"]
+    tags.add({"_id": "EURe", "contracts": ["<1,0>"]})
+    changes = []
+
+    async def run():
+        watch = asyncio.create_task(
+            collection.watch(tags, lambda: changes.append(collection.version))
+        )
+        await asyncio.sleep(0.05)
+        assert collection.watching
+        # the documents read when the stream was opened.
+        assert changes == [1]
+
+        tags.changes.append(
+            {
+                "operationType": "insert",
+                "documentKey": {"_id": "USDC"},
+                "fullDocument": {"_id": "USDC", "contracts": ["<2,0>"]},
+            }
+        )
+        await asyncio.sleep(0.05)
+        watch.cancel()
+
+    asyncio.run(run())
+    assert changes == [1, 2]
+    assert list(collection.items) == ["EURe", "USDC"]
+    assert not collection.watching
+
+
+def test_watch_falls_back_to_refreshing(fake_mongomoter):
+    collection = token_tags()
+    tags = fake_mongomoter.utilities["tokens_tags"]
+    tags.add({"_id": "EURe", "contracts": ["<1,0>"]})
+    tags.watch_error = OperationFailure("not a replica set")
+    changes = []
+
+    asyncio.run(
+        asyncio.wait_for(collection.watch(tags, lambda: changes.append(1)), timeout=1)
+    )
+    assert changes == []
+    assert not collection.watching
+    assert asyncio.run(collection.refresh(tags))
+    assert list(collection.items) == ["EURe"]
@@ -0,0 +1,80 @@
+# ruff: noqa: F403, F405, E402, E501, F401
+
+import asyncio
+import types
+
+import pytest
+
+from bot import Bot
+from bot.metadata_cache import MetadataCache
+
+
+def respond(method: str, url: str, payload):
+    if "CIS2TokenMetadata" in url:
+        token_id = url.split("tokenId=")[1]
+        return 200, {"metadata": [{"metadataURL": f"https://meta/{token_id}"}]}
+    return 200, {"name": f"{url.split('/')[-1]}.ccd"}
+
+
+@pytest.fixture
+def bot(offline_bot: Bot) -> Bot:
+    offline_bot.http_session.respond = respond
+    return offline_bot
+
+
+def logged_event(token_id: str, tag: int = 254):
+    return types.SimpleNamespace(
+        contract="<9377,0>", tag=tag, token_address=f"<9377,0>-{token_id}"
+    )
+
+
+def test_domain_names_are_cached(bot: Bot):
+    assert asyncio.run(bot.find_web23_domain_name("<9377,0>-aa")) == "aa.ccd"
+    assert asyncio.run(bot.find_web23_domain_name("<9377,0>-aa")) == "aa.ccd"
+    assert len(bot.http_session.requests) == 2
+    assert bot.metrics.counters["metadata_cache_hits"] == 1
+
+
+def test_all_mints_in_a_block_are_retrieved_once(bot: Bot):
+    block = types.SimpleNamespace(
+        logged_events=[
+            logged_event("aa"),
+            logged_event("bb"),
+            logged_event("aa"),
+            logged_event("cc", tag=255),
+        ]
+    )
+    domain_names = asyncio.run(bot.find_web23_domain_names(block))
+    assert domain_names == {"<9377,0>-aa": "aa.ccd", "<9377,0>-bb": "bb.ccd"}
+    assert len(bot.http_session.requests) == 4
+
+
+def test_cache_is_bounded():
+    cache = MetadataCache(max_size=2)
+    cache.put("a", "a.ccd")
+    cache.put("b", "b.ccd")
+    cache.get("a")
+    cache.put("c", "c.ccd")
+    assert cache.get("b") is None
+    assert len(cache) == 2
+
+
+def test_a_failing_domain_only_loses_its_own_name(bot: Bot):
+    def respond_with_failures(method: str, url: str, payload):
+        if "tokenId=bb" in url:
+            raise asyncio.TimeoutError()
+        if url.endswith("/cc"):
+            return 502, "<html>Bad Gateway</html>"
+        return respond(method, url, payload)
+
+    bot.http_session.respond = respond_with_failures
+    block = types.SimpleNamespace(
+        logged_events=[logged_event("aa"), logged_event("bb"), logged_event("cc")]
+    )
+    domain_names = asyncio.run(bot.find_web23_domain_names(block))
+    assert domain_names == {
+        "<9377,0>-aa": "aa.ccd",
+        "<9377,0>-bb": None,
+        "<9377,0>-cc": None,
+    }
+    assert bot.metrics.counters["web23_domain_name_errors"] == 2